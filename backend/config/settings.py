@@ -13,6 +13,8 @@ SECRET_KEY = os.getenv(
     'django-insecure-3!b-39e%$a5u^6feutvy3bp*pfjc@l*i5mc+shmw%z^i#n$b4z',
 )
 
+SHORT_LINK_SECRET = os.getenv('SHORT_LINK_SECRET', SECRET_KEY)
+
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 
 ALLOWED_HOSTS = os.getenv(
@@ -93,6 +95,102 @@ else:
         }
     }
 
+# Кэш должен быть общим для web-процессов, воркера очереди и служебных
+# команд: через него сбрасываются фрагменты рецептов и идёт журнал
+# изменений индекса ингредиентов. LocMemCache годится только для одного
+# процесса, с ним кэш фрагментов отключается. docker-compose использует
+# memcached. Кэш в базе данных остаётся запасным вариантом без отдельного
+# сервиса: он работает, но каждое чтение фрагментов — запрос к базе.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'core.cache.BatchDatabaseCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', 'django_cache'),
+    }
+}
+if 'memcached' not in CACHE_BACKEND:
+    # Клиенту memcached OPTIONS передаются как аргументы, а записи он
+    # вытесняет сам.
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 100_000)),
+    }
+
+RECIPE_FRAGMENT_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_FRAGMENT_CACHE_TIMEOUT', 60 * 60)
+)
+
+SHOPPING_CART_CACHE_TIMEOUT = int(
+    os.getenv('SHOPPING_CART_CACHE_TIMEOUT', 60 * 60)
+)
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+)
+
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 10000))
+FEED_FANOUT_BATCH_SIZE = int(os.getenv('FEED_FANOUT_BATCH_SIZE', 1000))
+FEED_BACKFILL_LIMIT = int(os.getenv('FEED_BACKFILL_LIMIT', 100))
+
+SHORT_LINK_REDIRECT_HOST = os.getenv(
+    'SHORT_LINK_REDIRECT_HOST', 'https://foodgram-ya.myddns.me'
+).rstrip('/')
+SHORT_LINK_CACHE_TIMEOUT = int(
+    os.getenv('SHORT_LINK_CACHE_TIMEOUT', 60 * 60 * 24)
+)
+SHORT_LINK_LOCAL_CACHE_SIZE = int(
+    os.getenv('SHORT_LINK_LOCAL_CACHE_SIZE', 10000)
+)
+# Код ссылки не меняется, пока ссылка существует, поэтому по умолчанию
+# (0) записи кэша процесса не устаревают и удаляются только при удалении
+# ссылки. Другие процессы узнают об удалении не сразу и перенаправляют
+# на страницу уже удалённого рецепта, которая сама отвечает 404.
+SHORT_LINK_LOCAL_CACHE_TIMEOUT = (
+    int(os.getenv('SHORT_LINK_LOCAL_CACHE_TIMEOUT', 0)) or None
+)
+
+IMAGE_UPLOAD_MAX_BYTES = int(
+    os.getenv('IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+)
+IMAGE_UPLOAD_MAX_PIXELS = int(os.getenv('IMAGE_UPLOAD_MAX_PIXELS', 40_000_000))
+
+RECIPE_BULK_MAX_ITEMS = int(os.getenv('RECIPE_BULK_MAX_ITEMS', 1000))
+RECIPE_BULK_BATCH_SIZE = int(os.getenv('RECIPE_BULK_BATCH_SIZE', 100))
+
+SIMILAR_RECIPES_LIMIT = int(os.getenv('SIMILAR_RECIPES_LIMIT', 10))
+SIMILAR_RECIPES_BLOCK_SIZE = int(os.getenv('SIMILAR_RECIPES_BLOCK_SIZE', 1000))
+SIMILAR_RECIPES_CANDIDATE_INGREDIENTS = int(
+    os.getenv('SIMILAR_RECIPES_CANDIDATE_INGREDIENTS', 5)
+)
+SIMILAR_RECIPES_POSTING_LIMIT = int(
+    os.getenv('SIMILAR_RECIPES_POSTING_LIMIT', 1000)
+)
+SIMILAR_RECIPES_MAX_INGREDIENT_SHARE = float(
+    os.getenv('SIMILAR_RECIPES_MAX_INGREDIENT_SHARE', 0.05)
+)
+SIMILAR_RECIPES_FREQUENCY_TIMEOUT = int(
+    os.getenv('SIMILAR_RECIPES_FREQUENCY_TIMEOUT', 60 * 60 * 24)
+)
+
+PANTRY_INDEX_TIMEOUT = int(os.getenv('PANTRY_INDEX_TIMEOUT', 60 * 60))
+PANTRY_CHANGE_LOG_TIMEOUT = int(
+    os.getenv('PANTRY_CHANGE_LOG_TIMEOUT', 60 * 60)
+)
+
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 24))
+TRENDING_FAVORITE_WEIGHT = float(os.getenv('TRENDING_FAVORITE_WEIGHT', 1))
+TRENDING_SHOPPING_CART_WEIGHT = float(
+    os.getenv('TRENDING_SHOPPING_CART_WEIGHT', 0.5)
+)
+
+TASK_QUEUE_EAGER = os.getenv('TASK_QUEUE_EAGER', 'False').lower() == 'true'
+TASK_WORKER_THREADS = int(os.getenv('TASK_WORKER_THREADS', 2))
+TASK_WORKER_PROCESSES = int(os.getenv('TASK_WORKER_PROCESSES', 1))
+TASK_POLL_INTERVAL = float(os.getenv('TASK_POLL_INTERVAL', 1))
+TASK_VISIBILITY_TIMEOUT = int(os.getenv('TASK_VISIBILITY_TIMEOUT', 5 * 60))
+TASK_RETRY_DELAY = int(os.getenv('TASK_RETRY_DELAY', 30))
+TASK_RETENTION_HOURS = float(os.getenv('TASK_RETENTION_HOURS', 24 * 7))
+TASK_PURGE_INTERVAL = int(os.getenv('TASK_PURGE_INTERVAL', 60 * 60))
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -0,0 +1,14 @@
+# Настройки для тестов: база SQLite в памяти, очередь задач без
+# немедленного выполнения, быстрый хэш паролей.
+from config.settings import *
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+TASK_QUEUE_EAGER = False
@@ -5,3 +5,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Индекс ингредиентов для /api/recipes/pantry/ собирается в фоне при
+# старте процесса, чтобы первый запрос не ждал чтения всей таблицы.
+from recipes.pantry import pantry_index  # noqa: E402
+
+pantry_index.load_in_background()
@@ -0,0 +1,41 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Конфигурация админ-панели для модели Task."""
+
+    list_display = (
+        'id',
+        'name',
+        'status',
+        'attempts',
+        'max_attempts',
+        'run_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+    readonly_fields = (
+        'name',
+        'args',
+        'kwargs',
+        'attempts',
+        'locked_until',
+        'last_error',
+        'created_at',
+        'finished_at',
+    )
+    actions = ('retry',)
+
+    @admin.action(description='Повторить выбранные задачи')
+    def retry(self, request, queryset):
+        queryset.update(
+            status=Task.Status.PENDING,
+            attempts=0,
+            run_at=timezone.now(),
+            locked_until=None,
+        )
@@ -0,0 +1,136 @@
+import base64
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DatabaseError, connections, router, transaction
+from django.utils import timezone
+
+
+def is_shared_cache():
+    """Проверяет, что кэш по умолчанию общий для всех процессов.
+
+    LocMemCache хранит данные в памяти одного процесса: сброс ключа в
+    воркере или служебной команде не виден web-процессам.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+class BatchDatabaseCache(DatabaseCache):
+    """DatabaseCache с пакетной записью set_many.
+
+    Стандартный set_many вызывает set для каждого ключа: проверка
+    размера, точка сохранения, SELECT и INSERT или UPDATE — пять
+    запросов на ключ, и холодная страница рецептов записывала бы
+    фрагменты сотнями запросов. Здесь прежние строки ключей удаляются
+    одним DELETE, новые добавляются одним INSERT.
+    """
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if not data:
+            return []
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            expires = datetime.max
+        elif settings.USE_TZ:
+            expires = datetime.utcfromtimestamp(timeout)
+        else:
+            expires = datetime.fromtimestamp(timeout)
+        db = router.db_for_write(self.cache_model_class)
+        connection = connections[db]
+        expires = connection.ops.adapt_datetimefield_value(
+            expires.replace(microsecond=0)
+        )
+        rows = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            pickled = pickle.dumps(value, self.pickle_protocol)
+            rows.append(
+                (key, base64.b64encode(pickled).decode('latin1'), expires)
+            )
+        quote_name = connection.ops.quote_name
+        table = quote_name(self._table)
+        columns = ', '.join(
+            quote_name(column) for column in ('cache_key', 'value', 'expires')
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {table}')
+            if cursor.fetchone()[0] > self._max_entries:
+                self._cull(db, cursor, timezone.now().replace(microsecond=0))
+            try:
+                with transaction.atomic(using=db):
+                    cursor.execute(
+                        f'DELETE FROM {table} '
+                        f'WHERE {quote_name("cache_key")} IN '
+                        f'({", ".join(["%s"] * len(rows))})',
+                        [key for key, *_ in rows],
+                    )
+                    cursor.execute(
+                        f'INSERT INTO {table} ({columns}) VALUES '
+                        + ', '.join(['(%s, %s, %s)'] * len(rows)),
+                        [value for row in rows for value in row],
+                    )
+            except DatabaseError:
+                # Как и в DatabaseCache: одновременная запись тех же
+                # ключей из другого процесса не считается ошибкой.
+                return list(data)
+        return []
+
+
+class LocalLRUCache:
+    """Потокобезопасный LRU-кэш в памяти процесса с ограничением по времени.
+
+    Служит первым уровнем перед общим кэшем: снимает сетевой запрос к
+    общему бэкенду для самых горячих ключей. Записи живут не дольше
+    timeout секунд, поэтому удаление в соседнем процессе становится
+    видно здесь не позже этого срока. При timeout=None записи хранятся,
+    пока их не вытеснят или не удалят явно.
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            expires_at = (
+                None
+                if self.timeout is None
+                else time.monotonic() + self.timeout
+            )
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -3,6 +3,11 @@
 # ================================
 
 DEFAULT_PAGE_SIZE = 6
+CURSOR_PAGINATION_QUERY_PARAM = 'pagination'
+CURSOR_PAGINATION_VALUE = 'cursor'
+FIELDS_QUERY_PARAM = 'fields'
+OMIT_QUERY_PARAM = 'omit'
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
 
 # User model field settings
 LENGTH_DATA_USER = 150
@@ -14,6 +19,8 @@ EMAIL_VERBOSE_NAME = 'Адрес электронной почты'
 PASSWORD_VERBOSE_NAME = 'Пароль'
 AVATAR_VERBOSE_NAME = 'Аватар'
 USERS_AVATARS_UPLOAD_PATH = 'users/avatars/'
+RECIPES_COUNT_VERBOSE_NAME = 'Количество рецептов'
+FOLLOWERS_COUNT_VERBOSE_NAME = 'Количество подписчиков'
 
 # User model verbose names
 USER_MODEL_VERBOSE_NAME = 'Пользователь'
@@ -35,6 +42,49 @@ RECIPE_NAME_MAX_LENGTH = 256
 RECIPE_TEXT_MAX_LENGTH = 1000
 COOKING_TIME_MIN_VALUE = 1
 COOKING_TIME_MAX_VALUE = 32000
+RECIPE_PUB_DATE_INDEX = 'recipe_pub_date_id_idx'
+RECIPE_POPULAR_INDEX = 'recipe_popular_idx'
+RECIPE_TRENDING_INDEX = 'recipe_trending_idx'
+RECIPE_AUTHOR_PUB_DATE_INDEX = 'recipe_author_pub_date_idx'
+RECIPE_ORDERING_QUERY_PARAM = 'ordering'
+RECIPE_BULK_UPSERT_QUERY_PARAM = 'upsert'
+RECIPE_BULK_MAX_ITEMS_ERROR = (
+    'Слишком много рецептов в одном запросе, максимум {max_items}.'
+)
+RECIPE_ORDERINGS = {
+    'popular': ('-favorites_count', '-pub_date', '-id'),
+    'trending': ('-trending_score', '-pub_date', '-id'),
+}
+
+# Trending score settings
+# Показатель экспоненты, после которого оценки пересчитываются к новой
+# точке отсчёта, чтобы не переполнить float.
+TRENDING_REBASE_EXPONENT = 20
+TRENDING_UPDATE_BATCH_SIZE = 500
+
+# Pantry matching settings
+PANTRY_INGREDIENTS_QUERY_PARAM = 'ingredients'
+PANTRY_LIMIT_QUERY_PARAM = 'limit'
+PANTRY_DEFAULT_LIMIT = 20
+PANTRY_MAX_LIMIT = 100
+PANTRY_MAX_INGREDIENTS = 100
+PANTRY_FILTER_CHUNK_SIZE = 500
+PANTRY_MAX_REPLAYED_CHANGES = 1000
+PANTRY_LOG_WRITE_ATTEMPTS = 10
+PANTRY_VERSION_KEY = 'recipes:pantry:version'
+PANTRY_CHANGE_KEY = 'recipes:pantry:change:{}'
+
+# Short link settings
+SHORT_CODE_ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+# Прежние случайные коды состояли из 6-10 символов urlsafe base64,
+# поэтому новые коды начинаются с символа вне этого алфавита.
+SHORT_CODE_PREFIX = '~'
+# (половина разрядности перестановки, длина кода без префикса):
+# 2**32 < 62**6, 2**48 < 62**9, поэтому коды разной длины не пересекаются.
+SHORT_CODE_DOMAINS = ((16, 6), (24, 9))
+SHORT_CODE_FEISTEL_ROUNDS = 4
 
 # Ingredient model settings
 INGREDIENT_NAME_MAX_LENGTH = 128
@@ -44,6 +94,71 @@ INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH = 64
 TAG_NAME_MAX_LENGTH = 32
 TAG_SLUG_MAX_LENGTH = 32
 
+# Shopping list item model settings
+UNIQUE_SHOPPING_LIST_ITEM_CONSTRAINT = 'unique_user_shopping_list_ingredient'
+
+# Feed entry model settings
+UNIQUE_FEED_ENTRY_CONSTRAINT = 'unique_feed_entry'
+FEED_ENTRY_PUB_DATE_INDEX = 'feed_entry_user_pub_date_idx'
+UNIQUE_SIMILAR_RECIPE_CONSTRAINT = 'unique_similar_recipe'
+SIMILAR_RECIPES_FREQUENCY_KEY = 'recipes:similar:frequency'
+
 # Recipe ingredient model settings
 RECIPE_INGREDIENT_AMOUNT_MIN_VALUE = 1
 RECIPE_INGREDIENT_AMOUNT_MAX_VALUE = 32000
+
+# Base64 image field settings
+BASE64_IMAGE_PREFIX = 'data:image'
+# Кратно 4, чтобы каждая часть декодировалась независимо.
+BASE64_DECODE_CHUNK_SIZE = 4 * 64 * 1024
+BASE64_IMAGE_INVALID_ERROR = 'Некорректное изображение в формате base64.'
+BASE64_IMAGE_MAX_BYTES_ERROR = (
+    'Размер изображения не должен превышать {max_bytes} байт.'
+)
+BASE64_IMAGE_MAX_PIXELS_ERROR = (
+    'Разрешение изображения не должно превышать {max_pixels} пикселей.'
+)
+
+# Task queue settings
+TASK_NAME_MAX_LENGTH = 255
+TASK_STATUS_MAX_LENGTH = 16
+TASK_DEFAULT_MAX_ATTEMPTS = 5
+TASK_STATUS_RUN_AT_INDEX = 'task_status_run_at_idx'
+TASK_PURGE_BATCH_SIZE = 1000
+
+# Image rendition settings
+IMAGE_RENDITIONS_DIR = 'renditions'
+IMAGE_RENDITION_FORMAT = 'WEBP'
+IMAGE_RENDITION_EXTENSION = 'webp'
+IMAGE_RENDITION_QUALITY = 80
+RECIPE_IMAGE_RENDITION_WIDTHS = (320, 640, 960)
+AVATAR_RENDITION_WIDTHS = (64, 128)
+IMAGE_RENDITIONS_VERBOSE_NAME = 'Варианты изображения'
+
+# Shopping cart export settings
+SHOPPING_CART_FORMAT_QUERY_PARAM = 'format'
+SHOPPING_CART_DEFAULT_FORMAT = 'txt'
+SHOPPING_CART_FILENAME = 'shopping_cart'
+SHOPPING_CART_CSV_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+SHOPPING_CART_CACHE_KEY = 'recipes:shopping-cart:{}'
+SHOPPING_CART_CHUNK_SIZE = 64 * 1024
+SHOPPING_CART_PDF_FONT_NAME = 'DejaVuSans'
+SHOPPING_CART_PDF_FALLBACK_FONT = 'Helvetica'
+SHOPPING_CART_PDF_FONT_SIZE = 12
+
+# Data import settings
+IMPORT_BATCH_SIZE = 1000
+IMPORT_PROGRESS_INTERVAL = 5
+IMPORT_READ_CHUNK_SIZE = 64 * 1024
+IMPORT_STAGING_TABLE = 'import_staging'
+
+# Data export settings
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_DIR_NAME = 'export'
+EXPORT_FORMATS = ('jsonl', 'csv')
+EXPORT_EXCLUDED_FIELDS = ('password',)
+
+# Query plan audit settings
+AUDIT_ROW_THRESHOLD = 1000
+# recipes_limit для проверки запроса рецептов на странице подписок.
+AUDIT_RECIPES_LIMIT = 3
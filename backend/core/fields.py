@@ -0,0 +1,143 @@
+import base64
+import binascii
+import contextlib
+import io
+import re
+import weakref
+
+from django.conf import settings
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    TemporaryUploadedFile,
+)
+from PIL import Image
+from rest_framework import serializers
+
+from core.constants import (
+    BASE64_DECODE_CHUNK_SIZE,
+    BASE64_IMAGE_INVALID_ERROR,
+    BASE64_IMAGE_MAX_BYTES_ERROR,
+    BASE64_IMAGE_MAX_PIXELS_ERROR,
+    BASE64_IMAGE_PREFIX,
+)
+from core.images import get_srcset
+
+DATA_URI_HEADER = re.compile(r'data:image/(?P<ext>[a-z0-9]+);base64,', re.I)
+
+
+def close_temporary_file(file):
+    """Закрывает временный файл, который хранилище могло переместить."""
+    with contextlib.suppress(FileNotFoundError):
+        file.close()
+
+
+class Base64ImageField(serializers.ImageField):
+    """Поле для обработки изображений, закодированных в base64.
+
+    Строка декодируется частями: небольшие изображения собираются в
+    памяти, крупные пишутся во временный файл на диске, как обычные
+    загрузки Django (порог FILE_UPLOAD_MAX_MEMORY_SIZE). Размер
+    проверяется по длине строки до декодирования, а разрешение — по
+    заголовку изображения, как только он прочитан.
+    """
+
+    default_error_messages = {
+        'invalid_base64': BASE64_IMAGE_INVALID_ERROR,
+        'max_bytes': BASE64_IMAGE_MAX_BYTES_ERROR,
+        'max_pixels': BASE64_IMAGE_MAX_PIXELS_ERROR,
+    }
+
+    def __init__(self, *args, file_name='image', **kwargs):
+        self.file_name = file_name
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith(BASE64_IMAGE_PREFIX):
+            data = self.decode(data)
+        return super().to_internal_value(data)
+
+    def decode(self, data):
+        """Декодирует data URI в загруженный файл без полной копии."""
+        header = DATA_URI_HEADER.match(data)
+        if header is None or (len(data) - header.end()) % 4:
+            self.fail('invalid_base64')
+        padding = 2 if data.endswith('==') else int(data.endswith('='))
+        size = (len(data) - header.end()) // 4 * 3 - padding
+        if size > settings.IMAGE_UPLOAD_MAX_BYTES:
+            self.fail('max_bytes', max_bytes=settings.IMAGE_UPLOAD_MAX_BYTES)
+        ext = header['ext'].lower()
+        name = f'{self.file_name}.{ext}'
+        content_type = f'image/{ext}'
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            upload = TemporaryUploadedFile(name, content_type, size, None)
+            # Загрузки из multipart закрывает запрос Django, эту — сборщик.
+            weakref.finalize(upload, close_temporary_file, upload.file)
+        else:
+            upload = InMemoryUploadedFile(
+                io.BytesIO(), None, name, content_type, size, None
+            )
+        header_checked = False
+        chunk_size = BASE64_DECODE_CHUNK_SIZE
+        try:
+            for start in range(header.end(), len(data), chunk_size):
+                end = start + chunk_size
+                upload.write(base64.b64decode(data[start:end], validate=True))
+                if not header_checked:
+                    header_checked = self.check_dimensions(upload)
+        except binascii.Error:
+            upload.close()
+            self.fail('invalid_base64')
+        except serializers.ValidationError:
+            upload.close()
+            raise
+        upload.seek(0)
+        return upload
+
+    def check_dimensions(self, upload):
+        """Проверяет разрешение по заголовку, не декодируя растр.
+
+        Возвращает False, если заголовок ещё не получен целиком;
+        окончательную проверку формата выполняет родительское поле.
+        Pillow сам отклоняет слишком большие изображения с
+        DecompressionBombError, это тоже превышение разрешения.
+        """
+        position = upload.tell()
+        upload.seek(0)
+        try:
+            with Image.open(upload) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            width = height = None
+        except Exception:
+            return False
+        finally:
+            upload.seek(position)
+        if width is None or width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            self.fail(
+                'max_pixels', max_pixels=settings.IMAGE_UPLOAD_MAX_PIXELS
+            )
+        return True
+
+
+class ImageSrcsetField(serializers.ReadOnlyField):
+    """Словарь {'320w': url} с вариантами изображения модели.
+
+    Пока варианты не построены, ссылки ведут на оригинал. Ссылки
+    абсолютные, если в контексте есть запрос.
+    """
+
+    def __init__(self, field_name, widths, **kwargs):
+        self.image_field_name = field_name
+        self.widths = widths
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        srcset = get_srcset(instance, self.image_field_name, self.widths)
+        request = self.context.get('request')
+        if request is None:
+            return srcset
+        return {
+            descriptor: request.build_absolute_uri(url)
+            for descriptor, url in srcset.items()
+        }
@@ -0,0 +1,146 @@
+import io
+import posixpath
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+from core.constants import (
+    IMAGE_RENDITION_EXTENSION,
+    IMAGE_RENDITION_FORMAT,
+    IMAGE_RENDITION_QUALITY,
+    IMAGE_RENDITIONS_DIR,
+)
+from core.tasks import task
+
+# Отправляется после сохранения вариантов: sender — модель,
+# аргументы pk и field_name.
+renditions_ready = Signal()
+
+
+def get_renditions_field_name(field_name):
+    """Имя JSON-поля модели, где хранятся варианты изображения."""
+    return f'{field_name}_renditions'
+
+
+def get_rendition_name(source_name, width):
+    """Путь варианта заданной ширины рядом с исходным файлом."""
+    directory, filename = posixpath.split(source_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(
+        directory,
+        IMAGE_RENDITIONS_DIR,
+        f'{stem}_{width}w.{IMAGE_RENDITION_EXTENSION}',
+    )
+
+
+def render_variants(field_file, widths):
+    """Сохраняет уменьшенные WebP-копии и возвращает {'320w': путь}.
+
+    Изображение не увеличивается: ширины больше исходной заменяются
+    исходной шириной. Каждый следующий вариант строится из предыдущего,
+    более крупного, чтобы не масштабировать оригинал несколько раз.
+    """
+    storage = field_file.storage
+    srcset = {}
+    with field_file.open('rb') as file, Image.open(file) as image:
+        largest = max(widths)
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or (
+            image.mode == 'P' and 'transparency' in image.info
+        )
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        targets = sorted(
+            {min(width, image.width) for width in widths}, reverse=True
+        )
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(
+                buffer, IMAGE_RENDITION_FORMAT, quality=IMAGE_RENDITION_QUALITY
+            )
+            srcset[f'{width}w'] = storage.save(
+                get_rendition_name(field_file.name, width),
+                ContentFile(buffer.getvalue()),
+            )
+    return dict(reversed(srcset.items()))
+
+
+def needs_renditions(instance, field_name):
+    """Проверяет, построены ли варианты для текущего файла поля."""
+    field_file = getattr(instance, field_name)
+    renditions = getattr(instance, get_renditions_field_name(field_name))
+    return bool(field_file) and renditions.get('source') != field_file.name
+
+
+def generate_renditions(model, pk, field_name, widths):
+    """Строит варианты изображения объекта и сохраняет их пути.
+
+    Пути записываются, только если файл поля не сменился за время
+    обработки; иначе созданные варианты удаляются. Варианты прежнего
+    файла удаляются после сохранения новых. Возвращает True, если
+    варианты сохранены.
+    """
+    renditions_field_name = get_renditions_field_name(field_name)
+    instance = (
+        model.objects.filter(pk=pk)
+        .only(field_name, renditions_field_name)
+        .first()
+    )
+    if instance is None or not getattr(instance, field_name):
+        return False
+    field_file = getattr(instance, field_name)
+    previous = getattr(instance, renditions_field_name).get('srcset', {})
+    srcset = render_variants(field_file, widths)
+    updated = model.objects.filter(
+        pk=pk, **{field_name: field_file.name}
+    ).update(
+        **{
+            renditions_field_name: {
+                'source': field_file.name,
+                'srcset': srcset,
+            }
+        }
+    )
+    if updated:
+        stale = set(previous.values()) - set(srcset.values())
+    else:
+        stale = set(srcset.values())
+    for name in stale:
+        field_file.storage.delete(name)
+    return bool(updated)
+
+
+@task
+def build_renditions(model_label, pk, field_name, widths):
+    """Задача очереди: строит варианты и сообщает о готовности."""
+    model = apps.get_model(model_label)
+    if generate_renditions(model, pk, field_name, widths):
+        renditions_ready.send(sender=model, pk=pk, field_name=field_name)
+
+
+def schedule_renditions(instance, field_name, widths):
+    """Ставит построение вариантов изображения в очередь задач."""
+    build_renditions.delay(
+        instance._meta.label, instance.pk, field_name, list(widths)
+    )
+
+
+def get_srcset(instance, field_name, widths):
+    """Возвращает {'320w': url} для вариантов изображения.
+
+    Пока варианты не построены, все ширины указывают на оригинал.
+    """
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return {}
+    renditions = getattr(instance, get_renditions_field_name(field_name))
+    if renditions.get('source') == field_file.name:
+        return {
+            descriptor: field_file.storage.url(name)
+            for descriptor, name in renditions['srcset'].items()
+        }
+    return {f'{width}w': field_file.url for width in widths}
@@ -0,0 +1,245 @@
+import json
+import re
+from types import SimpleNamespace
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.db import connection
+from django.db.models.query import RawQuerySet
+
+from core.constants import (
+    AUDIT_RECIPES_LIMIT,
+    AUDIT_ROW_THRESHOLD,
+    RECIPE_ORDERINGS,
+)
+from core.pagination import CustomPageNumberPagination
+from recipes.filters import RecipeFilter
+from recipes.models import Recipe, RecipeIngredient, Tag
+from recipes.utils import (
+    get_feed_queryset,
+    get_latest_recipes_query,
+    get_shopping_cart_ingredients,
+)
+from users.models import User
+
+# Псевдонимы таблиц в SQL Django: FROM "recipes_favorite" U0.
+TABLE_ALIAS_RE = re.compile(r'"(\w+)" ([TU]\d+)\b')
+SQLITE_SCAN_RE = re.compile(r'^SCAN (\w+)$')
+SQLITE_SORT_DETAIL = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+class Command(BaseCommand):
+    """Проверка планов основных запросов API через EXPLAIN."""
+
+    help = (
+        'Выполняет EXPLAIN для основных запросов рецептов, подписок и '
+        'списка покупок и отмечает полные сканирования и сортировки'
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            '--threshold',
+            type=int,
+            default=AUDIT_ROW_THRESHOLD,
+            help=(
+                'Число строк, начиная с которого сканирование или '
+                f'сортировка считаются проблемой (по умолчанию '
+                f'{AUDIT_ROW_THRESHOLD})'
+            ),
+        )
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help='Выводить планы запросов целиком',
+        )
+
+    def handle(self, *args, **options):
+        self.row_counts = {}
+        self.tables = set(connection.introspection.table_names())
+        threshold = options['threshold']
+        problems = 0
+        for name, query in self.get_queries():
+            sql, params = self.get_sql(query)
+            if connection.vendor == 'postgresql':
+                plan = self.explain_postgresql(sql, params)
+                issues = self.check_postgresql_plan(plan, threshold)
+                plan_text = json.dumps(plan, indent=2)
+            else:
+                plan = self.explain_sqlite(sql, params)
+                issues = self.check_sqlite_plan(plan, sql, query, threshold)
+                plan_text = '\n'.join(
+                    ' '.join(str(value) for value in row) for row in plan
+                )
+            self.stdout.write(f'🔍 {name}')
+            if options['plans']:
+                self.stdout.write(plan_text)
+            for issue in issues:
+                self.stdout.write(self.style.WARNING(f'  ⚠️ {issue}'))
+            if not issues:
+                self.stdout.write(self.style.SUCCESS('  ✅ без замечаний'))
+            problems += bool(issues)
+        if problems:
+            raise CommandError(f'⛔ Запросов с замечаниями: {problems}')
+
+    def get_queries(self):
+        """Возвращает пары (название, запрос) проверяемых запросов.
+
+        Запросы строятся теми же функциями и фильтрами, что и в API, для
+        первого пользователя, автора и тега в базе. Запрос — QuerySet или
+        RawQuerySet.
+        """
+        user = User.objects.order_by('pk').first() or User(pk=0)
+        author_id = (
+            Recipe.objects.values_list('author_id', flat=True).first() or 0
+        )
+        tag = Tag.objects.order_by('pk').first()
+        ingredient_id = (
+            RecipeIngredient.objects.values_list('ingredient_id', flat=True)
+            .order_by()
+            .first()
+            or 0
+        )
+        limit = CustomPageNumberPagination.page_size
+        recipes = Recipe.objects.select_related(
+            'short_link', 'author'
+        ).with_user_flags(user)
+        request = SimpleNamespace(user=user)
+        subscriptions = User.objects.filter(following__user=user)[:limit]
+        author_ids = list(subscriptions.values_list('pk', flat=True))
+
+        def filtered(**data):
+            return RecipeFilter(data, queryset=recipes, request=request).qs[
+                :limit
+            ]
+
+        queries = [('recipes: список', recipes[:limit])]
+        queries.extend(
+            (f'recipes: ordering={ordering}', filtered(ordering=ordering))
+            for ordering in RECIPE_ORDERINGS
+        )
+        queries.append(('recipes: author', filtered(author=author_id)))
+        if tag is not None:
+            queries.append(('recipes: tags', filtered(tags=[tag.slug])))
+        queries += [
+            ('recipes: is_favorited', filtered(is_favorited='1')),
+            (
+                'recipes: is_in_shopping_cart',
+                filtered(is_in_shopping_cart='1'),
+            ),
+            ('recipes: feed', get_feed_queryset(user, recipes)[:limit]),
+            ('users: subscriptions', subscriptions),
+            (
+                'users: subscriptions, рецепты авторов',
+                get_latest_recipes_query(author_ids),
+            ),
+            (
+                'users: subscriptions, рецепты авторов (recipes_limit)',
+                get_latest_recipes_query(author_ids, AUDIT_RECIPES_LIMIT),
+            ),
+            (
+                'shopping cart: download',
+                get_shopping_cart_ingredients(user),
+            ),
+            (
+                'ingredients: рецепты с ингредиентом',
+                RecipeIngredient.objects.filter(
+                    ingredient_id=ingredient_id
+                ).values('recipe_id'),
+            ),
+        ]
+        return queries
+
+    def get_row_count(self, table):
+        """Число строк таблицы, считается один раз за запуск."""
+        if table not in self.row_counts:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}'
+                )
+                self.row_counts[table] = cursor.fetchone()[0]
+        return self.row_counts[table]
+
+    def get_sql(self, query):
+        """SQL и параметры, которые запрос отправит в базу."""
+        if isinstance(query, RawQuerySet):
+            return query.raw_query, tuple(query.params)
+        return query.query.sql_with_params()
+
+    def explain_sqlite(self, sql, params):
+        """Строки EXPLAIN QUERY PLAN: (id, parent, notused, detail)."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return cursor.fetchall()
+
+    def explain_postgresql(self, sql, params):
+        """План запроса PostgreSQL в формате JSON."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        return json.loads(plan) if isinstance(plan, str) else plan
+
+    def get_result_count(self, query):
+        """Число строк результата запроса без LIMIT."""
+        if isinstance(query, RawQuerySet):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT COUNT(*) FROM ({query.raw_query}) audited',
+                    query.params,
+                )
+                return cursor.fetchone()[0]
+        query = query.query.clone()
+        query.clear_limits()
+        return query.get_count(using=connection.alias)
+
+    def check_sqlite_plan(self, plan, sql, query, threshold):
+        """Ищет в EXPLAIN QUERY PLAN полные сканирования и сортировки.
+
+        SQLite не оценивает число строк в плане, поэтому для таблиц
+        берётся COUNT(*), а для сортировки — размер результата без LIMIT.
+        """
+        aliases = {
+            alias: table for table, alias in TABLE_ALIAS_RE.findall(sql)
+        }
+        issues = []
+        for *_, detail in plan:
+            match = SQLITE_SCAN_RE.match(detail)
+            if match:
+                table = aliases.get(match.group(1), match.group(1))
+                if table not in self.tables:
+                    # Подзапрос в FROM: его строки проверяются отдельно.
+                    continue
+                rows = self.get_row_count(table)
+                if rows > threshold:
+                    issues.append(
+                        f'полное сканирование {table} ({rows} строк)'
+                    )
+            elif detail.startswith(SQLITE_SORT_DETAIL):
+                rows = self.get_result_count(query)
+                if rows > threshold:
+                    issues.append(f'сортировка без индекса ({rows} строк)')
+        return issues
+
+    def check_postgresql_plan(self, plan, threshold):
+        """Ищет в плане PostgreSQL Seq Scan и Sort больше порога строк."""
+        issues = []
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            children = node.get('Plans', [])
+            nodes.extend(children)
+            if node['Node Type'] == 'Seq Scan':
+                table = node['Relation Name']
+                rows = self.get_row_count(table)
+                if rows > threshold:
+                    issues.append(f'Seq Scan {table} ({rows} строк в таблице)')
+            elif node['Node Type'] == 'Sort' and children:
+                rows = children[0]['Plan Rows']
+                if rows > threshold:
+                    issues.append(
+                        f'Sort по {", ".join(node["Sort Key"])} '
+                        f'(~{rows} строк)'
+                    )
+        return issues
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from recipes.models import Recipe, ShortLink
+from recipes.utils import create_short_links
+
+
+class Command(BaseCommand):
+    """Создание коротких ссылок для рецептов, у которых их нет."""
+
+    help = 'Создаёт недостающие короткие ссылки пакетами'
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета для bulk_create (по умолчанию 1000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        recipe_ids = (
+            Recipe.objects.filter(short_link__isnull=True)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        batch = []
+        created = 0
+        for recipe_id in recipe_ids.iterator(chunk_size=batch_size):
+            batch.append(recipe_id)
+            if len(batch) >= batch_size:
+                created += self.create_batch(batch)
+                batch = []
+        if batch:
+            created += self.create_batch(batch)
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Создано коротких ссылок: {created}')
+        )
+
+    def create_batch(self, batch: list[int]) -> int:
+        """Сохраняет пакет ссылок, пропуская уже созданные.
+
+        Возвращает число действительно добавленных строк: ссылки,
+        созданные параллельно, вставка пропускает без ошибки.
+        """
+        links = ShortLink.objects.filter(recipe_id__in=batch)
+        existing = links.count()
+        create_short_links(batch)
+        created = links.count() - existing
+        self.stdout.write(
+            f'  Обработано рецептов: {len(batch)}, добавлено: {created}'
+        )
+        return created
@@ -1,57 +1,315 @@
+import csv
+import io
+import multiprocessing
 import os
+import sys
+import time
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from itertools import chain, islice
 from typing import Any
 
 from django.conf import settings
-from django.core.management.base import BaseCommand, CommandError
-from django.db import models
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.db import connection, connections, models, transaction
+
+from core.constants import (
+    IMPORT_BATCH_SIZE,
+    IMPORT_PROGRESS_INTERVAL,
+    IMPORT_STAGING_TABLE,
+)
 
 FILE_DIR = os.path.join(settings.BASE_DIR, 'data')
 
 
+def iter_batches(iterable: Iterable, size: int) -> Iterator[list]:
+    """Разбивает поток на списки не длиннее size."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class CopyStream(io.TextIOBase):
+    """Файлоподобный поток CSV-строк для COPY ... FROM STDIN.
+
+    Строки формируются по мере чтения, поэтому файл импорта не
+    загружается в память целиком.
+    """
+
+    def __init__(self, rows: Iterable[list]):
+        self.rows = iter(rows)
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator='\n')
+        self.pending = ''
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self.pending) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.writer.writerow(row)
+            self.pending += self.buffer.getvalue()
+            self.buffer.seek(0)
+            self.buffer.truncate()
+        if size < 0:
+            size = len(self.pending)
+        chunk, self.pending = self.pending[:size], self.pending[size:]
+        return chunk
+
+
 class BaseImportCommand(BaseCommand, ABC):
-    """Базовая команда импорта данных из файлов в БД."""
+    """Базовая команда импорта данных из файлов в БД.
+
+    Файлы читаются потоково и вставляются партиями через
+    bulk_create(ignore_conflicts=True): строки, нарушающие уникальность,
+    пропускаются базой без отдельного запроса на каждую строку. Файлы
+    разных моделей загружаются параллельно в дочерних процессах.
+    """
 
     help = 'Базовый класс для импорта данных из файлов.'
     files = {}
 
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=(
+                'Количество строк в одном INSERT '
+                f'(по умолчанию {IMPORT_BATCH_SIZE})'
+            ),
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help=(
+                'Количество процессов для параллельного импорта '
+                '(по умолчанию — по числу ядер)'
+            ),
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help=(
+                'Загружать данные через COPY во временную таблицу '
+                '(только PostgreSQL)'
+            ),
+        )
+
     def handle(self, *args, **options):
-        for file_name, model in self.files.items():
-            file_path = os.path.join(FILE_DIR, file_name)
-            self.stdout.write(f'🔍 Обработка файла: {file_path}')
-
-            try:
-                if not os.path.exists(file_path):
-                    raise FileNotFoundError('Файл не найден')
-
-                data = self.load_data(file_path)
-                if not isinstance(data, list):
-                    raise TypeError('Данные должны быть списком объектов')
-
-                self.import_data(model, data)
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'✅ Успешно импортировано {len(data)} записей '
-                        f'для {model.__name__} из {file_name}'
-                    )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers должен быть положительным')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy поддерживается только в PostgreSQL')
+        groups = self.group_files(self.get_files_to_process(options))
+        workers = min(options['workers'] or os.cpu_count() or 1, len(groups))
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite допускает одного писателя: процессы только мешали бы
+            # друг другу блокировками.
+            self.stdout.write(
+                self.style.WARNING(
+                    '⚠️ SQLite не поддерживает параллельную запись, '
+                    'файлы будут импортированы последовательно.'
                 )
+            )
+            workers = 1
+        if workers <= 1:
+            for group in groups:
+                self.import_files(group, options)
+            return
+        self.stdout.write(f'🚀 Параллельный импорт: процессов {workers}')
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(
+                target=self.run_import_process,
+                args=([*chain(*groups[number::workers])], options),
+            )
+            for number in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        if any(process.exitcode for process in processes):
+            raise CommandError('⛔ Импорт части файлов завершился с ошибкой')
 
-            except Exception as e:
-                raise CommandError(
-                    f'⛔ Ошибка при обработке {file_name}: {e}'
-                ) from e
+    def group_files(
+        self, files: dict[str, type[models.Model]]
+    ) -> list[list[tuple[str, type[models.Model]]]]:
+        """Группирует файлы по модели.
 
-    def import_data(self, model: type[models.Model], data: list[dict]):
-        """Основная логика импорта данных в модель."""
-        required_fields = self.get_required_fields(model)
+        Файлы одной модели загружаются последовательно в одном процессе:
+        параллельные вставки пересекающихся уникальных значений могут
+        взаимно блокироваться.
+        """
+        groups = {}
+        for file_name, model in files.items():
+            groups.setdefault(model, []).append((file_name, model))
+        return list(groups.values())
+
+    def import_files(
+        self, files: list[tuple[str, type[models.Model]]], options: dict
+    ):
+        """Импортирует файлы по очереди."""
+        for file_name, model in files:
+            self.import_file(file_name, model, options)
+
+    def run_import_process(
+        self, files: list[tuple[str, type[models.Model]]], options: dict
+    ):
+        """Точка входа дочернего процесса импорта."""
+        try:
+            self.import_files(files, options)
+        except CommandError as e:
+            self.stderr.write(str(e))
+            sys.exit(1)
+        finally:
+            connections.close_all()
+
+    def get_files_to_process(self, options) -> dict[str, type[models.Model]]:
+        """Возвращает файлы для обработки; по умолчанию — все."""
+        return self.files
+
+    def import_file(
+        self, file_name: str, model: type[models.Model], options: dict
+    ):
+        """Импортирует один файл в отдельной транзакции.
+
+        При ошибке изменения файла откатываются целиком.
+        """
+        file_path = os.path.join(FILE_DIR, file_name)
+        self.stdout.write(f'🔍 Обработка файла: {file_path}')
+        started = time.monotonic()
+        try:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError('Файл не найден')
+
+            rows = self.load_data(file_path, model)
+            with transaction.atomic():
+                if options['copy']:
+                    processed, created = self.copy_data(model, rows)
+                else:
+                    processed, created = self.import_data(
+                        model, rows, options['batch_size']
+                    )
+        except Exception as e:
+            raise CommandError(
+                f'⛔ Ошибка при обработке {file_name}: {e}'
+            ) from e
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ {model.__name__} из {file_name}: обработано '
+                f'{processed}, добавлено {created}, пропущено '
+                f'{processed - created} за '
+                f'{time.monotonic() - started:.1f} с'
+            )
+        )
+
+    def import_data(
+        self,
+        model: type[models.Model],
+        data: Iterable[dict],
+        batch_size: int,
+    ) -> tuple[int, int]:
+        """Вставляет данные партиями и возвращает (обработано, добавлено).
+
+        Количество добавленных строк считается по разнице числа записей
+        до и после импорта, так как bulk_create с ignore_conflicts не
+        сообщает, какие строки были пропущены.
+        """
+        before = model.objects.count()
+        processed = 0
+        progress = self.get_progress_reporter(model)
+        for batch in iter_batches(self.clean_rows(model, data), batch_size):
+            model.objects.bulk_create(
+                [model(**item) for item in batch], ignore_conflicts=True
+            )
+            processed += len(batch)
+            progress(processed)
+        return processed, model.objects.count() - before
+
+    def copy_data(
+        self, model: type[models.Model], data: Iterable[dict]
+    ) -> tuple[int, int]:
+        """Загружает данные через COPY во временную таблицу и сливает их.
+
+        Строки копируются в таблицу без ограничений, затем одним
+        INSERT ... SELECT ... ON CONFLICT DO NOTHING переносятся в
+        таблицу модели. Возвращает (обработано, добавлено).
+        """
+        fields = self.get_required_fields(model)
+        columns = ', '.join(
+            connection.ops.quote_name(model._meta.get_field(name).column)
+            for name in fields
+        )
+        table = connection.ops.quote_name(model._meta.db_table)
+        staging = connection.ops.quote_name(IMPORT_STAGING_TABLE)
+        processed = 0
+        progress = self.get_progress_reporter(model)
 
+        def rows():
+            nonlocal processed
+            for item in self.clean_rows(model, data):
+                processed += 1
+                progress(processed)
+                yield [item[name] for name in fields]
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA'
+            )
+            cursor.copy_expert(
+                f'COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                CopyStream(rows()),
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT DISTINCT {columns} FROM {staging} '
+                'ON CONFLICT DO NOTHING'
+            )
+            created = cursor.rowcount
+        return processed, created
+
+    def get_progress_reporter(self, model: type[models.Model]):
+        """Возвращает функцию, выводящую сводку не чаще интервала."""
+        started = last = time.monotonic()
+
+        def report(processed: int):
+            nonlocal last
+            now = time.monotonic()
+            if now - last < IMPORT_PROGRESS_INTERVAL:
+                return
+            last = now
+            self.stdout.write(
+                f'  {model.__name__}: обработано {processed} '
+                f'({processed / (now - started):.0f} строк/с)'
+            )
+
+        return report
+
+    def clean_rows(
+        self, model: type[models.Model], data: Iterable[dict]
+    ) -> Iterator[dict]:
+        """Очищает и проверяет строки по мере чтения."""
+        required_fields = self.get_required_fields(model)
         for item in data:
+            if not isinstance(item, dict):
+                raise TypeError('Данные должны быть списком объектов')
             cleaned_data = self.clean_item_data(item)
             self.validate_fields(cleaned_data, required_fields, model.__name__)
-
-            obj, created = model.objects.get_or_create(**cleaned_data)
-            status = 'Создан' if created else 'Обновлен'
-            self.stdout.write(f'  {status}: {obj}')
+            yield cleaned_data
 
     def clean_item_data(self, item_data: dict) -> dict:
         """Очистка и нормализация данных перед импортом."""
@@ -80,6 +338,8 @@ class BaseImportCommand(BaseCommand, ABC):
             )
 
     @abstractmethod
-    def load_data(self, file_path: str) -> list[dict[str, Any]]:
-        """Загрузка данных из файла."""
+    def load_data(
+        self, file_path: str, model: type[models.Model]
+    ) -> Iterator[dict[str, Any]]:
+        """Потоковое чтение строк из файла."""
         raise NotImplementedError
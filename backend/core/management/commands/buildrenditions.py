@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connections
+
+from core.constants import (
+    AVATAR_RENDITION_WIDTHS,
+    RECIPE_IMAGE_RENDITION_WIDTHS,
+)
+from core.images import generate_renditions, needs_renditions
+from recipes.cache import invalidate_recipe_fragments
+from recipes.models import Recipe
+from users.models import User
+
+RENDITION_SOURCES = (
+    (Recipe, 'image', RECIPE_IMAGE_RENDITION_WIDTHS),
+    (User, 'avatar', AVATAR_RENDITION_WIDTHS),
+)
+
+
+class Command(BaseCommand):
+    """Построение вариантов для изображений, загруженных ранее."""
+
+    help = 'Строит недостающие варианты изображений рецептов и аватаров'
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.TASK_WORKER_THREADS,
+            help='Количество потоков обработки',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Перестроить варианты, даже если они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        built = {}
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for model, field_name, widths in RENDITION_SOURCES:
+                pks = [
+                    instance.pk
+                    for instance in model.objects.exclude(
+                        **{field_name: ''}
+                    ).exclude(**{f'{field_name}__isnull': True})
+                    if options['force']
+                    or needs_renditions(instance, field_name)
+                ]
+                results = executor.map(
+                    partial(self.build, model, field_name, widths), pks
+                )
+                built[model] = [
+                    pk
+                    for pk, result in zip(pks, results, strict=True)
+                    if result
+                ]
+                self.stdout.write(
+                    f'  {model._meta.verbose_name_plural}: '
+                    f'{len(built[model])} из {len(pks)}'
+                )
+        invalidate_recipe_fragments(built[Recipe])
+        invalidate_recipe_fragments(
+            Recipe.objects.filter(author_id__in=built[User]).values_list(
+                'pk', flat=True
+            )
+        )
+        self.stdout.write(self.style.SUCCESS('✅ Варианты изображений готовы'))
+
+    def build(self, model, field_name, widths, pk):
+        """Строит варианты одного объекта в потоке пула."""
+        try:
+            return generate_renditions(model, pk, field_name, widths)
+        except Exception as error:
+            self.stderr.write(f'❌ {model.__name__} id={pk}: {error}')
+            return False
+        finally:
+            connections.close_all()
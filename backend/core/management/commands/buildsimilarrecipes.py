@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+from recipes.similarity import rebuild_similar_recipes
+
+
+class Command(BaseCommand):
+    """Пересборка таблицы похожих рецептов."""
+
+    help = 'Пересчитывает похожие рецепты по TF-IDF-векторам ингредиентов'
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            default=settings.SIMILAR_RECIPES_BLOCK_SIZE,
+            help='Количество рецептов, записываемых в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        processed = rebuild_similar_recipes(
+            options['block_size'],
+            progress=lambda count: self.stdout.write(
+                f'  Обработано рецептов: {count}'
+            ),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Похожие рецепты пересчитаны: {processed}')
+        )
@@ -1,13 +1,51 @@
 import csv
 import json
-import os
+import re
+from collections.abc import Iterator
+from typing import IO
 
-from django.core.management.base import CommandError, CommandParser
+from django.core.management.base import CommandParser
 from django.db import models
 
-from core.management.commands.baseimport import FILE_DIR, BaseImportCommand
+from core.constants import IMPORT_READ_CHUNK_SIZE
+from core.management.commands.baseimport import BaseImportCommand
 from recipes.models import Ingredient, Tag
 
+ARRAY_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_json_array(
+    file: IO[str], chunk_size: int = IMPORT_READ_CHUNK_SIZE
+) -> Iterator:
+    """Читает элементы JSON-массива верхнего уровня по одному.
+
+    Файл читается блоками по chunk_size символов, в памяти держится
+    только непрочитанный остаток блока.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise TypeError('JSON должен содержать список объектов')
+    position, eof = 1, False
+    while True:
+        position = ARRAY_SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            end = None
+        # Значение в конце блока может быть обрезано: дочитываем файл.
+        if not eof and (end is None or end == len(buffer)):
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item
+        position = end
+
 
 class Command(BaseImportCommand):
     """Универсальный импорт данных из файлов различных форматов."""
@@ -22,6 +60,7 @@ class Command(BaseImportCommand):
     }
 
     def add_arguments(self, parser: CommandParser):
+        super().add_arguments(parser)
         parser.add_argument(
             '--format',
             choices=['json', 'csv', 'all'],
@@ -32,33 +71,6 @@ class Command(BaseImportCommand):
             '--files', nargs='+', help='Список конкретных файлов для импорта'
         )
 
-    def handle(self, *args, **options):
-        files_to_process = self.get_files_to_process(options)
-
-        for file_name, model in files_to_process.items():
-            file_path = os.path.join(FILE_DIR, file_name)
-            self.stdout.write(f'🔍 Обработка файла: {file_path}')
-
-            try:
-                if not os.path.exists(file_path):
-                    raise FileNotFoundError('Файл не найден')
-
-                data = self.load_data(file_path)
-                if not isinstance(data, list):
-                    raise TypeError('Данные должны быть списком объектов')
-
-                self.import_data(model, data)
-                msg = (
-                    f'✅ Успешно импортировано {len(data)} записей '
-                    f'для {model.__name__} из {file_name}'
-                )
-                self.stdout.write(self.style.SUCCESS(msg))
-
-            except Exception as e:
-                raise CommandError(
-                    f'⛔ Ошибка при обработке {file_name}: {e}'
-                ) from e
-
     def get_files_to_process(self, options) -> dict[str, type[models.Model]]:
         """Возвращает список файлов для обработки на основе параметров."""
         selected_files = {}
@@ -83,29 +95,56 @@ class Command(BaseImportCommand):
 
         return selected_files
 
-    def load_data(self, file_path: str) -> list[dict]:
-        """Определяет формат файла и загружает данные."""
+    def load_data(
+        self, file_path: str, model: type[models.Model]
+    ) -> Iterator[dict]:
+        """Определяет формат файла и возвращает поток строк."""
         if file_path.endswith('.csv'):
-            return self.load_csv(file_path)
+            return self.load_csv(file_path, self.get_required_fields(model))
         elif file_path.endswith('.json'):
             return self.load_json(file_path)
         raise ValueError('Неподдерживаемый формат файла')
 
-    def load_csv(self, file_path: str) -> list[dict]:
-        """Загрузка данных из CSV файла."""
+    def load_csv(
+        self, file_path: str, fieldnames: list[str]
+    ) -> Iterator[dict]:
+        """Потоковое чтение CSV файла.
+
+        Если первая строка не содержит названий полей модели, файл
+        считается файлом без заголовка с колонками в порядке fieldnames.
+        """
         try:
-            with open(file_path, encoding='utf-8') as f:
-                return list(csv.DictReader(f))
+            with open(file_path, encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                first = next(reader, None)
+                if first is None:
+                    return
+                header = [value.strip() for value in first]
+                if not set(fieldnames) <= set(header):
+                    header = fieldnames
+                    yield self.make_csv_row(header, first, reader.line_num)
+                for row in reader:
+                    if row:
+                        yield self.make_csv_row(header, row, reader.line_num)
         except (OSError, csv.Error) as e:
             raise ValueError(f'Ошибка CSV: {e}') from e
 
-    def load_json(self, file_path: str) -> list[dict]:
-        """Загрузка данных из JSON файла."""
+    def make_csv_row(
+        self, header: list[str], row: list[str], line_num: int
+    ) -> dict:
+        """Сопоставляет значения строки CSV с полями заголовка."""
+        try:
+            return dict(zip(header, row, strict=True))
+        except ValueError:
+            raise ValueError(
+                f'Ошибка CSV: в строке {line_num} значений {len(row)}, '
+                f'ожидалось {len(header)}'
+            ) from None
+
+    def load_json(self, file_path: str) -> Iterator[dict]:
+        """Потоковое чтение JSON файла со списком объектов."""
         try:
             with open(file_path, encoding='utf-8') as f:
-                data = json.load(f)
-                if not isinstance(data, list):
-                    raise TypeError('JSON должен содержать список объектов')
-                return data
+                yield from iter_json_array(f)
         except (OSError, json.JSONDecodeError) as e:
             raise ValueError(f'Ошибка JSON: {e}') from e
@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+
+from recipes.models import ShoppingListItem
+from recipes.utils import calculate_shopping_list_totals
+
+
+class Command(BaseCommand):
+    """Пересборка или проверка материализованных списков покупок."""
+
+    help = 'Пересобирает таблицу ShoppingListItem или проверяет её'
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить таблицу с расчётом, не изменяя данные',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета для bulk_create (по умолчанию 1000)',
+        )
+
+    def handle(self, *args, **options):
+        expected = calculate_shopping_list_totals()
+        if options['verify']:
+            self.verify(expected)
+            return
+
+        with transaction.atomic():
+            ShoppingListItem.objects.all().delete()
+            ShoppingListItem.objects.bulk_create(
+                (
+                    ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        total_amount=total_amount,
+                    )
+                    for (user_id, ingredient_id), total_amount in (
+                        expected.items()
+                    )
+                ),
+                batch_size=options['batch_size'],
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Списки покупок пересобраны: {len(expected)} позиций'
+            )
+        )
+
+    def verify(self, expected: dict[tuple[int, int], int]):
+        """Выводит расхождения между таблицей и расчётом."""
+        actual = {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount in (
+                ShoppingListItem.objects.values_list(
+                    'user_id', 'ingredient_id', 'total_amount'
+                ).iterator()
+            )
+        }
+        mismatches = 0
+        for key in expected.keys() | actual.keys():
+            if expected.get(key) != actual.get(key):
+                mismatches += 1
+                user_id, ingredient_id = key
+                self.stdout.write(
+                    f'  Пользователь {user_id}, ингредиент {ingredient_id}: '
+                    f'ожидается {expected.get(key)}, в таблице '
+                    f'{actual.get(key)}'
+                )
+        if mismatches:
+            self.stdout.write(
+                self.style.WARNING(f'⚠️ Найдено расхождений: {mismatches}')
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS('✅ Списки покупок согласованы')
+            )
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import models
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe
+from users.models import Follow, User
+
+
+def count_subquery(model: type[models.Model], field: str) -> Coalesce:
+    """Подзапрос количества строк model, ссылающихся на внешнюю запись."""
+    return Coalesce(
+        models.Subquery(
+            model.objects.filter(**{field: models.OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=models.Count('pk'))
+            .values('count')
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    """Сверка денормализованных счётчиков с фактическими данными."""
+
+    help = (
+        'Исправляет расхождения Recipe.favorites_count, '
+        'User.recipes_count и User.followers_count'
+    )
+
+    counters = (
+        (Recipe, 'favorites_count', Favorite, 'recipe'),
+        (User, 'recipes_count', Recipe, 'author'),
+        (User, 'followers_count', Follow, 'author'),
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только показать расхождения, не изменяя данные',
+        )
+
+    def handle(self, *args, **options):
+        for model, counter, related_model, field in self.counters:
+            actual = count_subquery(related_model, field)
+            drifted = (
+                model.objects.annotate(actual=actual)
+                .exclude(**{counter: models.F('actual')})
+                .values_list('pk', flat=True)
+            )
+            drifted_ids = list(drifted)
+            label = f'{model.__name__}.{counter}'
+            if not drifted_ids:
+                self.stdout.write(
+                    self.style.SUCCESS(f'✅ {label}: расхождений нет')
+                )
+                continue
+            if options['verify']:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'⚠️ {label}: расхождений {len(drifted_ids)}'
+                    )
+                )
+                continue
+            model.objects.filter(pk__in=drifted_ids).update(
+                **{counter: actual}
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'✅ {label}: исправлено записей {len(drifted_ids)}'
+                )
+            )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.trending import refresh_trending_scores
+
+
+class Command(BaseCommand):
+    """Пересчёт оценок популярности рецептов."""
+
+    help = (
+        'Добавляет к оценкам популярности новые записи избранного и '
+        'списков покупок (для ?ordering=trending)'
+    )
+
+    def handle(self, *args, **options):
+        updated = refresh_trending_scores()
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Обновлены оценки рецептов: {updated}')
+        )
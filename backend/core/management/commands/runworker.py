@@ -0,0 +1,121 @@
+import multiprocessing
+import signal
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connections
+
+from core.tasks import run_purger, run_worker
+
+
+class Command(BaseCommand):
+    """Воркер локальной очереди задач."""
+
+    help = 'Выполняет задачи из очереди в базе данных'
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.TASK_WORKER_THREADS,
+            help='Количество потоков в каждом процессе',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.TASK_WORKER_PROCESSES,
+            help='Количество процессов воркера',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.TASK_POLL_INTERVAL,
+            help='Пауза между опросами пустой очереди, в секундах',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Завершиться, когда очередь опустеет',
+        )
+        parser.add_argument(
+            '--purge-older-than',
+            type=float,
+            default=settings.TASK_RETENTION_HOURS,
+            help=(
+                'Удалять выполненные задачи старше указанного числа часов '
+                '(0 — не удалять)'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        worker_args = (
+            stop,
+            options['threads'],
+            options['poll_interval'],
+            options['burst'],
+        )
+        self.stdout.write(
+            f'🚀 Воркер запущен: процессов {options["processes"]}, '
+            f'потоков {options["threads"]}'
+        )
+        if options['processes'] > 1:
+            connections.close_all()
+            processes = [
+                context.Process(target=run_threads, args=worker_args)
+                for _ in range(options['processes'])
+            ]
+            for process in processes:
+                process.start()
+            purger = self.start_purger(stop, options)
+            for process in processes:
+                process.join()
+        else:
+            purger = self.start_purger(stop, options)
+            run_threads(*worker_args)
+        if purger is not None:
+            stop.set()
+            purger.join()
+        self.stdout.write(self.style.SUCCESS('✅ Воркер остановлен'))
+
+    def start_purger(self, stop, options):
+        """Запускает поток очистки выполненных задач.
+
+        Поток работает в основном процессе и стартует после fork, чтобы
+        не делить соединение с базой с дочерними процессами. В режиме
+        burst и при --purge-older-than=0 очистка не запускается.
+        """
+        if options['burst'] or options['purge_older_than'] <= 0:
+            return None
+        purger = threading.Thread(
+            target=run_purger,
+            args=(
+                stop,
+                timedelta(hours=options['purge_older_than']),
+                settings.TASK_PURGE_INTERVAL,
+            ),
+            name='purger',
+        )
+        purger.start()
+        return purger
+
+
+def run_threads(stop, threads, poll_interval, burst):
+    """Запускает циклы воркера в нескольких потоках и ждёт их."""
+    workers = [
+        threading.Thread(
+            target=run_worker,
+            args=(stop, poll_interval, burst),
+            name=f'worker-{number}',
+        )
+        for number in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
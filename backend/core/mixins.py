@@ -0,0 +1,93 @@
+from core.constants import FIELDS_QUERY_PARAM, OMIT_QUERY_PARAM
+from core.serializers import DynamicFieldsMixin
+from users.models import Follow
+
+
+def parse_field_names(value):
+    """Разбирает список имён полей, разделённых запятыми."""
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class Subscriptions:
+    """Подписки пользователя на авторов текущей страницы.
+
+    Списочные сериализаторы заранее сообщают id авторов страницы через
+    expect. При первой проверке подписки на всех ожидаемых, но ещё не
+    проверенных авторов загружаются одним запросом с author_id__in.
+    Автор вне ожидаемых проверяется отдельным запросом.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.expected = set()
+        self.checked = set()
+        self.followed = set()
+
+    def expect(self, author_ids):
+        """Добавляет авторов, подписки на которых понадобятся."""
+        self.expected.update(author_ids)
+
+    def __contains__(self, author_id):
+        if self.user is None:
+            return False
+        if author_id not in self.checked:
+            author_ids = (self.expected - self.checked) | {author_id}
+            self.followed.update(
+                Follow.objects.filter(
+                    user=self.user, author_id__in=author_ids
+                ).values_list('author_id', flat=True)
+            )
+            self.checked |= author_ids
+        return author_id in self.followed
+
+
+class SubscriptionsContextMixin:
+    """Добавляет в контекст сериализатора подписки текущего пользователя.
+
+    Объект Subscriptions общий для всех вложенных сериализаторов
+    страницы, поэтому подписки на её авторов загружаются один раз.
+    """
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        user = self.request.user
+        context['subscriptions'] = Subscriptions(
+            user if user.is_authenticated else None
+        )
+        return context
+
+
+class SparseFieldsMixin:
+    """Передаёт выбор полей из ?fields= / ?omit= в сериализатор.
+
+    Работает для действий из sparse_fields_actions и сериализаторов,
+    поддерживающих DynamicFieldsMixin.
+    """
+
+    sparse_fields_actions = ('list', 'retrieve')
+
+    def get_field_selection(self):
+        """Возвращает пару (fields, omit) из параметров запроса."""
+        if self.action not in self.sparse_fields_actions:
+            return None, set()
+        params = self.request.query_params
+        fields = params.get(FIELDS_QUERY_PARAM)
+        omit = params.get(OMIT_QUERY_PARAM, '')
+        return (
+            parse_field_names(fields) if fields is not None else None,
+            parse_field_names(omit),
+        )
+
+    def is_field_requested(self, field_name):
+        """Проверяет, попадёт ли поле в ответ."""
+        fields, omit = self.get_field_selection()
+        return (fields is None or field_name in fields) and (
+            field_name not in omit
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), DynamicFieldsMixin):
+            fields, omit = self.get_field_selection()
+            kwargs.setdefault('fields', fields)
+            kwargs.setdefault('omit', omit)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,84 @@
+from django.db import models
+from django.utils import timezone
+
+from core.constants import (
+    TASK_DEFAULT_MAX_ATTEMPTS,
+    TASK_NAME_MAX_LENGTH,
+    TASK_STATUS_MAX_LENGTH,
+    TASK_STATUS_RUN_AT_INDEX,
+)
+
+
+class Task(models.Model):
+    """Задача локальной очереди, выполняемая командой runworker."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Ожидает'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        FAILED = 'failed', 'Ошибка'
+
+    name = models.CharField(
+        'Задача',
+        max_length=TASK_NAME_MAX_LENGTH,
+    )
+    args = models.JSONField(
+        'Аргументы',
+        default=list,
+        blank=True,
+    )
+    kwargs = models.JSONField(
+        'Именованные аргументы',
+        default=dict,
+        blank=True,
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=TASK_STATUS_MAX_LENGTH,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'Попытки',
+        default=0,
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток',
+        default=TASK_DEFAULT_MAX_ATTEMPTS,
+    )
+    run_at = models.DateTimeField(
+        'Запустить после',
+        default=timezone.now,
+    )
+    locked_until = models.DateTimeField(
+        'Заблокирована до',
+        blank=True,
+        null=True,
+    )
+    last_error = models.TextField(
+        'Последняя ошибка',
+        blank=True,
+    )
+    created_at = models.DateTimeField(
+        'Создана',
+        auto_now_add=True,
+    )
+    finished_at = models.DateTimeField(
+        'Завершена',
+        blank=True,
+        null=True,
+    )
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        ordering = ('run_at', 'id')
+        indexes = [
+            models.Index(
+                fields=('status', 'run_at'),
+                name=TASK_STATUS_RUN_AT_INDEX,
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -1,7 +1,125 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from core.constants import RECIPE_ORDERING_QUERY_PARAM, RECIPE_ORDERINGS
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
     max_page_size = 100
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset-пагинация ленты рецептов.
+
+    Не выполняет COUNT(*) и OFFSET, поэтому стоимость страницы не зависит
+    от её номера. Порядок берётся из ?ordering= (RECIPE_ORDERINGS), по
+    умолчанию (-pub_date, -id); каждый порядок заканчивается на id и
+    совпадает со своим индексом. Курсор хранит значения всех полей
+    порядка последней строки, следующая страница выбирается сравнением
+    кортежей.
+    """
+
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = ('-pub_date', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        """Порядок, выбранный фильтром ?ordering=, или порядок по дате."""
+        return RECIPE_ORDERINGS.get(
+            request.query_params.get(RECIPE_ORDERING_QUERY_PARAM),
+            self.ordering,
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(
+                *(self.reverse_field(field) for field in self.ordering)
+            )
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(
+                self.get_keyset_filter(current_position, reverse)
+            )
+
+        end = offset + self.page_size + 1
+        results = list(queryset[offset:end])
+        self.page = results[: self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering)
+            if has_following_position
+            else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    @staticmethod
+    def reverse_field(field):
+        """Меняет направление сортировки поля."""
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def get_keyset_filter(self, position, reverse):
+        """Условие «строка после позиции» для кортежа полей порядка.
+
+        Раскрывает (a, b, c) < (x, y, z) в a < x OR (a = x AND b < y)
+        OR ...; отдельное условие a <= x позволяет базе ограничить
+        диапазон по первому столбцу индекса.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message) from None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        conditions, equal = [], Q()
+        for field, value in zip(self.ordering, values, strict=True):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            conditions.append(equal & Q(**{f'{name}__{lookup}': value}))
+            equal &= Q(**{name: value})
+        first = self.ordering[0].lstrip('-')
+        bound = 'lte' if self.ordering[0].startswith('-') != reverse else 'gte'
+        return Q(**{f'{first}__{bound}': values[0]}) & reduce(or_, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = [getattr(instance, field.lstrip('-')) for field in ordering]
+        return json.dumps(
+            [
+                value.isoformat() if hasattr(value, 'isoformat') else value
+                for value in values
+            ]
+        )
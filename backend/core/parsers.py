@@ -0,0 +1,38 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from core.constants import NDJSON_MEDIA_TYPE, RECIPE_BULK_MAX_ITEMS_ERROR
+
+
+class NDJSONParser(BaseParser):
+    """Разбирает тело в формате NDJSON: один JSON-объект на строку.
+
+    Тело читается построчно, пустые строки пропускаются. Возвращает
+    список объектов; разбор прерывается, как только объектов становится
+    больше RECIPE_BULK_MAX_ITEMS.
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if len(items) == settings.RECIPE_BULK_MAX_ITEMS:
+                raise ParseError(
+                    RECIPE_BULK_MAX_ITEMS_ERROR.format(
+                        max_items=settings.RECIPE_BULK_MAX_ITEMS
+                    )
+                )
+            try:
+                items.append(json.loads(line.decode(encoding)))
+            except ValueError as error:
+                raise ParseError(f'Строка {number}: {error}') from error
+        return items
@@ -0,0 +1,16 @@
+class DynamicFieldsMixin:
+    """Позволяет ограничить набор полей сериализатора.
+
+    Принимает необязательные аргументы fields (оставить только эти поля)
+    и omit (исключить эти поля). Неизвестные имена игнорируются.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        omit = kwargs.pop('omit', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+        for field_name in omit or ():
+            self.fields.pop(field_name, None)
@@ -0,0 +1,215 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (
+    DatabaseError,
+    close_old_connections,
+    connections,
+    transaction,
+)
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.constants import TASK_PURGE_BATCH_SIZE
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(func):
+    """Регистрирует функцию как задачу локальной очереди.
+
+    Добавляет функции методы delay(*args, **kwargs), который ставит вызов
+    в очередь, и delay_many(args_list) для нескольких вызовов сразу.
+    Аргументы должны сериализоваться в JSON.
+    """
+    name = f'{func.__module__}.{func.__qualname__}'
+    registry[name] = func
+    func.task_name = name
+    func.delay = lambda *args, **kwargs: enqueue(name, args, kwargs)
+    func.delay_many = lambda args_list: enqueue_many(name, args_list)
+    return func
+
+
+def enqueue(name, args=(), kwargs=None, run_at=None):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Строка задачи фиксируется вместе с данными, которые её породили,
+    поэтому воркер не увидит задачу раньше этих данных. При
+    TASK_QUEUE_EAGER задача выполняется сразу после фиксации транзакции.
+    """
+    if settings.TASK_QUEUE_EAGER:
+        func = get_task_function(name)
+        transaction.on_commit(lambda: func(*args, **(kwargs or {})))
+        return None
+    return Task.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs or {},
+        run_at=run_at or timezone.now(),
+    )
+
+
+def enqueue_many(name, args_list):
+    """Ставит в очередь несколько вызовов задачи одним INSERT."""
+    if settings.TASK_QUEUE_EAGER:
+        for args in args_list:
+            enqueue(name, args)
+        return
+    now = timezone.now()
+    Task.objects.bulk_create(
+        Task(name=name, args=list(args), run_at=now) for args in args_list
+    )
+
+
+def get_task_function(name):
+    """Возвращает зарегистрированную функцию задачи по имени."""
+    if name not in registry:
+        import_string(name)
+    return registry[name]
+
+
+def claim_task():
+    """Забирает одну готовую к выполнению задачу или возвращает None.
+
+    Строка выбирается через SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+    параллельные воркеры не ждут друг друга. Задача в статусе running с
+    истёкшим locked_until считается потерянной и выдаётся повторно.
+    Обновление с условием на attempts защищает от двойной выдачи на
+    базах без блокировки строк (SQLite).
+    """
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            claimed = (
+                Task.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=Task.Status.PENDING, run_at__lte=now)
+                    | Q(status=Task.Status.RUNNING, locked_until__lt=now)
+                )
+                .order_by('run_at', 'id')
+                .first()
+            )
+            if claimed is None:
+                return None
+            claimed.attempts += 1
+            claimed.status = Task.Status.RUNNING
+            claimed.locked_until = now + timedelta(
+                seconds=settings.TASK_VISIBILITY_TIMEOUT
+            )
+            updated = Task.objects.filter(
+                pk=claimed.pk, attempts=claimed.attempts - 1
+            ).update(
+                attempts=claimed.attempts,
+                status=claimed.status,
+                locked_until=claimed.locked_until,
+            )
+        if updated:
+            return claimed
+
+
+def execute_task(claimed):
+    """Выполняет задачу и сохраняет результат.
+
+    При ошибке задача возвращается в очередь с экспоненциальной
+    задержкой, пока не исчерпаны попытки. Возвращает True при успехе.
+    """
+    current = Task.objects.filter(pk=claimed.pk, attempts=claimed.attempts)
+    try:
+        if claimed.attempts > claimed.max_attempts:
+            raise TimeoutError('Превышено время блокировки задачи')
+        func = get_task_function(claimed.name)
+        func(*claimed.args, **claimed.kwargs)
+    except Exception:
+        logger.exception('Задача %s завершилась с ошибкой', claimed)
+        now = timezone.now()
+        if claimed.attempts < claimed.max_attempts:
+            delay = settings.TASK_RETRY_DELAY * 2 ** (claimed.attempts - 1)
+            current.update(
+                status=Task.Status.PENDING,
+                run_at=now + timedelta(seconds=delay),
+                locked_until=None,
+                last_error=traceback.format_exc(),
+            )
+        else:
+            current.update(
+                status=Task.Status.FAILED,
+                finished_at=now,
+                locked_until=None,
+                last_error=traceback.format_exc(),
+            )
+        return False
+    current.update(
+        status=Task.Status.DONE,
+        finished_at=timezone.now(),
+        locked_until=None,
+    )
+    return True
+
+
+def purge_finished_tasks(older_than):
+    """Удаляет выполненные задачи, завершившиеся раньше older_than назад.
+
+    Строки удаляются пакетами по TASK_PURGE_BATCH_SIZE, чтобы не держать
+    долгих блокировок. Задачи с ошибкой остаются для разбора. Условие на
+    run_at позволяет пройти по индексу (status, run_at): задача не
+    завершается раньше, чем запускается. Возвращает число удалённых.
+    """
+    cutoff = timezone.now() - older_than
+    finished = Task.objects.filter(
+        status=Task.Status.DONE,
+        run_at__lt=cutoff,
+        finished_at__lt=cutoff,
+    ).order_by()
+    deleted = 0
+    while ids := list(
+        finished.values_list('pk', flat=True)[:TASK_PURGE_BATCH_SIZE]
+    ):
+        deleted += Task.objects.filter(pk__in=ids).delete()[0]
+    return deleted
+
+
+def run_purger(stop, older_than, interval):
+    """Цикл очистки: при старте и раз в interval секунд удаляет задачи."""
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                deleted = purge_finished_tasks(older_than)
+            except DatabaseError:
+                logger.exception('Не удалось удалить выполненные задачи')
+            else:
+                if deleted:
+                    logger.info('Удалено выполненных задач: %s', deleted)
+            stop.wait(interval)
+    finally:
+        connections.close_all()
+
+
+def run_worker(stop, poll_interval, burst=False):
+    """Цикл воркера: забирает и выполняет задачи, пока не задан stop.
+
+    В режиме burst цикл завершается, когда очередь опустела.
+    """
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                claimed = claim_task()
+            except DatabaseError:
+                logger.exception('Не удалось получить задачу из очереди')
+                stop.wait(poll_interval)
+                continue
+            if claimed is not None:
+                execute_task(claimed)
+            elif burst:
+                break
+            else:
+                stop.wait(poll_interval)
+    finally:
+        connections.close_all()
@@ -53,17 +53,12 @@ class RecipeAdmin(admin.ModelAdmin):
     filter_horizontal = ('tags',)
     inlines = (RecipeIngredientInline,)
 
-    def favorites_count(self, obj):
-        return obj.favorites.count()
-
-    favorites_count.short_description = 'В избранном'
-
     def get_queryset(self, request):
         return (
             super()
             .get_queryset(request)
             .select_related('author')
-            .prefetch_related('tags', 'favorites')
+            .prefetch_related('tags')
         )
 
 
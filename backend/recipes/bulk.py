@@ -0,0 +1,208 @@
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Value
+
+from core.constants import RECIPE_IMAGE_RENDITION_WIDTHS
+from core.images import build_renditions
+from users.models import User
+
+from .models import Ingredient, Recipe, RecipeIngredient, Tag
+from .serializers import RecipeBulkItemSerializer
+from .utils import (
+    create_short_links,
+    push_recipe_to_feeds,
+    recipe_ingredients_changed,
+)
+
+
+def collect_ids(values):
+    """Приводит значения к int, пропуская некорректные."""
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def load_references(items):
+    """Находит существующие ингредиенты и теги пакета одним запросом.
+
+    Возвращает пару множеств (ingredient_ids, tag_ids).
+    """
+    ingredient_values, tag_values = [], []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        for ingredient in item.get('ingredients') or ():
+            if isinstance(ingredient, dict):
+                ingredient_values.append(ingredient.get('id'))
+        tags = item.get('tags')
+        if isinstance(tags, list):
+            tag_values.extend(tags)
+    ingredients = (
+        Ingredient.objects.filter(pk__in=collect_ids(ingredient_values))
+        .annotate(kind=Value('ingredient'))
+        .values_list('pk', 'kind')
+        .order_by()
+    )
+    tags = (
+        Tag.objects.filter(pk__in=collect_ids(tag_values))
+        .annotate(kind=Value('tag'))
+        .values_list('pk', 'kind')
+        .order_by()
+    )
+    references = {'ingredient': set(), 'tag': set()}
+    for pk, kind in ingredients.union(tags, all=True):
+        references[kind].add(pk)
+    return references['ingredient'], references['tag']
+
+
+class RecipeBulkLoader:
+    """Пакетное создание и обновление рецептов одного автора.
+
+    Рецепты обрабатываются партиями по RECIPE_BULK_BATCH_SIZE: партия
+    проверяется, затем новые рецепты, их ингредиенты, теги и короткие
+    ссылки вставляются через bulk_create в одной транзакции. При upsert
+    рецепт автора с тем же названием обновляется вместо создания.
+    """
+
+    def __init__(self, author, context, upsert=False):
+        self.author = author
+        self.context = context
+        self.upsert = upsert
+        self.existing = {}
+        self.queued_names = set()
+
+    def load(self, items):
+        """Загружает рецепты и возвращает результат по каждому элементу."""
+        ingredient_ids, tag_ids = load_references(items)
+        self.context = {
+            **self.context,
+            'ingredient_ids': ingredient_ids,
+            'tag_ids': tag_ids,
+        }
+        self.existing = self.get_existing_recipes(items)
+        results = []
+        batch_size = settings.RECIPE_BULK_BATCH_SIZE
+        for start in range(0, len(items), batch_size):
+            end = start + batch_size
+            batch = enumerate(items[start:end], start=start)
+            results.extend(self.load_batch(batch))
+        return results
+
+    def get_existing_recipes(self, items):
+        """Рецепты автора, которые будут обновлены, по названию."""
+        if not self.upsert:
+            return {}
+        names = {item.get('name') for item in items if isinstance(item, dict)}
+        recipes = Recipe.objects.filter(
+            author=self.author, name__in=names
+        ).order_by('pub_date')
+        return {recipe.name: recipe for recipe in recipes}
+
+    def load_batch(self, batch):
+        """Проверяет партию, обновляет найденные и создаёт новые рецепты."""
+        results = {}
+        to_create = []
+        for index, item in batch:
+            instance = None
+            if isinstance(item, dict):
+                instance = self.existing.get(item.get('name'))
+            serializer = RecipeBulkItemSerializer(
+                instance, data=item, context=self.context
+            )
+            if not serializer.is_valid():
+                results[index] = {
+                    'index': index,
+                    'status': 'error',
+                    'errors': serializer.errors,
+                }
+            elif instance is not None:
+                recipe = serializer.save()
+                results[index] = {
+                    'index': index,
+                    'status': 'updated',
+                    'id': recipe.pk,
+                }
+            elif self.upsert and item['name'] in self.queued_names:
+                results[index] = {
+                    'index': index,
+                    'status': 'error',
+                    'errors': {'name': ['Название повторяется в пакете.']},
+                }
+            else:
+                self.queued_names.add(item['name'])
+                to_create.append((index, serializer.validated_data))
+        recipes = self.create_recipes([data for _, data in to_create])
+        for (index, _), recipe in zip(to_create, recipes, strict=True):
+            results[index] = {
+                'index': index,
+                'status': 'created',
+                'id': recipe.pk,
+            }
+        return [results[index] for index in sorted(results)]
+
+    @transaction.atomic
+    def create_recipes(self, items):
+        """Вставляет рецепты и связанные строки пакетными запросами."""
+        if not items:
+            return []
+        recipes, ingredients, tags = [], [], []
+        for data in items:
+            data = dict(data)
+            ingredients.append(data.pop('ingredients'))
+            tags.append(data.pop('tags'))
+            recipes.append(Recipe(author=self.author, **data))
+        self.insert_recipes(recipes)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=item['id'],
+                amount=item['amount'],
+            )
+            for recipe, recipe_ingredients in zip(
+                recipes, ingredients, strict=True
+            )
+            for item in recipe_ingredients
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+            for recipe, recipe_tags in zip(recipes, tags, strict=True)
+            for tag_id in recipe_tags
+        )
+        create_short_links(recipe.pk for recipe in recipes)
+        push_recipe_to_feeds.delay_many([(recipe.pk,) for recipe in recipes])
+        recipe_ingredients_changed.send(
+            sender=Recipe, recipe_ids=[recipe.pk for recipe in recipes]
+        )
+        return recipes
+
+    def insert_recipes(self, recipes):
+        """Сохраняет рецепты и выполняет то, что делают их сигналы.
+
+        Если база не возвращает id из bulk_create (SQLite), рецепты
+        сохраняются по одному, и счётчик с вариантами изображений
+        обновляют обычные сигналы post_save.
+        """
+        connection = connections[Recipe.objects.db]
+        if not connection.features.can_return_rows_from_bulk_insert:
+            for recipe in recipes:
+                recipe.save()
+            return
+        Recipe.objects.bulk_create(recipes)
+        User.objects.filter(pk=self.author.pk).update(
+            recipes_count=F('recipes_count') + len(recipes)
+        )
+        build_renditions.delay_many(
+            [
+                (
+                    Recipe._meta.label,
+                    recipe.pk,
+                    'image',
+                    list(RECIPE_IMAGE_RENDITION_WIDTHS),
+                )
+                for recipe in recipes
+            ]
+        )
@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.cache import LocalLRUCache
+
+from .models import Recipe, ShortLink
+
+RECIPE_FRAGMENT_KEY = 'recipes:fragment:{}'
+
+
+def recipe_fragment_key(recipe_id):
+    """Ключ кэша независимого от пользователя представления рецепта."""
+    return RECIPE_FRAGMENT_KEY.format(recipe_id)
+
+
+def get_recipe_fragments(recipe_ids):
+    """Возвращает закэшированные фрагменты в виде {recipe_id: fragment}."""
+    keys = {
+        recipe_fragment_key(recipe_id): recipe_id for recipe_id in recipe_ids
+    }
+    return {
+        keys[key]: fragment for key, fragment in cache.get_many(keys).items()
+    }
+
+
+def set_recipe_fragments(fragments):
+    """Сохраняет фрагменты, переданные в виде {recipe_id: fragment}."""
+    cache.set_many(
+        {
+            recipe_fragment_key(recipe_id): fragment
+            for recipe_id, fragment in fragments.items()
+        },
+        settings.RECIPE_FRAGMENT_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_recipe_fragments(recipe_ids):
+    """Сбрасывает фрагменты рецептов после фиксации транзакции."""
+    keys = [recipe_fragment_key(recipe_id) for recipe_id in recipe_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_author_recipes(author_id):
+    """Сбрасывает фрагменты всех рецептов автора."""
+    invalidate_recipe_fragments(
+        Recipe.objects.filter(author_id=author_id).values_list('pk', flat=True)
+    )
+
+
+SHORT_LINK_KEY = 'recipes:short-link:{}'
+
+short_link_local_cache = LocalLRUCache(
+    settings.SHORT_LINK_LOCAL_CACHE_SIZE,
+    settings.SHORT_LINK_LOCAL_CACHE_TIMEOUT,
+)
+
+
+def short_link_key(short_code):
+    """Ключ общего кэша для соответствия короткого кода рецепту."""
+    return SHORT_LINK_KEY.format(short_code)
+
+
+def resolve_short_code(short_code):
+    """Возвращает id рецепта по короткому коду или None.
+
+    Сначала проверяется кэш процесса, затем общий кэш и только после
+    этого база данных.
+    """
+    recipe_id = short_link_local_cache.get(short_code)
+    if recipe_id is not None:
+        return recipe_id
+    key = short_link_key(short_code)
+    recipe_id = cache.get(key)
+    if recipe_id is None:
+        recipe_id = (
+            ShortLink.objects.filter(short_code=short_code)
+            .values_list('recipe_id', flat=True)
+            .first()
+        )
+        if recipe_id is None:
+            return None
+        cache.set(key, recipe_id, settings.SHORT_LINK_CACHE_TIMEOUT)
+    short_link_local_cache.set(short_code, recipe_id)
+    return recipe_id
+
+
+def invalidate_short_link(short_code):
+    """Сбрасывает закэшированный короткий код после фиксации транзакции."""
+
+    def delete():
+        short_link_local_cache.delete(short_code)
+        cache.delete(short_link_key(short_code))
+
+    transaction.on_commit(delete)
@@ -1,5 +1,7 @@
 import django_filters
 
+from core.constants import RECIPE_ORDERINGS
+
 from .models import Ingredient, Recipe, Tag
 
 
@@ -16,10 +18,20 @@ class RecipeFilter(django_filters.FilterSet):
     is_in_shopping_cart = django_filters.CharFilter(
         method='filter_is_in_shopping_cart'
     )
+    ordering = django_filters.ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_ORDERINGS],
+        method='filter_ordering',
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags',
+            'author',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'ordering',
+        )
 
     def filter_is_favorited(self, queryset, name, value):
         """Фильтрация рецептов по избранному."""
@@ -41,6 +53,10 @@ class RecipeFilter(django_filters.FilterSet):
             return queryset.exclude(shopping_cart__user=self.request.user)
         return queryset
 
+    def filter_ordering(self, queryset, name, value):
+        """Сортировка рецептов по денормализованным счётчикам."""
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
 
 class IngredientFilter(django_filters.FilterSet):
     """Фильтр для модели ингредиента."""
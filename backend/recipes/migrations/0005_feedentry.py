@@ -0,0 +1,80 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import Coalesce
+
+FEED_BACKFILL_LIMIT = 100
+
+
+def fill_feeds(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    User.objects.update(
+        followers_count=Coalesce(
+            models.Subquery(
+                Follow.objects.filter(author=models.OuterRef('pk'))
+                .order_by()
+                .values('author')
+                .annotate(count=models.Count('pk'))
+                .values('count')
+            ),
+            0,
+        )
+    )
+    recipes_by_author = {}
+    for follow in Follow.objects.iterator():
+        if follow.author_id not in recipes_by_author:
+            recipes_by_author[follow.author_id] = list(
+                Recipe.objects.filter(author_id=follow.author_id)
+                .order_by('-pub_date')
+                .values_list('pk', 'pub_date')[:FEED_BACKFILL_LIMIT]
+            )
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(
+                    user_id=follow.user_id,
+                    recipe_id=recipe_id,
+                    pub_date=pub_date,
+                )
+                for recipe_id, pub_date in recipes_by_author[follow.author_id]
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0004_recipe_favorites_count'),
+        ('users', '0006_user_followers_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи лент',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date'], name='feed_entry_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
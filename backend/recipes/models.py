@@ -4,14 +4,23 @@ from django.db import models
 from core.constants import (
     COOKING_TIME_MAX_VALUE,
     COOKING_TIME_MIN_VALUE,
+    FEED_ENTRY_PUB_DATE_INDEX,
+    IMAGE_RENDITIONS_VERBOSE_NAME,
     INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH,
     INGREDIENT_NAME_MAX_LENGTH,
+    RECIPE_AUTHOR_PUB_DATE_INDEX,
     RECIPE_INGREDIENT_AMOUNT_MAX_VALUE,
     RECIPE_INGREDIENT_AMOUNT_MIN_VALUE,
     RECIPE_NAME_MAX_LENGTH,
+    RECIPE_POPULAR_INDEX,
+    RECIPE_PUB_DATE_INDEX,
     RECIPE_TEXT_MAX_LENGTH,
+    RECIPE_TRENDING_INDEX,
     TAG_NAME_MAX_LENGTH,
     TAG_SLUG_MAX_LENGTH,
+    UNIQUE_FEED_ENTRY_CONSTRAINT,
+    UNIQUE_SHOPPING_LIST_ITEM_CONSTRAINT,
+    UNIQUE_SIMILAR_RECIPE_CONSTRAINT,
 )
 from users.models import User
 
@@ -66,6 +75,34 @@ class Ingredient(models.Model):
         return f'{self.name} ({self.measurement_unit})'
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов рецептов."""
+
+    def with_user_flags(self, user):
+        """Добавляет флаги is_favorited и is_in_shopping_cart для user."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                Favorite.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            ),
+        )
+
+
 class Recipe(models.Model):
     """Модель рецепта."""
 
@@ -83,6 +120,12 @@ class Recipe(models.Model):
         'Изображение',
         upload_to='recipes/images/',
     )
+    image_renditions = models.JSONField(
+        IMAGE_RENDITIONS_VERBOSE_NAME,
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(
         'Описание',
         max_length=RECIPE_TEXT_MAX_LENGTH,
@@ -107,11 +150,41 @@ class Recipe(models.Model):
         'Дата публикации',
         auto_now_add=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False,
+    )
+    trending_score = models.FloatField(
+        'Оценка популярности',
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name=RECIPE_PUB_DATE_INDEX,
+            ),
+            models.Index(
+                fields=['-favorites_count', '-pub_date', '-id'],
+                name=RECIPE_POPULAR_INDEX,
+            ),
+            models.Index(
+                fields=['-trending_score', '-pub_date', '-id'],
+                name=RECIPE_TRENDING_INDEX,
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name=RECIPE_AUTHOR_PUB_DATE_INDEX,
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -245,3 +318,142 @@ class ShoppingCart(models.Model):
         return (
             f'{self.user.username} добавил в список покупок {self.recipe.name}'
         )
+
+
+class ShoppingListItem(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя.
+
+    Материализованный агрегат RecipeIngredient по рецептам из ShoppingCart,
+    поддерживается инкрементально при изменении списка и рецептов.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент',
+    )
+    total_amount = models.PositiveIntegerField('Количество')
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name=UNIQUE_SHOPPING_LIST_ITEM_CONSTRAINT,
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user.username}: {self.ingredient} — {self.total_amount}'
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок пользователя.
+
+    Заполняется при публикации рецепта (fan-out on write) для всех
+    подписчиков автора, если их не больше FEED_FANOUT_MAX_FOLLOWERS.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name=UNIQUE_FEED_ENTRY_CONSTRAINT,
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name=FEED_ENTRY_PUB_DATE_INDEX,
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe.name} в ленте {self.user.username}'
+
+
+class SimilarRecipe(models.Model):
+    """Похожий рецепт с оценкой близости.
+
+    Для каждого рецепта хранится до SIMILAR_RECIPES_LIMIT ближайших по
+    TF-IDF-векторам ингредиентов. Таблица строится командой
+    buildsimilarrecipes и обновляется при изменении ингредиентов.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField('Близость')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        ordering = ('recipe', '-score')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name=UNIQUE_SIMILAR_RECIPE_CONSTRAINT,
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.similar.name} похож на {self.recipe.name}'
+
+
+class TrendingState(models.Model):
+    """Состояние пересчёта оценок популярности рецептов.
+
+    Единственная строка: id последних учтённых записей избранного и
+    списков покупок и точка отсчёта, к которой приведены оценки.
+    """
+
+    last_favorite_id = models.BigIntegerField(
+        'Последняя учтённая запись избранного',
+        default=0,
+    )
+    last_shopping_cart_id = models.BigIntegerField(
+        'Последняя учтённая запись списка покупок',
+        default=0,
+    )
+    epoch = models.DateTimeField('Точка отсчёта оценок')
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Состояние популярности'
+        verbose_name_plural = 'Состояние популярности'
+
+    def __str__(self):
+        return f'Популярность на {self.updated_at}'
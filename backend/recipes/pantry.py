@@ -0,0 +1,210 @@
+import bisect
+import heapq
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from core.constants import (
+    PANTRY_CHANGE_KEY,
+    PANTRY_LOG_WRITE_ATTEMPTS,
+    PANTRY_MAX_REPLAYED_CHANGES,
+    PANTRY_VERSION_KEY,
+)
+
+from .models import RecipeIngredient
+
+
+def get_pantry_version():
+    """Номер последнего изменения в журнале индекса."""
+    return cache.get(PANTRY_VERSION_KEY, 0)
+
+
+def log_pantry_changes(recipe_ids):
+    """Записывает изменённые рецепты в журнал после фиксации транзакции.
+
+    Журнал хранится в общем кэше: счётчик версий и по ключу на каждое
+    изменение. Индексы процессов по нему догружают только эти рецепты.
+    """
+    recipe_ids = list(recipe_ids)
+
+    def write():
+        # Новый счётчик начинается с текущего времени в миллисекундах,
+        # чтобы его номера не совпали с ключами журнала, оставшимися от
+        # вытесненного счётчика.
+        cache.add(PANTRY_VERSION_KEY, time.time_ns() // 1_000_000, None)
+        for _ in range(PANTRY_LOG_WRITE_ATTEMPTS):
+            try:
+                version = cache.incr(PANTRY_VERSION_KEY)
+            except ValueError:
+                # Счётчик вытеснен: индексы увидят меньшую версию и
+                # перестроятся целиком.
+                return
+            # incr в DatabaseCache — это get и set со сроком по
+            # умолчанию: счётчик снова делается бессрочным, а номер,
+            # который одновременно получил другой процесс, пропускается.
+            cache.touch(PANTRY_VERSION_KEY, None)
+            if cache.add(
+                PANTRY_CHANGE_KEY.format(version),
+                recipe_ids,
+                settings.PANTRY_CHANGE_LOG_TIMEOUT,
+            ):
+                return
+
+    transaction.on_commit(write)
+
+
+class PantryIndex:
+    """Обратный индекс ингредиентов рецептов в памяти процесса.
+
+    Хранит ingredient_id -> отсортированный массив recipe_id и для
+    каждого рецепта массив его ингредиентов. Перед запросом индекс
+    сверяется с журналом изменений в общем кэше и обновляет изменённые
+    рецепты. Полная сборка (при старте процесса, если журнал неполон или
+    индекс старше PANTRY_INDEX_TIMEOUT) идёт в фоновом потоке, а запросы
+    тем временем обслуживает прежний индекс; ждать сборки приходится
+    только запросу, пришедшему в процесс, где индекса ещё нет.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.ingredients = {}
+        self.version = None
+        self.loaded_at = 0
+        self.lock = threading.Lock()
+        self.reload_lock = threading.Lock()
+        self.loading = False
+
+    def build(self):
+        """Читает таблицу RecipeIngredient и строит списки индекса."""
+        version = get_pantry_version()
+        postings = defaultdict(lambda: array('q'))
+        ingredients = defaultdict(lambda: array('q'))
+        rows = RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).order_by()
+        for recipe_id, ingredient_id in rows.iterator():
+            postings[ingredient_id].append(recipe_id)
+            ingredients[recipe_id].append(ingredient_id)
+        postings = {
+            ingredient_id: array('q', sorted(recipe_ids))
+            for ingredient_id, recipe_ids in postings.items()
+        }
+        return postings, dict(ingredients), version
+
+    def load(self, only_missing=False):
+        """Строит индекс по всей таблице и подменяет им текущий.
+
+        С only_missing=True ничего не делает, если индекс уже собран,
+        например фоновым прогревом, который шёл одновременно.
+        """
+        with self.reload_lock:
+            if only_missing and self.version is not None:
+                return
+            postings, ingredients, version = self.build()
+            with self.lock:
+                self.postings = postings
+                self.ingredients = ingredients
+                self.version = version
+                self.loaded_at = time.monotonic()
+
+    def load_in_background(self):
+        """Запускает полную сборку в фоне, если она ещё не идёт."""
+        if self.loading:
+            return
+        self.loading = True
+        threading.Thread(target=self.run_load, daemon=True).start()
+
+    def run_load(self):
+        """Точка входа фонового потока сборки."""
+        try:
+            self.load()
+        finally:
+            self.loading = False
+            connection.close()
+
+    def sync(self):
+        """Применяет изменения из журнала или запускает пересборку."""
+        version = get_pantry_version()
+        if (
+            version < self.version
+            or version - self.version > PANTRY_MAX_REPLAYED_CHANGES
+            or time.monotonic() - self.loaded_at
+            > settings.PANTRY_INDEX_TIMEOUT
+        ):
+            self.load_in_background()
+            return
+        if version == self.version:
+            return
+        keys = [
+            PANTRY_CHANGE_KEY.format(number)
+            for number in range(self.version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            self.load_in_background()
+            return
+        self.apply(
+            {recipe_id for ids in changes.values() for recipe_id in ids}
+        )
+        self.version = version
+
+    def apply(self, recipe_ids):
+        """Перечитывает ингредиенты рецептов и правит списки индекса."""
+        current = defaultdict(set)
+        rows = RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows:
+            current[recipe_id].add(ingredient_id)
+        for recipe_id in recipe_ids:
+            old = set(self.ingredients.pop(recipe_id, ()))
+            new = current.get(recipe_id, set())
+            for ingredient_id in old - new:
+                recipe_ids_array = self.postings[ingredient_id]
+                position = bisect.bisect_left(recipe_ids_array, recipe_id)
+                del recipe_ids_array[position]
+                if not recipe_ids_array:
+                    del self.postings[ingredient_id]
+            for ingredient_id in new - old:
+                bisect.insort(
+                    self.postings.setdefault(ingredient_id, array('q')),
+                    recipe_id,
+                )
+            if new:
+                self.ingredients[recipe_id] = array('q', sorted(new))
+
+    def rank(self, ingredient_ids):
+        """Рецепты с ингредиентами из ingredient_ids по убыванию покрытия.
+
+        Возвращает генератор (recipe_id, совпало, всего ингредиентов),
+        упорядоченный по доле совпавших ингредиентов, затем по их числу
+        и новизне рецепта. Порядок извлекается из кучи по мере чтения.
+        """
+        if self.version is None:
+            self.load(only_missing=True)
+        with self.lock:
+            self.sync()
+            matched = Counter()
+            for ingredient_id in set(ingredient_ids):
+                matched.update(self.postings.get(ingredient_id, ()))
+            heap = [
+                (
+                    -count / len(self.ingredients[recipe_id]),
+                    -count,
+                    -recipe_id,
+                    len(self.ingredients[recipe_id]),
+                )
+                for recipe_id, count in matched.items()
+            ]
+        heapq.heapify(heap)
+        while heap:
+            _, count, recipe_id, total = heapq.heappop(heap)
+            yield -recipe_id, -count, total
+
+
+pantry_index = PantryIndex()
@@ -1,11 +1,25 @@
-import base64
-
-from django.core.files.base import ContentFile
+from django.conf import settings
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.urls import reverse
 from rest_framework import serializers
 
-from users.serializers import CustomUserSerializer
+from core.cache import is_shared_cache
+from core.constants import (
+    PANTRY_DEFAULT_LIMIT,
+    PANTRY_MAX_INGREDIENTS,
+    PANTRY_MAX_LIMIT,
+    RECIPE_IMAGE_RENDITION_WIDTHS,
+)
+from core.fields import Base64ImageField, ImageSrcsetField
+from core.serializers import DynamicFieldsMixin
+from users.serializers import (
+    CustomUserSerializer,
+    expect_subscriptions,
+    is_subscribed,
+)
+
+from .cache import get_recipe_fragments, set_recipe_fragments
 from .models import (
     Favorite,
     Ingredient,
@@ -15,16 +29,12 @@ from .models import (
     ShortLink,
     Tag,
 )
-from .utils import generate_unique_short_code
-
-
-class Base64ImageField(serializers.ImageField):
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='recipe.' + ext)
-        return super().to_internal_value(data)
+from .utils import (
+    correct_shopping_lists,
+    create_short_links,
+    push_recipe_to_feeds,
+    recipe_ingredients_changed,
+)
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -90,8 +100,59 @@ class ShortLinkSerializer(serializers.ModelSerializer):
         return {'short-link': data['short_link']}
 
 
-class RecipeListSerializer(serializers.ModelSerializer):
-    """Сериализатор для списка рецептов и детального просмотра."""
+class RecipeFragmentSerializer(serializers.ModelSerializer):
+    """Независимое от пользователя представление рецепта для кэша.
+
+    Сериализуется без запроса в контексте, поэтому ссылки на изображения
+    остаются относительными.
+    """
+
+    tags = TagSerializer(many=True, read_only=True)
+    author = CustomUserSerializer(read_only=True, omit=('is_subscribed',))
+    ingredients = RecipeIngredientSerializer(
+        source='recipe_ingredients', many=True, read_only=True
+    )
+    image_srcset = ImageSrcsetField('image', RECIPE_IMAGE_RENDITION_WIDTHS)
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id',
+            'tags',
+            'author',
+            'ingredients',
+            'name',
+            'image',
+            'image_srcset',
+            'text',
+            'cooking_time',
+        )
+
+
+class CachedRecipeListSerializer(serializers.ListSerializer):
+    """Список рецептов с пакетной загрузкой фрагментов и связей."""
+
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, 'all') else data)
+        expect_subscriptions(
+            self.context, [recipe.author_id for recipe in recipes]
+        )
+        if self.child.use_fragment_cache():
+            self.child.fragments = self.child.load_fragments(recipes)
+        else:
+            prefetch_related_objects(
+                recipes, *self.child.get_prefetch_lookups()
+            )
+        return [self.child.to_representation(recipe) for recipe in recipes]
+
+
+class RecipeListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Сериализатор для списка рецептов и детального просмотра.
+
+    Общая для всех пользователей часть берётся из кэша фрагментов,
+    поверх неё подставляются is_favorited, is_in_shopping_cart
+    и author.is_subscribed текущего пользователя.
+    """
 
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
@@ -100,6 +161,7 @@ class RecipeListSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_srcset = ImageSrcsetField('image', RECIPE_IMAGE_RENDITION_WIDTHS)
 
     class Meta:
         model = Recipe
@@ -112,11 +174,99 @@ class RecipeListSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_srcset',
             'text',
             'cooking_time',
         )
+        list_serializer_class = CachedRecipeListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fragments = {}
+
+    def use_fragment_cache(self):
+        """Кэш используется, если в ответ попадает весь фрагмент.
+
+        С кэшем в памяти процесса фрагменты не используются: их сброс
+        из воркера или служебной команды туда не доходит.
+        """
+        return (
+            bool(settings.RECIPE_FRAGMENT_CACHE_TIMEOUT)
+            and is_shared_cache()
+            and set(RecipeFragmentSerializer.Meta.fields) <= set(self.fields)
+        )
+
+    def get_prefetch_lookups(self):
+        """Возвращает связи, нужные для выбранных полей."""
+        lookups = []
+        if 'tags' in self.fields:
+            lookups.append('tags')
+        if 'ingredients' in self.fields:
+            lookups.append('recipe_ingredients__ingredient')
+        return lookups
+
+    def load_fragments(self, recipes):
+        """Достаёт фрагменты из кэша и сериализует недостающие."""
+        fragments = get_recipe_fragments([recipe.pk for recipe in recipes])
+        missing = [recipe for recipe in recipes if recipe.pk not in fragments]
+        if missing:
+            prefetch_related_objects(missing, *self.get_prefetch_lookups())
+            fresh = {
+                recipe.pk: RecipeFragmentSerializer(recipe).data
+                for recipe in missing
+            }
+            set_recipe_fragments(fresh)
+            fragments.update(fresh)
+        return fragments
+
+    def to_representation(self, instance):
+        if not self.use_fragment_cache():
+            prefetch_related_objects([instance], *self.get_prefetch_lookups())
+            return super().to_representation(instance)
+        fragment = self.fragments.get(instance.pk)
+        if fragment is None:
+            fragment = self.load_fragments([instance])[instance.pk]
+        return self.apply_user_overlay(instance, fragment)
+
+    def apply_user_overlay(self, instance, fragment):
+        """Дополняет фрагмент полями, зависящими от пользователя."""
+        request = self.context.get('request')
+
+        def build_url(url):
+            if request is None or not url:
+                return url
+            return request.build_absolute_uri(url)
+
+        def build_srcset(srcset):
+            return {
+                descriptor: build_url(url)
+                for descriptor, url in srcset.items()
+            }
+
+        author = {
+            field_name: fragment['author'].get(field_name)
+            for field_name in CustomUserSerializer.Meta.fields
+        }
+        author['is_subscribed'] = is_subscribed(self.context, instance.author)
+        author['avatar'] = build_url(author['avatar'])
+        author['avatar_srcset'] = build_srcset(author['avatar_srcset'])
+        overlay = {
+            'author': author,
+            'image': build_url(fragment['image']),
+            'image_srcset': build_srcset(fragment['image_srcset']),
+            'is_favorited': self.get_is_favorited(instance),
+            'is_in_shopping_cart': self.get_is_in_shopping_cart(instance),
+        }
+        return {
+            field_name: overlay[field_name]
+            if field_name in overlay
+            else fragment[field_name]
+            for field_name in self.fields
+        }
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return Favorite.objects.filter(
@@ -125,6 +275,8 @@ class RecipeListSerializer(serializers.ModelSerializer):
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return ShoppingCart.objects.filter(
@@ -140,7 +292,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         queryset=Tag.objects.all(), many=True
     )
     ingredients = RecipeIngredientCreateSerializer(many=True)
-    image = Base64ImageField(required=False)
+    image = Base64ImageField(file_name='recipe', required=False)
 
     class Meta:
         model = Recipe
@@ -171,8 +323,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Ингредиенты не должны повторяться.'
             )
-        existing_ingredients = Ingredient.objects.filter(id__in=ingredient_ids)
-        if len(existing_ingredients) != len(ingredient_ids):
+        if not self.ingredients_exist(ingredient_ids):
             raise serializers.ValidationError(
                 'Один или несколько ингредиентов не существуют.'
             )
@@ -183,6 +334,13 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 )
         return value
 
+    def ingredients_exist(self, ingredient_ids):
+        """Проверяет, что все переданные ингредиенты есть в базе."""
+        existing_count = Ingredient.objects.filter(
+            id__in=ingredient_ids
+        ).count()
+        return existing_count == len(ingredient_ids)
+
     def validate_tags(self, value):
         if not value:
             raise serializers.ValidationError(
@@ -206,10 +364,9 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags_data)
         self._create_recipe_ingredients(recipe, ingredients_data)
-        ShortLink.objects.get_or_create(
-            recipe=recipe,
-            defaults={'short_code': generate_unique_short_code()},
-        )
+        create_short_links([recipe.pk])
+        push_recipe_to_feeds.delay(recipe.pk)
+        recipe_ingredients_changed.send(sender=Recipe, recipe_ids=[recipe.pk])
         return recipe
 
     @transaction.atomic
@@ -224,30 +381,116 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         if tags_data is not None:
             instance.tags.set(tags_data)
         if ingredients_data is not None:
-            instance.recipe_ingredients.all().delete()
-            self._create_recipe_ingredients(instance, ingredients_data)
+            self._update_recipe_ingredients(instance, ingredients_data)
         return instance
 
+    def _update_recipe_ingredients(self, recipe, ingredients_data):
+        """Приводит ингредиенты рецепта к новому списку по разнице.
+
+        Изменённые количества обновляются, новые строки добавляются,
+        лишние удаляются — каждое действие одним запросом и только если
+        оно нужно. Ни одна из операций не вызывает сигналы строк
+        RecipeIngredient: списки покупок корректируются одним вызовом на
+        всю разницу, а recipe_ingredients_changed отправляется один раз.
+        """
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        }
+        old_amounts = {
+            ingredient_id: recipe_ingredient.amount
+            for ingredient_id, recipe_ingredient in current.items()
+        }
+        new_amounts = {item['id']: item['amount'] for item in ingredients_data}
+        changed = []
+        for ingredient_id, recipe_ingredient in current.items():
+            amount = new_amounts.get(ingredient_id)
+            if amount is not None and amount != recipe_ingredient.amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        removed = [
+            recipe_ingredient.pk
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id not in new_amounts
+        ]
+        if removed:
+            # DELETE без сбора строк и сигналов post_delete: сигнал на
+            # каждую строку повторил бы коррекцию списков покупок ниже.
+            removed_rows = RecipeIngredient.objects.filter(pk__in=removed)
+            removed_rows._raw_delete(removed_rows.db)
+        added = [
+            item for item in ingredients_data if item['id'] not in current
+        ]
+        if added:
+            self._create_recipe_ingredients(recipe, added)
+        if added or removed:
+            recipe_ingredients_changed.send(
+                sender=Recipe, recipe_ids=[recipe.pk]
+            )
+        correct_shopping_lists(recipe, old_amounts, new_amounts)
+
     def _create_recipe_ingredients(self, recipe, ingredients_data):
-        recipe_ingredients = []
-        for ingredient_data in ingredients_data:
-            ingredient = Ingredient.objects.get(id=ingredient_data['id'])
-            recipe_ingredients.append(
-                RecipeIngredient(
-                    recipe=recipe,
-                    ingredient=ingredient,
-                    amount=ingredient_data['amount'],
-                )
+        """Создаёт строки ингредиентов одним запросом.
+
+        Существование ингредиентов уже проверено в validate_ingredients,
+        поэтому строки ссылаются на них по id без повторной загрузки.
+        """
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=ingredient_data['id'],
+                amount=ingredient_data['amount'],
             )
-        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+            for ingredient_data in ingredients_data
+        )
 
     def to_representation(self, instance):
         return RecipeListSerializer(instance, context=self.context).data
 
 
+class RecipeBulkItemSerializer(RecipeCreateSerializer):
+    """Рецепт из пакетной загрузки.
+
+    Теги и ингредиенты сверяются с множествами tag_ids и ingredient_ids
+    из контекста, которые загружаются одним запросом на весь пакет.
+    """
+
+    tags = serializers.ListField(child=serializers.IntegerField())
+
+    def ingredients_exist(self, ingredient_ids):
+        return set(ingredient_ids) <= self.context['ingredient_ids']
+
+    def validate_tags(self, value):
+        value = super().validate_tags(value)
+        if not set(value) <= self.context['tag_ids']:
+            raise serializers.ValidationError(
+                'Один или несколько тегов не существуют.'
+            )
+        return value
+
+
 class RecipeMinifiedSerializer(serializers.ModelSerializer):
     """Сериализатор для краткого представления рецепта."""
 
+    image_srcset = ImageSrcsetField('image', RECIPE_IMAGE_RENDITION_WIDTHS)
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_srcset', 'cooking_time')
+
+
+class PantryQuerySerializer(serializers.Serializer):
+    """Параметры подбора рецептов по имеющимся ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=PANTRY_MAX_INGREDIENTS,
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=PANTRY_MAX_LIMIT,
+        default=PANTRY_DEFAULT_LIMIT,
+    )
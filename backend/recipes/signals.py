@@ -0,0 +1,305 @@
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.constants import (
+    AVATAR_RENDITION_WIDTHS,
+    RECIPE_IMAGE_RENDITION_WIDTHS,
+)
+from core.images import (
+    needs_renditions,
+    renditions_ready,
+    schedule_renditions,
+)
+from users.models import Follow, User
+
+from .cache import (
+    invalidate_author_recipes,
+    invalidate_recipe_fragments,
+    invalidate_short_link,
+)
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShortLink,
+    Tag,
+)
+from .pantry import log_pantry_changes
+from .similarity import (
+    get_listing_recipe_ids,
+    refresh_similar_recipes,
+    update_similar_recipes,
+)
+from .utils import (
+    add_to_shopping_list,
+    backfill_feed,
+    correct_shopping_lists,
+    notify_recipe_ingredients_changed,
+    prune_feed,
+    recipe_ingredients_changed,
+    remove_from_shopping_list,
+)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    """Сбрасывает кэш рецепта при его изменении или удалении."""
+    invalidate_recipe_fragments([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def build_recipe_image_renditions(sender, instance, **kwargs):
+    """Ставит в очередь построение вариантов нового изображения."""
+    if needs_renditions(instance, 'image'):
+        schedule_renditions(instance, 'image', RECIPE_IMAGE_RENDITION_WIDTHS)
+
+
+@receiver(renditions_ready, sender=Recipe)
+def invalidate_recipe_renditions(sender, pk, **kwargs):
+    """Сбрасывает кэш рецепта после построения вариантов изображения."""
+    invalidate_recipe_fragments([pk])
+
+
+@receiver(post_delete, sender=ShortLink)
+def invalidate_deleted_short_link(sender, instance, **kwargs):
+    """Сбрасывает кэш короткой ссылки удалённого рецепта."""
+    invalidate_short_link(instance.short_code)
+
+
+@receiver(pre_delete, sender=Recipe)
+def refresh_recipes_listing_deleted(sender, instance, **kwargs):
+    """Пересчитывает похожие рецепты, где был удаляемый рецепт."""
+    recipe_ids = get_listing_recipe_ids(instance)
+    if recipe_ids:
+        refresh_similar_recipes.delay(recipe_ids)
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def update_recipe_similarity(sender, recipe_ids, **kwargs):
+    """Ставит в очередь обновление похожих рецептов."""
+    update_similar_recipes.delay_many(
+        [(recipe_id,) for recipe_id in recipe_ids]
+    )
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def update_pantry_index(sender, recipe_ids, **kwargs):
+    """Отмечает рецепты для обновления индекса подбора по продуктам."""
+    log_pantry_changes(recipe_ids)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_pantry_index(sender, instance, **kwargs):
+    """Отмечает удалённый рецепт для индекса подбора по продуктам."""
+    log_pantry_changes([instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def invalidate_recipe_ingredient(sender, instance, **kwargs):
+    """Сбрасывает кэш рецепта при изменении его ингредиентов."""
+    invalidate_recipe_fragments([instance.recipe_id])
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_recipe_ingredient(sender, instance, **kwargs):
+    """Запоминает прежние ингредиент и количество изменяемой строки."""
+    instance.previous = (
+        RecipeIngredient.objects.filter(pk=instance.pk)
+        .values_list('ingredient_id', 'amount')
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def save_recipe_ingredient(sender, instance, created, **kwargs):
+    """Переносит изменение строки ингредиента в списки покупок.
+
+    Срабатывает при сохранении отдельной строки (админка, shell);
+    bulk_create и bulk_update сериализаторов корректируют списки сами.
+    """
+    old_amounts = dict([instance.previous]) if instance.previous else {}
+    correct_shopping_lists(
+        instance.recipe_id,
+        old_amounts,
+        {instance.ingredient_id: instance.amount},
+    )
+    if instance.ingredient_id not in old_amounts:
+        notify_recipe_ingredients_changed(instance.recipe_id)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def delete_recipe_ingredient(sender, instance, **kwargs):
+    """Вычитает удалённую строку ингредиента из списков покупок.
+
+    При удалении рецепта строки и записи ShoppingCart удаляются каскадом
+    в любом порядке: что удалено раньше, то и вычитает ингредиенты
+    (см. remove_from_shopping_cart), поэтому они не вычитаются дважды.
+    """
+    correct_shopping_lists(
+        instance.recipe_id, {instance.ingredient_id: instance.amount}, {}
+    )
+    notify_recipe_ingredients_changed(instance.recipe_id)
+
+
+@receiver(pre_save, sender=ShoppingCart)
+def remember_shopping_cart(sender, instance, **kwargs):
+    """Запоминает прежних пользователя и рецепт изменяемой записи."""
+    instance.previous = (
+        ShoppingCart.objects.filter(pk=instance.pk)
+        .values_list('user_id', 'recipe_id')
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_cart(sender, instance, **kwargs):
+    """Переносит ингредиенты рецепта в список покупок пользователя."""
+    current = (instance.user_id, instance.recipe_id)
+    if instance.previous == current:
+        return
+    if instance.previous:
+        remove_from_shopping_list(*instance.previous)
+    add_to_shopping_list(*current)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_cart(sender, instance, **kwargs):
+    """Вычитает ингредиенты рецепта из списка покупок пользователя.
+
+    Вычитаются строки рецепта, оставшиеся в базе: при каскадном
+    удалении рецепта уже удалённые строки вычли свои сигналы.
+    """
+    remove_from_shopping_list(instance.user_id, instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Сбрасывает кэш рецептов при изменении набора тегов."""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_recipe_fragments([instance.pk])
+    elif pk_set:
+        invalidate_recipe_fragments(pk_set)
+    else:
+        invalidate_recipe_fragments(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_tag(sender, instance, created, **kwargs):
+    """Сбрасывает кэш рецептов с переименованным тегом."""
+    if not created:
+        invalidate_recipe_fragments(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+def invalidate_deleted_tag(sender, instance, **kwargs):
+    """Сбрасывает кэш рецептов с удаляемым тегом."""
+    invalidate_recipe_fragments(
+        instance.recipe_set.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def invalidate_ingredient(sender, instance, created, **kwargs):
+    """Сбрасывает кэш рецептов с изменённым ингредиентом."""
+    if not created:
+        invalidate_recipe_fragments(
+            instance.recipe_ingredients.values_list('recipe_id', flat=True)
+        )
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, created, update_fields, **kwargs):
+    """Сбрасывает кэш рецептов автора при изменении его профиля."""
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    invalidate_recipe_fragments(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=User)
+def build_avatar_renditions(sender, instance, **kwargs):
+    """Ставит в очередь построение вариантов нового аватара."""
+    if needs_renditions(instance, 'avatar'):
+        schedule_renditions(instance, 'avatar', AVATAR_RENDITION_WIDTHS)
+
+
+@receiver(renditions_ready, sender=User)
+def invalidate_avatar_renditions(sender, pk, **kwargs):
+    """Сбрасывает кэш рецептов автора после построения вариантов."""
+    invalidate_author_recipes(pk)
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик избранного у рецепта."""
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(sender, instance, **kwargs):
+    """Уменьшает счётчик избранного у рецепта."""
+    Recipe.objects.filter(pk=instance.recipe_id, favorites_count__gt=0).update(
+        favorites_count=F('favorites_count') - 1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик рецептов у автора."""
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    """Уменьшает счётчик рецептов у автора."""
+    User.objects.filter(pk=instance.author_id, recipes_count__gt=0).update(
+        recipes_count=F('recipes_count') - 1
+    )
+
+
+@receiver(post_save, sender=Follow)
+def add_follower(sender, instance, created, **kwargs):
+    """Увеличивает счётчик подписчиков и заполняет ленту подписчика."""
+    if not created:
+        return
+    User.objects.filter(pk=instance.author_id).update(
+        followers_count=F('followers_count') + 1
+    )
+    backfill_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_follower(sender, instance, **kwargs):
+    """Уменьшает счётчик подписчиков и очищает ленту бывшего подписчика."""
+    User.objects.filter(pk=instance.author_id, followers_count__gt=0).update(
+        followers_count=F('followers_count') - 1
+    )
+    prune_feed(instance.user_id, instance.author_id)
@@ -0,0 +1,360 @@
+import heapq
+import math
+from collections import defaultdict
+from itertools import chain, islice
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from scipy import sparse
+
+from core.constants import SIMILAR_RECIPES_FREQUENCY_KEY
+from core.tasks import task
+
+from .models import Recipe, RecipeIngredient, SimilarRecipe
+
+
+def get_document_frequency(ingredient_ids=None):
+    """Возвращает {ingredient_id: число рецептов с ингредиентом}.
+
+    Без ingredient_ids считает по всей таблице.
+    """
+    rows = RecipeIngredient.objects.all()
+    if ingredient_ids is not None:
+        rows = rows.filter(ingredient_id__in=ingredient_ids)
+    return dict(
+        rows.values('ingredient_id')
+        .annotate(frequency=Count('id'))
+        .values_list('ingredient_id', 'frequency')
+        .order_by()
+    )
+
+
+def get_cached_document_frequency(changed_ids=()):
+    """Частоты ингредиентов из общего кэша.
+
+    По всей таблице частоты считаются, только если в кэше их нет;
+    частоты changed_ids пересчитываются и записываются в кэш.
+    """
+    frequency = cache.get(SIMILAR_RECIPES_FREQUENCY_KEY)
+    if frequency is None:
+        frequency = get_document_frequency()
+    elif not changed_ids:
+        return frequency
+    else:
+        fresh = get_document_frequency(changed_ids)
+        for ingredient_id in changed_ids:
+            frequency[ingredient_id] = fresh.get(ingredient_id, 0)
+    cache.set(
+        SIMILAR_RECIPES_FREQUENCY_KEY,
+        frequency,
+        settings.SIMILAR_RECIPES_FREQUENCY_TIMEOUT,
+    )
+    return frequency
+
+
+class SimilarityIndex:
+    """Разреженные TF-IDF-векторы рецептов по ингредиентам.
+
+    Вес ингредиента в рецепте — его idf: ln((1 + N) / (1 + df)) + 1,
+    где N — число рецептов, df — число рецептов с этим ингредиентом.
+    Близость рецептов — косинус их векторов. Скалярные произведения
+    считаются по обратному индексу ingredient_id -> recipe_ids, поэтому
+    перебираются только рецепты с общими ингредиентами.
+    """
+
+    def __init__(self, rows, frequency, total):
+        self.ingredients = defaultdict(list)
+        self.postings = defaultdict(list)
+        for recipe_id, ingredient_id in rows:
+            self.ingredients[recipe_id].append(ingredient_id)
+            self.postings[ingredient_id].append(recipe_id)
+        # Ингредиента может не быть в устаревших частотах из кэша: тогда
+        # df не меньше числа загруженных рецептов с ним.
+        self.weights = {
+            ingredient_id: (
+                math.log(
+                    (1 + total)
+                    / (1 + (frequency.get(ingredient_id) or len(recipe_ids)))
+                )
+                + 1
+            )
+            ** 2
+            for ingredient_id, recipe_ids in self.postings.items()
+        }
+        self.norms = {
+            recipe_id: math.sqrt(
+                sum(self.weights[ingredient_id] for ingredient_id in items)
+            )
+            for recipe_id, items in self.ingredients.items()
+        }
+
+    @classmethod
+    def build_around(cls, recipe_ids, extra_ids=()):
+        """Индекс для расчёта соседей recipe_ids по ограниченному кругу.
+
+        Кандидаты — рецепты с одним из SIMILAR_RECIPES_CANDIDATE_INGREDIENTS
+        самых редких ингредиентов каждого из recipe_ids, не больше
+        SIMILAR_RECIPES_POSTING_LIMIT на ингредиент. Вес ингредиента
+        растёт с его редкостью, и рецепты, общие только по частым
+        ингредиентам (соль, вода), в соседи почти не попадают, а их
+        загрузка стоила бы как полная пересборка. Рецепты extra_ids
+        загружаются без поиска кандидатов. Частоты ингредиентов
+        recipe_ids пересчитываются, остальные берутся из кэша.
+        """
+        targets = defaultdict(list)
+        rows = RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows:
+            targets[recipe_id].append(ingredient_id)
+        frequency = get_cached_document_frequency(
+            {
+                ingredient_id
+                for items in targets.values()
+                for ingredient_id in items
+            }
+        )
+        selected = set()
+        for items in targets.values():
+            selected.update(
+                heapq.nsmallest(
+                    settings.SIMILAR_RECIPES_CANDIDATE_INGREDIENTS,
+                    items,
+                    key=lambda item: (frequency.get(item, 0), item),
+                )
+            )
+        candidate_ids = {*targets, *extra_ids}
+        for ingredient_id in selected:
+            candidate_ids.update(
+                RecipeIngredient.objects.filter(ingredient_id=ingredient_id)
+                .order_by()
+                .values_list('recipe_id', flat=True)[
+                    : settings.SIMILAR_RECIPES_POSTING_LIMIT
+                ]
+            )
+        rows = RecipeIngredient.objects.filter(
+            recipe_id__in=candidate_ids
+        ).values_list('recipe_id', 'ingredient_id')
+        return cls(
+            rows.order_by().iterator(), frequency, Recipe.objects.count()
+        )
+
+    def dot_products(self, recipe_id):
+        """Возвращает {recipe_id: скалярное произведение} соседей."""
+        products = defaultdict(float)
+        for ingredient_id in self.ingredients.get(recipe_id, ()):
+            weight = self.weights[ingredient_id]
+            for other_id in self.postings[ingredient_id]:
+                if other_id != recipe_id:
+                    products[other_id] += weight
+        return products
+
+    def similarities(self, recipe_id):
+        """Возвращает {recipe_id: близость} рецептов с общими ингредиентами."""
+        norm = self.norms.get(recipe_id)
+        if not norm:
+            return {}
+        return {
+            other_id: product / (norm * self.norms[other_id])
+            for other_id, product in self.dot_products(recipe_id).items()
+        }
+
+    def neighbours(self, recipe_id, limit):
+        """Возвращает до limit пар (recipe_id, близость) по убыванию."""
+        return heapq.nlargest(
+            limit,
+            self.similarities(recipe_id).items(),
+            key=lambda item: (item[1], -item[0]),
+        )
+
+
+class SimilarityMatrix:
+    """TF-IDF-векторы всех рецептов в разреженной матрице для пересборки.
+
+    Веса те же, что в SimilarityIndex. Строки матрицы нормированы, и
+    близости блока рецептов ко всем остальным считаются одним
+    произведением разреженных матриц. Ингредиенты, которые есть больше
+    чем у доли SIMILAR_RECIPES_MAX_INGREDIENT_SHARE рецептов и больше
+    чем у SIMILAR_RECIPES_POSTING_LIMIT, в произведение не входят:
+    их вес мал, а с ними число пар рецептов растёт квадратично. В норме
+    векторов они учитываются.
+    """
+
+    def __init__(self, rows, total):
+        self.recipe_ids, recipe_positions = np.unique(
+            rows[:, 0], return_inverse=True
+        )
+        self.ingredient_ids, columns = np.unique(
+            rows[:, 1], return_inverse=True
+        )
+        self.frequency = np.bincount(columns)
+        values = np.log((1 + total) / (1 + self.frequency[columns])) + 1
+        norms = np.sqrt(np.bincount(recipe_positions, weights=values**2))
+        limit = max(
+            settings.SIMILAR_RECIPES_MAX_INGREDIENT_SHARE
+            * len(self.recipe_ids),
+            settings.SIMILAR_RECIPES_POSTING_LIMIT,
+        )
+        kept = self.frequency[columns] <= limit
+        self.vectors = sparse.csr_matrix(
+            (
+                values[kept] / norms[recipe_positions[kept]],
+                (recipe_positions[kept], columns[kept]),
+            ),
+            shape=(len(self.recipe_ids), len(self.ingredient_ids)),
+        )
+        self.transposed = self.vectors.T.tocsr()
+
+    @classmethod
+    def build(cls):
+        """Матрица по всем рецептам; частоты заодно кладутся в кэш."""
+        rows = RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).order_by()
+        rows = np.fromiter(
+            chain.from_iterable(rows.iterator()), dtype=np.int64
+        ).reshape(-1, 2)
+        matrix = cls(rows, Recipe.objects.count())
+        cache.set(
+            SIMILAR_RECIPES_FREQUENCY_KEY,
+            dict(
+                zip(
+                    matrix.ingredient_ids.tolist(),
+                    matrix.frequency.tolist(),
+                    strict=True,
+                )
+            ),
+            settings.SIMILAR_RECIPES_FREQUENCY_TIMEOUT,
+        )
+        return matrix
+
+    def neighbours(self, recipe_ids, limit):
+        """Возвращает {recipe_id: до limit пар (recipe_id, близость)}."""
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        positions = np.searchsorted(self.recipe_ids, recipe_ids)
+        present = positions < len(self.recipe_ids)
+        present[present] = (
+            self.recipe_ids[positions[present]] == recipe_ids[present]
+        )
+        result = {int(recipe_id): [] for recipe_id in recipe_ids}
+        scores = self.vectors[positions[present]] @ self.transposed
+        for row, recipe_id in enumerate(recipe_ids[present].tolist()):
+            begin, end = scores.indptr[row], scores.indptr[row + 1]
+            other_ids = self.recipe_ids[scores.indices[begin:end]]
+            values = scores.data[begin:end]
+            selected = (other_ids != recipe_id) & (values > 0)
+            other_ids, values = other_ids[selected], values[selected]
+            order = np.lexsort((other_ids, -values))[:limit]
+            result[recipe_id] = list(
+                zip(
+                    other_ids[order].tolist(),
+                    values[order].tolist(),
+                    strict=True,
+                )
+            )
+        return result
+
+
+def save_similar_recipes(neighbours):
+    """Заменяет списки похожих рецептов: {recipe_id: [(id, score)]}."""
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe_id__in=list(neighbours)).delete()
+        SimilarRecipe.objects.bulk_create(
+            SimilarRecipe(
+                recipe_id=recipe_id, similar_id=other_id, score=score
+            )
+            for recipe_id, items in neighbours.items()
+            for other_id, score in items
+        )
+
+
+def rebuild_similar_recipes(block_size=None, progress=None):
+    """Пересчитывает таблицу SimilarRecipe целиком.
+
+    Матрица строится один раз, затем соседи считаются и записываются
+    блоками по block_size рецептов, каждый блок — в своей транзакции.
+    Возвращает число обработанных рецептов.
+    """
+    block_size = block_size or settings.SIMILAR_RECIPES_BLOCK_SIZE
+    limit = settings.SIMILAR_RECIPES_LIMIT
+    matrix = SimilarityMatrix.build()
+    recipe_ids = Recipe.objects.values_list('pk', flat=True).order_by('pk')
+    processed = 0
+    iterator = recipe_ids.iterator()
+    while block := list(islice(iterator, block_size)):
+        save_similar_recipes(matrix.neighbours(block, limit))
+        processed += len(block)
+        if progress is not None:
+            progress(processed)
+    return processed
+
+
+@task
+def refresh_similar_recipes(recipe_ids):
+    """Задача очереди: пересчитывает списки заданных рецептов."""
+    recipe_ids = list(
+        Recipe.objects.filter(pk__in=recipe_ids).values_list('pk', flat=True)
+    )
+    if not recipe_ids:
+        return
+    index = SimilarityIndex.build_around(recipe_ids)
+    limit = settings.SIMILAR_RECIPES_LIMIT
+    save_similar_recipes(
+        {
+            recipe_id: index.neighbours(recipe_id, limit)
+            for recipe_id in recipe_ids
+        }
+    )
+
+
+@task
+def update_similar_recipes(recipe_id):
+    """Задача очереди: обновляет похожие рецепты после смены ингредиентов.
+
+    Список самого рецепта считается заново по кандидатам build_around.
+    В списках загруженных рецептов (кандидатов и тех, где рецепт уже
+    был) меняется только его собственная близость: он добавляется,
+    если выше последнего места, или уходит, если общих ингредиентов не
+    осталось. Изменение idf остальных ингредиентов и рецепты вне круга
+    кандидатов учитывает полная пересборка.
+    """
+    if not Recipe.objects.filter(pk=recipe_id).exists():
+        return
+    listed_in = set(
+        SimilarRecipe.objects.filter(similar_id=recipe_id).values_list(
+            'recipe_id', flat=True
+        )
+    )
+    index = SimilarityIndex.build_around([recipe_id], listed_in)
+    limit = settings.SIMILAR_RECIPES_LIMIT
+    scores = index.similarities(recipe_id)
+    neighbours = {recipe_id: index.neighbours(recipe_id, limit)}
+    others = (set(index.ingredients) | listed_in) - {recipe_id}
+    current = defaultdict(list)
+    entries = SimilarRecipe.objects.filter(recipe_id__in=others)
+    for owner_id, *item in entries.values_list(
+        'recipe_id', 'similar_id', 'score'
+    ):
+        current[owner_id].append(tuple(item))
+    for other_id in others:
+        items = [item for item in current[other_id] if item[0] != recipe_id]
+        if scores.get(other_id):
+            items.append((recipe_id, scores[other_id]))
+        items = heapq.nlargest(
+            limit, items, key=lambda item: (item[1], -item[0])
+        )
+        if set(items) != set(current[other_id]):
+            neighbours[other_id] = items
+    save_similar_recipes(neighbours)
+
+
+def get_listing_recipe_ids(recipe):
+    """Рецепты, в списках похожих которых есть recipe."""
+    return list(
+        SimilarRecipe.objects.filter(similar=recipe).values_list(
+            'recipe_id', flat=True
+        )
+    )
@@ -0,0 +1,113 @@
+import math
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Max, Value, When
+from django.utils import timezone
+
+from core.constants import (
+    TRENDING_REBASE_EXPONENT,
+    TRENDING_UPDATE_BATCH_SIZE,
+)
+
+from .models import Favorite, Recipe, ShoppingCart, TrendingState
+
+
+def get_decay_rate():
+    """Скорость затухания оценки в секунду по периоду полураспада."""
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 60 * 60)
+
+
+def get_trending_state(now):
+    """Блокирует строку состояния, создавая её при первом запуске.
+
+    Первый запуск начинает отсчёт с текущих записей: у избранного и
+    списков покупок нет даты добавления, и прошлые события нельзя
+    состарить.
+    """
+    state = TrendingState.objects.select_for_update().filter(pk=1).first()
+    if state is None:
+        last_favorite = Favorite.objects.aggregate(last=Max('id'))['last']
+        last_cart = ShoppingCart.objects.aggregate(last=Max('id'))['last']
+        state = TrendingState.objects.create(
+            pk=1,
+            last_favorite_id=last_favorite or 0,
+            last_shopping_cart_id=last_cart or 0,
+            epoch=now,
+        )
+    return state
+
+
+def collect_events(model, after_id):
+    """Считает новые записи модели по рецептам.
+
+    Возвращает ({recipe_id: число записей}, наибольший учтённый id).
+    """
+    rows = (
+        model.objects.filter(pk__gt=after_id)
+        .values('recipe_id')
+        .annotate(events=Count('id'), last_id=Max('id'))
+        .order_by()
+    )
+    counts, last_id = {}, after_id
+    for row in rows:
+        counts[row['recipe_id']] = row['events']
+        last_id = max(last_id, row['last_id'])
+    return counts, last_id
+
+
+def refresh_trending_scores(now=None):
+    """Добавляет к оценкам рецептов вклад новых событий.
+
+    Оценка — сумма весов событий с экспоненциальным затуханием. Вклад
+    события хранится умноженным на exp(rate * (t - epoch)): все оценки
+    затухают одинаково, поэтому порядок по столбцу совпадает с порядком
+    по текущим оценкам, и пересчитывать старые события не нужно.
+    Временем события считается время пересчёта. Когда множитель
+    становится слишком большим, оценки приводятся к новой точке отсчёта.
+    Возвращает число рецептов с новыми событиями.
+    """
+    now = now or timezone.now()
+    rate = get_decay_rate()
+    with transaction.atomic():
+        state = get_trending_state(now)
+        favorites, state.last_favorite_id = collect_events(
+            Favorite, state.last_favorite_id
+        )
+        carts, state.last_shopping_cart_id = collect_events(
+            ShoppingCart, state.last_shopping_cart_id
+        )
+        exponent = rate * (now - state.epoch).total_seconds()
+        if exponent > TRENDING_REBASE_EXPONENT:
+            Recipe.objects.update(
+                trending_score=F('trending_score') * math.exp(-exponent)
+            )
+            state.epoch, exponent = now, 0
+        factor = math.exp(exponent)
+        increments = {
+            recipe_id: factor
+            * (
+                favorites.get(recipe_id, 0) * settings.TRENDING_FAVORITE_WEIGHT
+                + carts.get(recipe_id, 0)
+                * settings.TRENDING_SHOPPING_CART_WEIGHT
+            )
+            for recipe_id in favorites.keys() | carts.keys()
+        }
+        items = iter(sorted(increments.items()))
+        while batch := list(islice(items, TRENDING_UPDATE_BATCH_SIZE)):
+            Recipe.objects.filter(
+                pk__in=[recipe_id for recipe_id, _ in batch]
+            ).update(
+                trending_score=F('trending_score')
+                + Case(
+                    *(
+                        When(pk=recipe_id, then=Value(increment))
+                        for recipe_id, increment in batch
+                    ),
+                    default=Value(0.0),
+                    output_field=FloatField(),
+                )
+            )
+        state.save()
+    return len(increments)
@@ -1,45 +1,527 @@
-import base64
-import uuid
+import csv
+import functools
+import hashlib
+import hmac
+import io
+import os
 from collections import defaultdict
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import F, Q, Sum, Window
+from django.db.models.functions import Greatest, RowNumber
+from django.dispatch import Signal
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
 
-from .models import ShortLink
+from core.constants import (
+    SHOPPING_CART_CACHE_KEY,
+    SHOPPING_CART_CHUNK_SIZE,
+    SHOPPING_CART_CSV_HEADER,
+    SHOPPING_CART_PDF_FALLBACK_FONT,
+    SHOPPING_CART_PDF_FONT_NAME,
+    SHOPPING_CART_PDF_FONT_SIZE,
+    SHORT_CODE_ALPHABET,
+    SHORT_CODE_DOMAINS,
+    SHORT_CODE_FEISTEL_ROUNDS,
+    SHORT_CODE_PREFIX,
+)
+from core.tasks import task
+from users.models import Follow, User
 
+from .models import (
+    FeedEntry,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingListItem,
+    ShortLink,
+)
 
-def generate_shopping_cart_txt(recipes):
-    """Генерация TXT-файла со списком покупок."""
+# Отправляется, когда меняется набор ингредиентов рецептов: sender —
+# Recipe, аргумент recipe_ids.
+recipe_ingredients_changed = Signal()
 
-    ingredients = defaultdict(int)
-    for recipe in recipes:
-        for recipe_ingredient in recipe.recipe_ingredients.all():
-            ingr = recipe_ingredient.ingredient
-            key = f'{ingr.name} ({ingr.measurement_unit})'
-            ingredients[key] += recipe_ingredient.amount
 
-    lines = []
-    lines.append('Список покупок')
-    lines.append('----------------')
+def notify_recipe_ingredients_changed(recipe_id):
+    """Отправляет recipe_ingredients_changed после фиксации транзакции.
 
-    if not ingredients:
-        lines.append('Ваш список покупок пуст.')
-    else:
-        for ingredient, amount in ingredients.items():
-            lines.append(f'• {ingredient}: {amount}')
+    Используется для изменений отдельных строк RecipeIngredient. Для
+    рецепта, удалённого в той же транзакции, сигнал не отправляется:
+    индексы обновляют сигналы удаления рецепта.
+    """
+
+    def send():
+        if Recipe.objects.filter(pk=recipe_id).exists():
+            recipe_ingredients_changed.send(
+                sender=Recipe, recipe_ids=[recipe_id]
+            )
+
+    transaction.on_commit(send)
+
+
+def get_shopping_cart_ingredients(user):
+    """Возвращает итоговый список покупок пользователя.
+
+    Читает материализованную таблицу ShoppingListItem по индексу
+    (user, ingredient) без агрегации по рецептам.
+    """
+    return (
+        ShoppingListItem.objects.filter(user=user)
+        .values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'total_amount',
+        )
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+    )
+
+
+def calculate_shopping_list_totals(user_ids=None):
+    """Считает итоги списков покупок заново по рецептам из ShoppingCart.
+
+    Возвращает словарь {(user_id, ingredient_id): total_amount}.
+    """
+    carts = ShoppingCart.objects.filter(
+        recipe__recipe_ingredients__isnull=False
+    )
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+    totals = (
+        carts.values(
+            'user_id',
+            ingredient_id=F('recipe__recipe_ingredients__ingredient_id'),
+        )
+        .annotate(total_amount=Sum('recipe__recipe_ingredients__amount'))
+        .order_by()
+    )
+    return {
+        (row['user_id'], row['ingredient_id']): row['total_amount']
+        for row in totals.iterator()
+    }
+
+
+def get_recipe_amounts(recipe):
+    """Возвращает количества ингредиентов рецепта {ingredient_id: amount}."""
+    return dict(
+        RecipeIngredient.objects.filter(recipe=recipe).values_list(
+            'ingredient_id', 'amount'
+        )
+    )
+
+
+def apply_shopping_list_delta(user_ids, deltas):
+    """Применяет изменения количеств к спискам покупок пользователей.
+
+    deltas — словарь {ingredient_id: изменение количества}. Строки
+    обновляются атомарно через F(), по одному UPDATE на каждое различное
+    значение изменения; обнулившиеся позиции удаляются. Количество не
+    опускается ниже нуля: если таблица разошлась с рецептами (см.
+    rebuildshoppinglists --verify), вычитание не нарушает CHECK столбца.
+    """
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items()
+        if delta
+    }
+    if not deltas:
+        return
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    with transaction.atomic():
+        ShoppingListItem.objects.bulk_create(
+            [
+                ShoppingListItem(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=0,
+                )
+                for user_id in user_ids
+                for ingredient_id, delta in deltas.items()
+                if delta > 0
+            ],
+            ignore_conflicts=True,
+        )
+        ingredients_by_delta = defaultdict(list)
+        for ingredient_id, delta in deltas.items():
+            ingredients_by_delta[delta].append(ingredient_id)
+        for delta, ingredient_ids in ingredients_by_delta.items():
+            ShoppingListItem.objects.filter(
+                user_id__in=user_ids, ingredient_id__in=ingredient_ids
+            ).update(total_amount=Greatest(F('total_amount') + delta, 0))
+        ShoppingListItem.objects.filter(
+            user_id__in=user_ids,
+            ingredient_id__in=deltas,
+            total_amount__lte=0,
+        ).delete()
+
+
+def add_to_shopping_list(user_id, recipe_id):
+    """Добавляет ингредиенты рецепта в список покупок пользователя."""
+    apply_shopping_list_delta([user_id], get_recipe_amounts(recipe_id))
+
+
+def remove_from_shopping_list(user_id, recipe_id):
+    """Вычитает ингредиенты рецепта из списка покупок пользователя."""
+    apply_shopping_list_delta(
+        [user_id],
+        {
+            ingredient_id: -amount
+            for ingredient_id, amount in get_recipe_amounts(recipe_id).items()
+        },
+    )
+
+
+def correct_shopping_lists(recipe, old_amounts, new_amounts):
+    """Переносит изменение ингредиентов рецепта в списки покупок."""
+    deltas = {
+        ingredient_id: new_amounts.get(ingredient_id, 0)
+        - old_amounts.get(ingredient_id, 0)
+        for ingredient_id in old_amounts.keys() | new_amounts.keys()
+    }
+    apply_shopping_list_delta(
+        ShoppingCart.objects.filter(recipe=recipe).values_list(
+            'user_id', flat=True
+        ),
+        deltas,
+    )
+
+
+def get_shopping_cart_rows(ingredients):
+    """Возвращает строки списка покупок: название, единица, количество."""
+    for ingredient in ingredients:
+        yield (
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['total_amount'],
+        )
+
+
+def generate_shopping_cart_txt(ingredients):
+    """Построчная генерация TXT-файла со списком покупок."""
+    yield 'Список покупок\n----------------\n'.encode()
+    empty = True
+    for name, measurement_unit, amount in get_shopping_cart_rows(ingredients):
+        empty = False
+        yield f'• {name} ({measurement_unit}): {amount}\n'.encode()
+    if empty:
+        yield 'Ваш список покупок пуст.\n'.encode()
+
+
+class Echo:
+    """Псевдобуфер, возвращающий записанное значение для csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def generate_shopping_cart_csv(ingredients):
+    """Построчная генерация CSV-файла со списком покупок."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(SHOPPING_CART_CSV_HEADER).encode()
+    for row in get_shopping_cart_rows(ingredients):
+        yield writer.writerow(row).encode()
+
+
+@functools.cache
+def get_pdf_font_name():
+    """Регистрирует шрифт с кириллицей для PDF, если он доступен."""
+    font_path = settings.SHOPPING_CART_PDF_FONT
+    if not font_path or not os.path.exists(font_path):
+        return SHOPPING_CART_PDF_FALLBACK_FONT
+    pdfmetrics.registerFont(TTFont(SHOPPING_CART_PDF_FONT_NAME, font_path))
+    return SHOPPING_CART_PDF_FONT_NAME
+
+
+def generate_shopping_cart_pdf(ingredients):
+    """Генерация PDF-файла со списком покупок.
+
+    reportlab собирает документ целиком, поэтому готовый файл
+    отдаётся частями фиксированного размера.
+    """
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    font_name = get_pdf_font_name()
+    width, height = A4
+    margin = 2 * cm
+    line_height = SHOPPING_CART_PDF_FONT_SIZE * 1.5
+
+    pdf.setFont(font_name, SHOPPING_CART_PDF_FONT_SIZE + 4)
+    pdf.drawString(margin, height - margin, 'Список покупок')
+    pdf.setFont(font_name, SHOPPING_CART_PDF_FONT_SIZE)
+    y = height - margin - 2 * line_height
+    for name, measurement_unit, amount in get_shopping_cart_rows(ingredients):
+        if y < margin:
+            pdf.showPage()
+            pdf.setFont(font_name, SHOPPING_CART_PDF_FONT_SIZE)
+            y = height - margin
+        pdf.drawString(margin, y, f'• {name} ({measurement_unit}): {amount}')
+        y -= line_height
+    pdf.save()
+
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(SHOPPING_CART_CHUNK_SIZE), b'')
 
-    content = '\n'.join(lines)
-    return content
 
+SHOPPING_CART_FORMATS = {
+    'txt': ('text/plain; charset=utf-8', generate_shopping_cart_txt),
+    'csv': ('text/csv; charset=utf-8', generate_shopping_cart_csv),
+    'pdf': ('application/pdf', generate_shopping_cart_pdf),
+}
 
-def generate_unique_short_code(min_length=6, max_length=10):
-    """Генерирует уникальный короткий код для ссылки."""
-    for length in range(min_length, max_length + 1):
-        with transaction.atomic():
-            code = (
-                base64.urlsafe_b64encode(uuid.uuid4().bytes)[:length]
-                .decode('utf-8')
-                .rstrip('=')
+
+def get_shopping_cart_cache_key(ingredients, file_format):
+    """Ключ кэша файла по хэшу содержимого списка покупок."""
+    digest = hashlib.sha256(file_format.encode())
+    for row in get_shopping_cart_rows(ingredients):
+        digest.update('\0'.join(map(str, row)).encode())
+        digest.update(b'\n')
+    return SHOPPING_CART_CACHE_KEY.format(digest.hexdigest())
+
+
+def stream_shopping_cart(ingredients, file_format):
+    """Отдаёт файл списка покупок из кэша или генерирует и кэширует его."""
+    cache_key = get_shopping_cart_cache_key(ingredients, file_format)
+    content = cache.get(cache_key)
+    if content is not None:
+        yield content
+        return
+    chunks = []
+    for chunk in SHOPPING_CART_FORMATS[file_format][1](ingredients):
+        chunks.append(chunk)
+        yield chunk
+    cache.set(
+        cache_key, b''.join(chunks), settings.SHOPPING_CART_CACHE_TIMEOUT
+    )
+
+
+def get_latest_recipes_query(author_ids, limit=None):
+    """Запрос последних рецептов нескольких авторов.
+
+    При заданном limit номер рецепта внутри автора считается оконной
+    функцией ROW_NUMBER() OVER (PARTITION BY author_id ORDER BY pub_date
+    DESC), и отбираются первые limit строк каждого автора; возвращается
+    RawQuerySet. Без limit — обычный QuerySet.
+    """
+    recipes = Recipe.objects.filter(author_id__in=author_ids)
+    if limit is None:
+        return recipes.order_by('author_id', '-pub_date', '-id')
+    ranked = recipes.annotate(
+        recipe_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )
+    ).order_by()
+    sql, params = ranked.query.sql_with_params()
+    return Recipe.objects.raw(
+        f'SELECT * FROM ({sql}) ranked_recipes '
+        'WHERE recipe_rank <= %s '
+        'ORDER BY author_id, recipe_rank',
+        (*params, limit),
+    )
+
+
+def get_latest_recipes_by_author(author_ids, limit=None):
+    """Загружает последние рецепты нескольких авторов одним запросом.
+
+    Возвращает словарь {author_id: [recipe, ...]}.
+    """
+    recipes_by_author = {author_id: [] for author_id in author_ids}
+    for recipe in get_latest_recipes_query(author_ids, limit):
+        recipes_by_author[recipe.author_id].append(recipe)
+    return recipes_by_author
+
+
+def is_fanout_author(author_id):
+    """Проверяет, раздаются ли рецепты автора по лентам при публикации."""
+    return User.objects.filter(
+        pk=author_id,
+        followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).exists()
+
+
+@task
+def push_recipe_to_feeds(recipe_id):
+    """Задача очереди: добавляет рецепт в ленты подписчиков автора."""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not is_fanout_author(recipe.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=follower_id, recipe=recipe, pub_date=recipe.pub_date
+            )
+            for follower_id in follower_ids.iterator()
+        ),
+        batch_size=settings.FEED_FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту подписчика последние рецепты автора."""
+    if not is_fanout_author(author_id):
+        return
+    recipes = Recipe.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[: settings.FEED_BACKFILL_LIMIT]
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipes
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def prune_feed(user_id, author_id):
+    """Удаляет рецепты автора из ленты бывшего подписчика."""
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def get_feed_queryset(user, queryset):
+    """Отбирает рецепты ленты подписок пользователя.
+
+    Обычно это один проход по индексу (user, -pub_date) таблицы
+    FeedEntry. Рецепты популярных авторов, которые не раздаются
+    по лентам, добавляются при чтении (fan-out on read).
+    """
+    popular_author_ids = list(
+        Follow.objects.filter(
+            user=user,
+            author__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+        ).values_list('author_id', flat=True)
+    )
+    if not popular_author_ids:
+        return queryset.filter(feed_entries__user=user).order_by(
+            '-feed_entries__pub_date', '-id'
+        )
+    return queryset.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('recipe_id'))
+        | Q(author_id__in=popular_author_ids)
+    ).order_by('-pub_date', '-id')
+
+
+def _feistel_round(round_number, value, half_bits):
+    """Раундовая функция сети Фейстеля на основе HMAC-SHA256."""
+    digest = hmac.new(
+        settings.SHORT_LINK_SECRET.encode(),
+        f'{round_number}:{value}'.encode(),
+        hashlib.sha256,
+    ).digest()
+    return int.from_bytes(digest[:8], 'big') & ((1 << half_bits) - 1)
+
+
+def permute_recipe_id(value, half_bits):
+    """Обратимо перемешивает число в диапазоне [0, 2 ** (2 * half_bits))."""
+    left, right = value >> half_bits, value & ((1 << half_bits) - 1)
+    for round_number in range(SHORT_CODE_FEISTEL_ROUNDS):
+        left, right = (
+            right,
+            left ^ _feistel_round(round_number, right, half_bits),
+        )
+    return (left << half_bits) | right
+
+
+def unpermute_recipe_id(value, half_bits):
+    """Обратная к permute_recipe_id перестановка."""
+    left, right = value >> half_bits, value & ((1 << half_bits) - 1)
+    for round_number in reversed(range(SHORT_CODE_FEISTEL_ROUNDS)):
+        left, right = (
+            right ^ _feistel_round(round_number, left, half_bits),
+            left,
+        )
+    return (left << half_bits) | right
+
+
+def encode_short_code(recipe_id, shortest=0):
+    """Вычисляет короткий код по первичному ключу рецепта.
+
+    id перемешивается ключевой перестановкой и кодируется в base62
+    фиксированной длины, поэтому коды не пересекаются и не требуют
+    проверки уникальности в базе данных. shortest — номер самого
+    короткого из допустимых SHORT_CODE_DOMAINS.
+    """
+    domain = next(
+        (
+            (half_bits, length)
+            for half_bits, length in SHORT_CODE_DOMAINS[shortest:]
+            if recipe_id < 1 << (2 * half_bits)
+        ),
+        None,
+    )
+    if domain is None:
+        raise ValueError('Пространство кодов исчерпано.')
+    half_bits, length = domain
+    value = permute_recipe_id(recipe_id, half_bits)
+    code = []
+    while value:
+        value, digit = divmod(value, len(SHORT_CODE_ALPHABET))
+        code.append(SHORT_CODE_ALPHABET[digit])
+    return SHORT_CODE_PREFIX + ''.join(reversed(code)).rjust(
+        length, SHORT_CODE_ALPHABET[0]
+    )
+
+
+def create_short_links(recipe_ids):
+    """Создаёт короткие ссылки для рецептов, у которых их ещё нет.
+
+    Код может совпасть с кодом, вычисленным до смены
+    SHORT_LINK_SECRET. Такая вставка пропускается, и рецепт получает
+    код следующей длины.
+    """
+    pending = set(recipe_ids)
+    for shortest in range(len(SHORT_CODE_DOMAINS)):
+        ShortLink.objects.bulk_create(
+            (
+                ShortLink(
+                    recipe_id=recipe_id,
+                    short_code=encode_short_code(recipe_id, shortest),
+                )
+                for recipe_id in pending
+            ),
+            ignore_conflicts=True,
+        )
+        pending -= set(
+            ShortLink.objects.filter(recipe_id__in=pending).values_list(
+                'recipe_id', flat=True
             )
-            if not ShortLink.objects.filter(short_code=code).exists():
-                return code
-    raise ValueError('Пространство кодов исчерпано.')
+        )
+        if not pending:
+            return
+    raise ValueError('Не удалось подобрать свободный короткий код.')
+
+
+def decode_short_code(short_code):
+    """Восстанавливает первичный ключ рецепта по короткому коду.
+
+    Возвращает None, если код не мог быть получен encode_short_code.
+    """
+    if not short_code.startswith(SHORT_CODE_PREFIX):
+        return None
+    short_code = short_code.removeprefix(SHORT_CODE_PREFIX)
+    half_bits = {
+        length: half_bits for half_bits, length in SHORT_CODE_DOMAINS
+    }.get(len(short_code))
+    if half_bits is None:
+        return None
+    value = 0
+    for char in short_code:
+        digit = SHORT_CODE_ALPHABET.find(char)
+        if digit < 0:
+            return None
+        value = value * len(SHORT_CODE_ALPHABET) + digit
+    if value >= 1 << (2 * half_bits):
+        return None
+    return unpermute_recipe_id(value, half_bits)
@@ -1,22 +1,63 @@
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, redirect
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
+from django.views.decorators.http import require_safe
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, status, viewsets
-from rest_framework.decorators import action, api_view
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 
+from core.constants import (
+    CURSOR_PAGINATION_QUERY_PARAM,
+    CURSOR_PAGINATION_VALUE,
+    PANTRY_FILTER_CHUNK_SIZE,
+    PANTRY_INGREDIENTS_QUERY_PARAM,
+    PANTRY_LIMIT_QUERY_PARAM,
+    RECIPE_BULK_MAX_ITEMS_ERROR,
+    RECIPE_BULK_UPSERT_QUERY_PARAM,
+    SHOPPING_CART_DEFAULT_FORMAT,
+    SHOPPING_CART_FILENAME,
+    SHOPPING_CART_FORMAT_QUERY_PARAM,
+)
+from core.mixins import SparseFieldsMixin, SubscriptionsContextMixin
+from core.negotiation import IgnoreClientContentNegotiation
+from core.pagination import RecipeCursorPagination
+from core.parsers import NDJSONParser
 from core.permissions import IsAuthorOrReadOnly
+
+from .bulk import RecipeBulkLoader
+from .cache import resolve_short_code
 from .filters import IngredientFilter, RecipeFilter
-from .models import Favorite, Ingredient, Recipe, ShoppingCart, ShortLink, Tag
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    ShortLink,
+    SimilarRecipe,
+    Tag,
+)
+from .pantry import pantry_index
 from .serializers import (
     IngredientSerializer,
+    PantryQuerySerializer,
     RecipeCreateSerializer,
     RecipeListSerializer,
     RecipeMinifiedSerializer,
     ShortLinkSerializer,
     TagSerializer,
 )
-from .utils import generate_shopping_cart_txt, generate_unique_short_code
+from .utils import (
+    SHOPPING_CART_FORMATS,
+    create_short_links,
+    get_feed_queryset,
+    get_shopping_cart_ingredients,
+    stream_shopping_cart,
+)
 
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
@@ -39,13 +80,36 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    SparseFieldsMixin, SubscriptionsContextMixin, viewsets.ModelViewSet
+):
     """Вьюсет для работы с рецептами."""
 
     queryset = Recipe.objects.all()
     permission_classes = [IsAuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    sparse_fields_actions = ('list', 'retrieve', 'feed', 'pantry')
+
+    @property
+    def paginator(self):
+        """Включает keyset-пагинацию по запросу клиента.
+
+        Параметр ?pagination=cursor (или переданный cursor) переключает
+        ленту на RecipeCursorPagination; без него остаётся limit/page.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            use_cursor = (
+                params.get(CURSOR_PAGINATION_QUERY_PARAM)
+                == CURSOR_PAGINATION_VALUE
+                or RecipeCursorPagination.cursor_query_param in params
+            )
+            if use_cursor:
+                self._paginator = RecipeCursorPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
 
     def get_serializer_class(self):
         """Возвращает подходящий класс сериализатора."""
@@ -93,15 +157,134 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user)
 
     def get_queryset(self):
-        """Возвращает оптимизированный набор запросов."""
-        return Recipe.objects.select_related(
-            'author',
-            'short_link',
-        ).prefetch_related(
-            'tags',
-            'recipe_ingredients__ingredient',
-            'favorites',
-            'shopping_cart',
+        """Возвращает оптимизированный набор запросов.
+
+        Автор присоединяется только если попадает в ответ. Теги
+        и ингредиенты догружает RecipeListSerializer и только для
+        рецептов, которых нет в кэше фрагментов.
+        """
+        queryset = Recipe.objects.select_related('short_link')
+        if self.is_field_requested('author'):
+            queryset = queryset.select_related('author')
+        return queryset.with_user_flags(self.request.user)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+        queryset = get_feed_queryset(request.user, self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.AllowAny],
+    )
+    def pantry(self, request):
+        """Рецепты, которые можно приготовить из имеющихся ингредиентов.
+
+        Рецепты ранжируются по доле своих ингредиентов, которые есть в
+        ?ingredients=, по индексу в памяти процесса. Фильтры RecipeFilter
+        применяются к кандидатам частями, пока не наберётся ?limit=.
+        """
+        params = request.query_params
+        data = {
+            'ingredients': [
+                value
+                for values in params.getlist(PANTRY_INGREDIENTS_QUERY_PARAM)
+                for value in values.split(',')
+                if value
+            ]
+        }
+        if PANTRY_LIMIT_QUERY_PARAM in params:
+            data['limit'] = params[PANTRY_LIMIT_QUERY_PARAM]
+        query = PantryQuerySerializer(data=data)
+        query.is_valid(raise_exception=True)
+        limit = query.validated_data['limit']
+        filtered = self.filter_queryset(Recipe.objects.all())
+        ranked = pantry_index.rank(query.validated_data['ingredients'])
+        matches = []
+        while len(matches) < limit:
+            chunk = list(islice(ranked, PANTRY_FILTER_CHUNK_SIZE))
+            if not chunk:
+                break
+            allowed = set(
+                filtered.filter(
+                    pk__in=[recipe_id for recipe_id, _, _ in chunk]
+                ).values_list('pk', flat=True)
+            )
+            matches.extend(item for item in chunk if item[0] in allowed)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in matches[:limit]]
+        )
+        matches = [item for item in matches[:limit] if item[0] in recipes]
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id, _, _ in matches], many=True
+        )
+        data = serializer.data
+        for item, (_, matched, total) in zip(data, matches, strict=True):
+            item['matched_ingredients'] = matched
+            item['total_ingredients'] = total
+            item['coverage'] = round(matched / total, 4)
+        return Response(data)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[permissions.IsAuthenticated],
+        parser_classes=[JSONParser, NDJSONParser],
+    )
+    def bulk(self, request):
+        """Пакетно создаёт рецепты из JSON-массива или NDJSON.
+
+        С параметром ?upsert=true рецепт автора с тем же названием
+        обновляется. Возвращает результат по каждому элементу.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'detail': 'Ожидается массив рецептов.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.RECIPE_BULK_MAX_ITEMS:
+            return Response(
+                {
+                    'detail': RECIPE_BULK_MAX_ITEMS_ERROR.format(
+                        max_items=settings.RECIPE_BULK_MAX_ITEMS
+                    )
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        upsert = (
+            request.query_params.get(
+                RECIPE_BULK_UPSERT_QUERY_PARAM, ''
+            ).lower()
+            == 'true'
+        )
+        results = RecipeBulkLoader(
+            request.user, self.get_serializer_context(), upsert
+        ).load(items)
+        summary = Counter(result['status'] for result in results)
+        return Response(
+            {
+                'created': summary['created'],
+                'updated': summary['updated'],
+                'failed': summary['error'],
+                'results': results,
+            },
+            status=(
+                status.HTTP_207_MULTI_STATUS
+                if summary['error']
+                else status.HTTP_200_OK
+            ),
         )
 
     @action(
@@ -120,14 +303,33 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
             return Response(serializer.data)
         except ShortLink.DoesNotExist:
-            short_link = ShortLink.objects.create(
-                recipe=recipe, short_code=generate_unique_short_code()
-            )
+            create_short_links([recipe.pk])
+            short_link = ShortLink.objects.get(recipe=recipe)
             serializer = ShortLinkSerializer(
                 short_link, context={'request': request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(
+        detail=True,
+        methods=['get'],
+        permission_classes=[permissions.AllowAny],
+    )
+    def similar(self, request, pk=None):
+        """Похожие рецепты из предрасчитанной таблицы SimilarRecipe."""
+        recipe = self.get_object()
+        entries = (
+            SimilarRecipe.objects.filter(recipe=recipe)
+            .select_related('similar')
+            .order_by('-score', 'similar_id')
+        )
+        serializer = RecipeMinifiedSerializer(
+            [entry.similar for entry in entries],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -170,9 +372,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = self.get_object()
         user = request.user
         if request.method == 'POST':
-            cart_item, created = ShoppingCart.objects.get_or_create(
-                user=user, recipe=recipe
-            )
+            with transaction.atomic():
+                cart_item, created = ShoppingCart.objects.get_or_create(
+                    user=user, recipe=recipe
+                )
             if not created:
                 return Response(
                     {'errors': 'Рецепт уже добавлен в список покупок'},
@@ -181,15 +384,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer = RecipeMinifiedSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         elif request.method == 'DELETE':
-            cart_item = ShoppingCart.objects.filter(
-                user=user, recipe=recipe
-            ).first()
-            if not cart_item:
+            with transaction.atomic():
+                deleted, _ = ShoppingCart.objects.filter(
+                    user=user, recipe=recipe
+                ).delete()
+            if not deleted:
                 return Response(
                     {'errors': 'Рецепт не найден в списке покупок'},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            cart_item.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -197,30 +400,49 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['get'],
         permission_classes=[permissions.IsAuthenticated],
         url_path='download_shopping_cart',
+        content_negotiation_class=IgnoreClientContentNegotiation,
     )
     def download_shopping_cart(self, request):
-        """Скачивает список покупок в формате TXT."""
-        user = request.user
-        shopping_cart_recipes = Recipe.objects.filter(shopping_cart__user=user)
-        if not shopping_cart_recipes.exists():
+        """Скачивает список покупок в формате TXT, CSV или PDF."""
+        file_format = (
+            request.query_params.get(SHOPPING_CART_FORMAT_QUERY_PARAM)
+            or SHOPPING_CART_DEFAULT_FORMAT
+        )
+        if file_format not in SHOPPING_CART_FORMATS:
+            return Response(
+                {
+                    'errors': 'Неподдерживаемый формат. Доступны: '
+                    + ', '.join(SHOPPING_CART_FORMATS)
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        ingredients = list(get_shopping_cart_ingredients(request.user))
+        if not ingredients:
             return Response(
                 {'errors': 'Список покупок пуст'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        txt_content = generate_shopping_cart_txt(shopping_cart_recipes)
-        response = HttpResponse(
-            txt_content, content_type='text/plain; charset=utf-8'
+        content_type, _ = SHOPPING_CART_FORMATS[file_format]
+        response = StreamingHttpResponse(
+            stream_shopping_cart(ingredients, file_format),
+            content_type=content_type,
         )
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_cart.txt"'
+            f'attachment; filename="{SHOPPING_CART_FILENAME}.{file_format}"'
         )
         return response
 
 
-@api_view(['GET'])
+@require_safe
 def short_link_redirect(request, short_code):
-    """Перенаправляет на страницу рецепта по короткому коду."""
-    short_link = get_object_or_404(ShortLink, short_code=short_code)
-    return redirect(
-        f'https://foodgram-ya.myddns.me/recipes/{short_link.recipe.id}'
+    """Перенаправляет на страницу рецепта по короткому коду.
+
+    Обычное представление Django без DRF: ссылки открывают анонимные
+    пользователи, поэтому аутентификация и согласование формата не нужны.
+    """
+    recipe_id = resolve_short_code(short_code)
+    if recipe_id is None:
+        raise Http404
+    return HttpResponseRedirect(
+        f'{settings.SHORT_LINK_REDIRECT_HOST}/recipes/{recipe_id}'
     )
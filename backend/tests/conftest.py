@@ -0,0 +1,128 @@
+import base64
+import io
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Tag
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """Загруженные в тестах файлы сохраняются во временный каталог."""
+    settings.MEDIA_ROOT = tmp_path
+
+
+@pytest.fixture
+def make_user(db):
+    """Фабрика пользователей с уникальными email и username."""
+    counter = iter(range(1_000_000))
+
+    def make(**kwargs):
+        number = next(counter)
+        data = {
+            'email': f'user{number}@example.com',
+            'username': f'user{number}',
+            'first_name': 'Имя',
+            'last_name': 'Фамилия',
+            'password': 'Password12345',
+        }
+        data.update(kwargs)
+        return User.objects.create_user(**data)
+
+    return make
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def make_client():
+    """Фабрика клиентов API, аутентифицированных как user."""
+
+    def make(user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    return make
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=f'Тег {i}', slug=f'tag{i}') for i in range(3)
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(name=f'Ингредиент {i}', measurement_unit='г')
+        for i in range(10)
+    ]
+
+
+@pytest.fixture
+def image():
+    """Изображение PNG в формате data URI, как его присылает фронтенд."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), 'red').save(buffer, 'PNG')
+    return (
+        'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+@pytest.fixture
+def recipe_data(tags, ingredients, image):
+    """Фабрика тела запроса на создание рецепта."""
+
+    def make(ingredient_amounts=None, name='Рецепт'):
+        if ingredient_amounts is None:
+            ingredient_amounts = dict.fromkeys(ingredients[:3], 5)
+        return {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient, amount in ingredient_amounts.items()
+            ],
+            'tags': [tag.id for tag in tags[:2]],
+            'image': image,
+            'name': name,
+            'text': 'Описание',
+            'cooking_time': 10,
+        }
+
+    return make
+
+
+@pytest.fixture
+def create_recipe(make_client, recipe_data):
+    """Фабрика рецептов, созданных через API от имени author."""
+
+    def create(author, **kwargs):
+        response = make_client(author).post(
+            '/api/recipes/', recipe_data(**kwargs), format='json'
+        )
+        assert response.status_code == 201, response.content
+        return response.json()
+
+    return create
+
+
+@pytest.fixture
+def count_queries():
+    """Возвращает число запросов к базе, выполненных при вызове func."""
+
+    def count(func):
+        with CaptureQueriesContext(connection) as context:
+            func()
+        return len(context.captured_queries)
+
+    return count
@@ -0,0 +1,131 @@
+import json
+
+import pytest
+
+from recipes.models import Recipe, ShortLink
+
+BULK_URL = '/api/recipes/bulk/'
+
+
+@pytest.fixture
+def api_client(user, make_client):
+    return make_client(user)
+
+
+@pytest.mark.django_db
+def test_partial_failure_returns_207(
+    user, api_client, recipe_data, ingredients, tags
+):
+    repeated = recipe_data({ingredients[0]: 1}, name='Повтор')
+    repeated['ingredients'] *= 2
+    unknown_tag = recipe_data(name='Без тега')
+    unknown_tag['tags'] = [tags[-1].id + 100]
+    items = [
+        recipe_data(name='Первый'),
+        repeated,
+        {'name': 'Неполный'},
+        unknown_tag,
+        'не рецепт',
+        recipe_data(name='Второй'),
+    ]
+
+    response = api_client.post(BULK_URL, items, format='json')
+
+    assert response.status_code == 207
+    body = response.json()
+    assert (body['created'], body['updated'], body['failed']) == (2, 0, 4)
+    statuses = [
+        (result['index'], result['status']) for result in body['results']
+    ]
+    assert statuses == [
+        (0, 'created'),
+        (1, 'error'),
+        (2, 'error'),
+        (3, 'error'),
+        (4, 'error'),
+        (5, 'created'),
+    ]
+    assert all(
+        result['errors'] for result in body['results'] if 'errors' in result
+    )
+    created = Recipe.objects.filter(author=user)
+    assert set(created.values_list('name', flat=True)) == {'Первый', 'Второй'}
+    for recipe in created:
+        assert recipe.recipe_ingredients.count() == 3
+        assert recipe.tags.count() == 2
+    assert ShortLink.objects.filter(recipe__in=created).count() == 2
+    user.refresh_from_db()
+    assert user.recipes_count == 2
+
+
+@pytest.mark.django_db
+def test_valid_batch_returns_200(api_client, recipe_data):
+    response = api_client.post(
+        BULK_URL,
+        [recipe_data(name=f'Рецепт {number}') for number in range(3)],
+        format='json',
+    )
+
+    assert response.status_code == 200
+    assert response.json()['created'] == 3
+
+
+@pytest.mark.django_db
+def test_ndjson_upsert_updates_by_name(
+    user, api_client, create_recipe, recipe_data, ingredients
+):
+    existing = create_recipe(user, name='Суп')
+    lines = [
+        recipe_data({ingredients[7]: 4}, name='Суп'),
+        recipe_data(name='Новый'),
+        recipe_data(name='Новый'),
+    ]
+    body = ''.join(json.dumps(line) + '\n' for line in lines)
+
+    response = api_client.post(
+        f'{BULK_URL}?upsert=true',
+        body,
+        content_type='application/x-ndjson',
+    )
+
+    assert response.status_code == 207
+    results = response.json()['results']
+    assert results[0] == {
+        'index': 0,
+        'status': 'updated',
+        'id': existing['id'],
+    }
+    assert [result['status'] for result in results[1:]] == [
+        'created',
+        'error',
+    ]
+    assert list(
+        Recipe.objects.get(pk=existing['id']).recipe_ingredients.values_list(
+            'ingredient_id', 'amount'
+        )
+    ) == [(ingredients[7].id, 4)]
+
+
+@pytest.mark.django_db
+def test_too_many_items_are_rejected(settings, api_client, recipe_data):
+    settings.RECIPE_BULK_MAX_ITEMS = 2
+    items = [recipe_data(name=f'Рецепт {number}') for number in range(3)]
+    body = ''.join(json.dumps(item) + '\n' for item in items)
+
+    json_response = api_client.post(BULK_URL, items, format='json')
+    ndjson_response = api_client.post(
+        BULK_URL, body, content_type='application/x-ndjson'
+    )
+
+    assert json_response.status_code == 400
+    assert ndjson_response.status_code == 400
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.django_db
+def test_malformed_ndjson_is_rejected(api_client):
+    response = api_client.post(
+        BULK_URL, '{"name": \n', content_type='application/x-ndjson'
+    )
+
+    assert response.status_code == 400
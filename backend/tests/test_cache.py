@@ -0,0 +1,121 @@
+import pytest
+from django.core.cache import cache, caches
+
+from core.cache import BatchDatabaseCache
+from recipes.cache import get_recipe_fragments
+from recipes.models import Recipe
+
+
+@pytest.mark.django_db
+def test_batch_set_many_overwrites_keys_in_constant_queries(count_queries):
+    assert isinstance(caches['default'], BatchDatabaseCache)
+    cache.set('a', 'old')
+
+    few = count_queries(lambda: cache.set_many({'a': 1, 'b': 2}))
+    many = count_queries(
+        lambda: cache.set_many({f'key{i}': i for i in range(50)})
+    )
+
+    assert many == few
+    assert cache.get_many(['a', 'b', 'key49']) == {'a': 1, 'b': 2, 'key49': 49}
+
+
+@pytest.mark.django_db
+def test_batch_set_many_keeps_timeout():
+    cache.set_many({'temporary': 1}, timeout=-1)
+    cache.set_many({'permanent': 2}, timeout=None)
+
+    assert cache.get('temporary') is None
+    assert cache.get('permanent') == 2
+
+
+@pytest.fixture
+def cached_recipe(user, make_client, create_recipe):
+    """Рецепт, фрагмент которого уже лежит в кэше."""
+    recipe = create_recipe(user)
+    make_client().get(f'/api/recipes/{recipe["id"]}/')
+    assert get_recipe_fragments([recipe['id']])
+    return Recipe.objects.get(pk=recipe['id'])
+
+
+@pytest.fixture
+def fetch_recipe(make_client, django_capture_on_commit_callbacks):
+    """Выполняет изменение и возвращает рецепт, прочитанный через API."""
+
+    def fetch(recipe, change):
+        with django_capture_on_commit_callbacks(execute=True):
+            change()
+        return make_client().get(f'/api/recipes/{recipe.pk}/').json()
+
+    return fetch
+
+
+@pytest.mark.django_db
+def test_fragment_follows_recipe_change(cached_recipe, fetch_recipe):
+    def change():
+        cached_recipe.name = 'Новое название'
+        cached_recipe.save()
+
+    assert fetch_recipe(cached_recipe, change)['name'] == 'Новое название'
+
+
+@pytest.mark.django_db
+def test_fragment_follows_ingredient_rows(
+    user, make_client, cached_recipe, fetch_recipe, recipe_data, ingredients
+):
+    def change():
+        response = make_client(user).patch(
+            f'/api/recipes/{cached_recipe.pk}/',
+            recipe_data({ingredients[0]: 7, ingredients[5]: 1}),
+            format='json',
+        )
+        assert response.status_code == 200, response.content
+
+    data = fetch_recipe(cached_recipe, change)
+
+    assert {item['id']: item['amount'] for item in data['ingredients']} == {
+        ingredients[0].id: 7,
+        ingredients[5].id: 1,
+    }
+
+
+@pytest.mark.django_db
+def test_fragment_follows_ingredient_rename(
+    cached_recipe, fetch_recipe, ingredients
+):
+    def change():
+        ingredients[0].name = 'Переименованный'
+        ingredients[0].save()
+
+    data = fetch_recipe(cached_recipe, change)
+
+    assert 'Переименованный' in {item['name'] for item in data['ingredients']}
+
+
+@pytest.mark.django_db
+def test_fragment_follows_recipe_tags(cached_recipe, fetch_recipe, tags):
+    data = fetch_recipe(cached_recipe, lambda: cached_recipe.tags.set(tags))
+
+    assert {tag['id'] for tag in data['tags']} == {tag.id for tag in tags}
+
+
+@pytest.mark.django_db
+def test_fragment_follows_tag_rename(cached_recipe, fetch_recipe, tags):
+    def change():
+        tags[0].name = 'Переименованный'
+        tags[0].save()
+
+    data = fetch_recipe(cached_recipe, change)
+
+    assert 'Переименованный' in {tag['name'] for tag in data['tags']}
+
+
+@pytest.mark.django_db
+def test_fragment_follows_author_profile(user, cached_recipe, fetch_recipe):
+    def change():
+        user.first_name = 'Новое имя'
+        user.save()
+
+    assert fetch_recipe(cached_recipe, change)['author']['first_name'] == (
+        'Новое имя'
+    )
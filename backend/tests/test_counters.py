@@ -0,0 +1,111 @@
+import pytest
+from django.core.management import call_command
+
+from recipes.models import Favorite, Recipe
+from users.models import Follow, User
+
+
+@pytest.fixture
+def author(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def recipe(author, create_recipe):
+    return Recipe.objects.get(pk=create_recipe(author)['id'])
+
+
+def get_counters(author, recipe):
+    author = User.objects.get(pk=author.pk)
+    return {
+        'favorites_count': Recipe.objects.get(pk=recipe.pk).favorites_count,
+        'recipes_count': author.recipes_count,
+        'followers_count': author.followers_count,
+    }
+
+
+@pytest.mark.django_db
+def test_favorites_count_follows_favorites(user, make_client, recipe):
+    client = make_client(user)
+
+    response = client.post(f'/api/recipes/{recipe.pk}/favorite/')
+    assert response.status_code == 201
+    assert Recipe.objects.get(pk=recipe.pk).favorites_count == 1
+
+    response = client.delete(f'/api/recipes/{recipe.pk}/favorite/')
+    assert response.status_code == 204
+    assert Recipe.objects.get(pk=recipe.pk).favorites_count == 0
+
+
+@pytest.mark.django_db
+def test_recipes_count_follows_recipes(author, make_client, create_recipe):
+    first, second = create_recipe(author), create_recipe(author)
+    assert User.objects.get(pk=author.pk).recipes_count == 2
+
+    response = make_client(author).delete(f'/api/recipes/{first["id"]}/')
+    assert response.status_code == 204
+    assert User.objects.get(pk=author.pk).recipes_count == 1
+
+    Recipe.objects.filter(pk=second['id']).delete()
+    assert User.objects.get(pk=author.pk).recipes_count == 0
+
+
+@pytest.mark.django_db
+def test_followers_count_follows_subscriptions(user, author, make_client):
+    client = make_client(user)
+
+    response = client.post(f'/api/users/{author.pk}/subscribe/')
+    assert response.status_code == 201
+    assert User.objects.get(pk=author.pk).followers_count == 1
+
+    response = client.delete(f'/api/users/{author.pk}/subscribe/')
+    assert response.status_code == 204
+    assert User.objects.get(pk=author.pk).followers_count == 0
+
+
+@pytest.mark.django_db
+def test_counters_do_not_go_below_zero(user, author, recipe):
+    Recipe.objects.filter(pk=recipe.pk).update(favorites_count=0)
+    User.objects.filter(pk=author.pk).update(recipes_count=0)
+
+    Favorite.objects.bulk_create([Favorite(user=user, recipe=recipe)])
+    Favorite.objects.filter(user=user).delete()
+    assert Recipe.objects.get(pk=recipe.pk).favorites_count == 0
+    recipe.delete()
+
+    assert User.objects.get(pk=author.pk).recipes_count == 0
+
+
+@pytest.fixture
+def drifted(user, author, recipe):
+    """Счётчики, разошедшиеся с данными: одно избранное и один подписчик."""
+    Favorite.objects.create(user=user, recipe=recipe)
+    Follow.objects.create(user=user, author=author)
+    Recipe.objects.filter(pk=recipe.pk).update(favorites_count=5)
+    User.objects.filter(pk=author.pk).update(
+        recipes_count=0, followers_count=3
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('drifted')
+def test_reconcilecounters_fixes_drift(author, recipe):
+    call_command('reconcilecounters')
+
+    assert get_counters(author, recipe) == {
+        'favorites_count': 1,
+        'recipes_count': 1,
+        'followers_count': 1,
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('drifted')
+def test_reconcilecounters_verify_does_not_write(author, recipe):
+    call_command('reconcilecounters', '--verify')
+
+    assert get_counters(author, recipe) == {
+        'favorites_count': 5,
+        'recipes_count': 0,
+        'followers_count': 3,
+    }
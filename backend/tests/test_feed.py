@@ -0,0 +1,98 @@
+import pytest
+
+from recipes.models import FeedEntry
+from recipes.utils import push_recipe_to_feeds
+from users.models import Follow
+
+
+@pytest.fixture
+def get_feed(make_client):
+    """Возвращает id рецептов ленты пользователя в порядке выдачи."""
+
+    def get(user):
+        response = make_client(user).get('/api/recipes/feed/?limit=100')
+        assert response.status_code == 200
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    return get
+
+
+@pytest.fixture
+def publish(settings, create_recipe, django_capture_on_commit_callbacks):
+    """Создаёт рецепт и сразу выполняет поставленные при этом задачи."""
+    settings.TASK_QUEUE_EAGER = True
+
+    def create(author):
+        with django_capture_on_commit_callbacks(execute=True):
+            return create_recipe(author)['id']
+
+    return create
+
+
+def get_feed_entries(user):
+    return set(
+        FeedEntry.objects.filter(user=user).values_list('recipe_id', flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_new_recipe_is_pushed_to_followers(user, make_user, publish, get_feed):
+    author, stranger = make_user(), make_user()
+    Follow.objects.create(user=user, author=author)
+
+    recipe_id = publish(author)
+
+    assert get_feed_entries(user) == {recipe_id}
+    assert get_feed(user) == [recipe_id]
+    assert get_feed_entries(stranger) == set()
+    assert get_feed(stranger) == []
+
+
+@pytest.mark.django_db
+def test_repeated_push_does_not_duplicate_entries(user, make_user, publish):
+    author = make_user()
+    Follow.objects.create(user=user, author=author)
+    recipe_id = publish(author)
+
+    push_recipe_to_feeds(recipe_id)
+
+    assert FeedEntry.objects.filter(user=user).count() == 1
+
+
+@pytest.mark.django_db
+def test_popular_author_is_read_on_fan_out(
+    settings, user, make_user, publish, get_feed
+):
+    settings.FEED_FANOUT_MAX_FOLLOWERS = 1
+    popular, regular = make_user(), make_user()
+    Follow.objects.create(user=make_user(), author=popular)
+    Follow.objects.create(user=user, author=popular)
+    Follow.objects.create(user=user, author=regular)
+
+    regular_recipe = publish(regular)
+    popular_recipe = publish(popular)
+
+    assert get_feed_entries(user) == {regular_recipe}
+    assert get_feed(user) == [popular_recipe, regular_recipe]
+
+
+@pytest.mark.django_db
+def test_follow_backfills_and_unfollow_prunes_feed(
+    settings, user, make_user, make_client, create_recipe, publish, get_feed
+):
+    settings.FEED_BACKFILL_LIMIT = 2
+    author, other = make_user(), make_user()
+    recipe_ids = [create_recipe(author)['id'] for _ in range(3)]
+    Follow.objects.create(user=user, author=other)
+    other_recipe = publish(other)
+    client = make_client(user)
+
+    response = client.post(f'/api/users/{author.pk}/subscribe/')
+    assert response.status_code == 201
+    assert get_feed_entries(user) == {*recipe_ids[1:], other_recipe}
+    assert get_feed(user) == [other_recipe, recipe_ids[2], recipe_ids[1]]
+
+    response = client.delete(f'/api/users/{author.pk}/subscribe/')
+    assert response.status_code == 204
+    assert get_feed_entries(user) == {other_recipe}
+    assert get_feed(user) == [other_recipe]
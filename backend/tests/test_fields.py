@@ -0,0 +1,50 @@
+import base64
+
+import pytest
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from core.fields import Base64ImageField
+
+
+def get_error_codes(data):
+    with pytest.raises(ValidationError) as error:
+        Base64ImageField().run_validation(data)
+    return error.value.get_codes()
+
+
+def test_valid_image_is_decoded(image):
+    upload = Base64ImageField().run_validation(image)
+
+    with Image.open(upload) as decoded:
+        assert decoded.size == (40, 30)
+
+
+def test_image_over_byte_limit_is_rejected(settings, image):
+    settings.IMAGE_UPLOAD_MAX_BYTES = 10
+
+    assert get_error_codes(image) == ['max_bytes']
+
+
+def test_image_over_pixel_limit_is_rejected(settings, image):
+    settings.IMAGE_UPLOAD_MAX_PIXELS = 40 * 30 - 1
+
+    assert get_error_codes(image) == ['max_pixels']
+
+
+def test_decompression_bomb_is_rejected(monkeypatch, image):
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 100)
+
+    assert get_error_codes(image) == ['max_pixels']
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        'data:image/png;base64,!!!!',
+        'data:image/png;base64,abc',
+        'data:image;base64,' + base64.b64encode(b'image').decode(),
+    ],
+)
+def test_invalid_base64_is_rejected(data):
+    assert get_error_codes(data) == ['invalid_base64']
@@ -0,0 +1,123 @@
+from unittest import mock
+
+import pytest
+
+from recipes import views
+from recipes.pantry import PantryIndex
+
+
+@pytest.fixture
+def index(monkeypatch):
+    """Новый индекс вместо общего индекса процесса."""
+    pantry_index = PantryIndex()
+    monkeypatch.setattr(views, 'pantry_index', pantry_index)
+    return pantry_index
+
+
+@pytest.fixture
+def make_recipe(user, create_recipe, ingredients):
+    """Создаёт рецепт из ингредиентов с указанными номерами."""
+
+    def make(*numbers, **kwargs):
+        return create_recipe(
+            user,
+            ingredient_amounts={ingredients[number]: 1 for number in numbers},
+            **kwargs,
+        )['id']
+
+    return make
+
+
+@pytest.mark.django_db
+def test_rank_orders_by_coverage(index, make_recipe, ingredients):
+    half = make_recipe(0, 5)
+    full = make_recipe(0, 1)
+    three_quarters = make_recipe(0, 1, 2, 3)
+    other_full = make_recipe(2)
+    make_recipe(4)
+
+    ranked = list(index.rank([item.id for item in ingredients[:3]]))
+
+    assert ranked == [
+        (full, 2, 2),
+        (other_full, 1, 1),
+        (three_quarters, 3, 4),
+        (half, 1, 2),
+    ]
+
+
+@pytest.mark.django_db
+def test_rank_applies_logged_changes(
+    index,
+    make_recipe,
+    make_client,
+    user,
+    recipe_data,
+    ingredients,
+    django_capture_on_commit_callbacks,
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        first = make_recipe(0, 1)
+    assert [item[0] for item in index.rank([ingredients[0].id])] == [first]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        second = make_recipe(0)
+        make_client(user).patch(
+            f'/api/recipes/{first}/',
+            recipe_data({ingredients[2]: 1}),
+            format='json',
+        )
+    with mock.patch.object(index, 'load_in_background') as load:
+        ranked = list(index.rank([ingredients[0].id, ingredients[2].id]))
+
+    load.assert_not_called()
+    assert ranked == [(second, 1, 1), (first, 1, 1)]
+    assert list(index.rank([ingredients[1].id])) == []
+
+
+@pytest.mark.django_db
+def test_stale_index_is_rebuilt_in_background(
+    settings, index, make_recipe, ingredients
+):
+    make_recipe(0)
+    list(index.rank([ingredients[0].id]))
+    settings.PANTRY_INDEX_TIMEOUT = -1
+
+    with mock.patch.object(index, 'load_in_background') as load:
+        ranked = list(index.rank([ingredients[0].id]))
+
+    load.assert_called_once()
+    assert len(ranked) == 1
+
+
+@pytest.mark.django_db
+def test_pantry_endpoint(index, make_recipe, make_client, ingredients):
+    full = make_recipe(0, 1)
+    make_recipe(0, 2)
+    single = make_recipe(0)
+    ids = f'{ingredients[0].id},{ingredients[1].id}'
+
+    response = make_client().get(
+        f'/api/recipes/pantry/?ingredients={ids}&limit=2'
+    )
+
+    assert response.status_code == 200
+    assert [
+        (
+            item['id'],
+            item['matched_ingredients'],
+            item['total_ingredients'],
+            item['coverage'],
+        )
+        for item in response.json()
+    ] == [(full, 2, 2, 1.0), (single, 1, 1, 1.0)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'query', ['', 'ingredients=abc', 'ingredients=1&limit=0']
+)
+def test_pantry_endpoint_validates_query(index, make_client, query):
+    response = make_client().get(f'/api/recipes/pantry/?{query}')
+
+    assert response.status_code == 400
@@ -0,0 +1,129 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, RecipeIngredient, ShoppingCart
+from users.models import Follow
+
+
+@pytest.mark.django_db
+def test_recipe_list_queries_do_not_grow_with_page(
+    user, make_user, make_client, create_recipe, count_queries
+):
+    author = make_user()
+    client = make_client(user)
+
+    def add_recipes(count):
+        for _ in range(count):
+            recipe = create_recipe(author)
+            Favorite.objects.create(user=user, recipe_id=recipe['id'])
+            ShoppingCart.objects.create(user=user, recipe_id=recipe['id'])
+
+    def list_recipes():
+        cache.clear()
+        response = client.get('/api/recipes/')
+        assert response.status_code == 200
+
+    add_recipes(2)
+    small_page = count_queries(list_recipes)
+    add_recipes(4)
+    full_page = count_queries(list_recipes)
+
+    assert full_page == small_page
+    results = client.get('/api/recipes/').json()['results']
+    assert len(results) == 6
+    assert all(recipe['is_favorited'] for recipe in results)
+    assert all(recipe['is_in_shopping_cart'] for recipe in results)
+    assert all(
+        recipe['author']['is_subscribed'] is False for recipe in results
+    )
+
+
+@pytest.mark.django_db
+def test_recipe_list_user_flags(user, make_user, make_client, create_recipe):
+    author = make_user()
+    favorite, plain = create_recipe(author), create_recipe(author)
+    Favorite.objects.create(user=user, recipe_id=favorite['id'])
+
+    results = {
+        recipe['id']: recipe
+        for recipe in make_client(user).get('/api/recipes/').json()['results']
+    }
+    anonymous = make_client().get('/api/recipes/').json()['results']
+
+    assert results[favorite['id']]['is_favorited'] is True
+    assert results[plain['id']]['is_favorited'] is False
+    assert not any(recipe['is_favorited'] for recipe in anonymous)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('path', ['/api/recipes/', '/api/users/?limit=100'])
+def test_is_subscribed_is_loaded_once_for_page_authors(
+    path, user, make_user, make_client, create_recipe
+):
+    followed, other = make_user(), make_user()
+    for author in (followed, other):
+        create_recipe(author)
+    Follow.objects.bulk_create(
+        Follow(user=user, author=author)
+        for author in [followed, *(make_user() for _ in range(20))]
+    )
+
+    with CaptureQueriesContext(connection) as context:
+        results = make_client(user).get(path).json()['results']
+
+    follow_queries = [
+        query['sql']
+        for query in context.captured_queries
+        if Follow._meta.db_table in query['sql']
+    ]
+    assert len(follow_queries) == 1
+    assert '"author_id" IN' in follow_queries[0]
+    subscribed = {
+        item['id']: item['is_subscribed']
+        for item in (
+            [recipe['author'] for recipe in results]
+            if path == '/api/recipes/'
+            else results
+        )
+    }
+    assert subscribed[followed.id] is True
+    assert subscribed[other.id] is False
+
+
+@pytest.mark.django_db
+def test_recipe_create_queries_do_not_grow_with_ingredients(
+    user, make_client, recipe_data, ingredients, count_queries
+):
+    client = make_client(user)
+
+    def create(count):
+        data = recipe_data(dict.fromkeys(ingredients[:count], 5))
+        response = client.post('/api/recipes/', data, format='json')
+        assert response.status_code == 201, response.content
+
+    few = count_queries(lambda: create(2))
+    many = count_queries(lambda: create(8))
+
+    assert many == few
+    assert sorted(
+        RecipeIngredient.objects.filter(recipe__name='Рецепт')
+        .values_list('recipe_id', flat=True)
+        .annotate(count=Count('id'))
+        .values_list('count', flat=True)
+    ) == [2, 8]
+
+
+@pytest.mark.django_db
+def test_recipe_create_rejects_unknown_ingredient(
+    user, make_client, recipe_data, ingredients
+):
+    data = recipe_data()
+    data['ingredients'].append({'id': ingredients[-1].id + 100, 'amount': 1})
+
+    response = make_client(user).post('/api/recipes/', data, format='json')
+
+    assert response.status_code == 400
+    assert not RecipeIngredient.objects.exists()
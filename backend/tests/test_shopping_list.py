@@ -0,0 +1,281 @@
+from collections import Counter
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import (
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingListItem,
+)
+from recipes.utils import calculate_shopping_list_totals
+
+
+def assert_shopping_lists_consistent():
+    """Материализованные списки совпадают с пересчётом по ShoppingCart."""
+    stored = {
+        (user_id, ingredient_id): total_amount
+        for user_id, ingredient_id, total_amount in (
+            ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'total_amount'
+            )
+        )
+    }
+    assert stored == calculate_shopping_list_totals()
+
+
+@pytest.fixture
+def recipe(user, create_recipe, ingredients):
+    return Recipe.objects.get(
+        pk=create_recipe(
+            user, ingredient_amounts={ingredients[0]: 5, ingredients[1]: 3}
+        )['id']
+    )
+
+
+@pytest.fixture
+def buyers(make_user, make_client, recipe):
+    """Два пользователя, добавившие recipe в список покупок через API."""
+    users = [make_user(), make_user()]
+    for buyer in users:
+        response = make_client(buyer).post(
+            f'/api/recipes/{recipe.pk}/shopping_cart/'
+        )
+        assert response.status_code == 201
+    return users
+
+
+@pytest.mark.django_db
+def test_shopping_cart_api_updates_list(
+    make_client, create_recipe, ingredients, recipe, buyers
+):
+    other = create_recipe(
+        buyers[0], ingredient_amounts={ingredients[0]: 2, ingredients[2]: 1}
+    )
+    client = make_client(buyers[0])
+    client.post(f'/api/recipes/{other["id"]}/shopping_cart/')
+
+    assert (
+        ShoppingListItem.objects.get(
+            user=buyers[0], ingredient=ingredients[0]
+        ).total_amount
+        == 7
+    )
+    assert_shopping_lists_consistent()
+
+    response = client.delete(f'/api/recipes/{recipe.pk}/shopping_cart/')
+
+    assert response.status_code == 204
+    assert set(
+        ShoppingListItem.objects.filter(user=buyers[0]).values_list(
+            'ingredient_id', 'total_amount'
+        )
+    ) == {(ingredients[0].id, 2), (ingredients[2].id, 1)}
+    assert_shopping_lists_consistent()
+
+
+def change_amount(recipe, ingredients):
+    row = recipe.recipe_ingredients.get(ingredient=ingredients[0])
+    row.amount += 4
+    row.save()
+
+
+def change_ingredient(recipe, ingredients):
+    row = recipe.recipe_ingredients.get(ingredient=ingredients[0])
+    row.ingredient = ingredients[5]
+    row.save()
+
+
+def add_ingredient(recipe, ingredients):
+    RecipeIngredient.objects.create(
+        recipe=recipe, ingredient=ingredients[6], amount=2
+    )
+
+
+def delete_ingredient(recipe, ingredients):
+    recipe.recipe_ingredients.get(ingredient=ingredients[1]).delete()
+
+
+def delete_ingredients(recipe, ingredients):
+    recipe.recipe_ingredients.all().delete()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'edit',
+    [
+        change_amount,
+        change_ingredient,
+        add_ingredient,
+        delete_ingredient,
+        delete_ingredients,
+    ],
+)
+def test_recipe_ingredient_row_edits_update_lists(
+    recipe, ingredients, buyers, edit
+):
+    # Так строки сохраняет инлайн RecipeIngredient в админке.
+    edit(recipe, ingredients)
+
+    assert_shopping_lists_consistent()
+
+
+@pytest.mark.django_db
+def test_shopping_cart_row_edits_update_lists(
+    make_user, create_recipe, ingredients, recipe, buyers
+):
+    other = Recipe.objects.get(
+        pk=create_recipe(buyers[0], ingredient_amounts={ingredients[3]: 4})[
+            'id'
+        ]
+    )
+    customer = make_user()
+
+    cart = ShoppingCart.objects.create(user=customer, recipe=recipe)
+    assert_shopping_lists_consistent()
+    cart.recipe = other
+    cart.save()
+    assert_shopping_lists_consistent()
+    cart.user = buyers[1]
+    cart.save()
+    assert_shopping_lists_consistent()
+    ShoppingCart.objects.filter(user=buyers[1]).delete()
+    assert_shopping_lists_consistent()
+    assert not ShoppingListItem.objects.filter(user=buyers[1]).exists()
+
+
+@pytest.mark.django_db
+def test_recipe_delete_clears_lists(make_client, user, recipe, buyers):
+    response = make_client(user).delete(f'/api/recipes/{recipe.pk}/')
+
+    assert response.status_code == 204
+    assert not ShoppingListItem.objects.exists()
+
+
+@pytest.fixture
+def update_recipe(user, make_client, recipe, tags):
+    """PATCH рецепта; возвращает SQL изменения его ингредиентов и тегов."""
+    client = make_client(user)
+
+    def update(ingredient_amounts, tag_ids=None):
+        data = {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient, amount in ingredient_amounts.items()
+            ],
+            'tags': tag_ids or [tag.id for tag in tags[:2]],
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        }
+        with CaptureQueriesContext(connection) as context:
+            response = client.patch(
+                f'/api/recipes/{recipe.pk}/', data, format='json'
+            )
+        assert response.status_code == 200, response.content
+        return [
+            query['sql']
+            for query in context.captured_queries
+            if not query['sql'].startswith('SELECT')
+            and (
+                'recipes_recipeingredient' in query['sql']
+                or 'recipes_recipe_tags' in query['sql']
+            )
+        ]
+
+    return update
+
+
+@pytest.mark.django_db
+def test_unchanged_update_does_not_write(
+    recipe, ingredients, buyers, update_recipe
+):
+    writes = update_recipe({ingredients[0]: 5, ingredients[1]: 3})
+
+    assert writes == []
+    assert_shopping_lists_consistent()
+
+
+@pytest.mark.django_db
+def test_update_applies_ingredient_diff(
+    recipe, ingredients, tags, buyers, update_recipe
+):
+    kept = recipe.recipe_ingredients.get(ingredient=ingredients[0])
+
+    writes = update_recipe(
+        {ingredients[0]: 8, ingredients[4]: 2}, [tags[0].id, tags[2].id]
+    )
+
+    assert Counter(
+        (sql.split()[0], 'tags' if 'recipes_recipe_tags' in sql else 'rows')
+        for sql in writes
+    ) == {
+        ('UPDATE', 'rows'): 1,
+        ('DELETE', 'rows'): 1,
+        ('INSERT', 'rows'): 1,
+        ('DELETE', 'tags'): 1,
+        ('INSERT', 'tags'): 1,
+    }
+    assert set(
+        recipe.recipe_ingredients.values_list('id', 'ingredient_id', 'amount')
+    ) == {
+        (kept.pk, ingredients[0].id, 8),
+        (
+            recipe.recipe_ingredients.get(ingredient=ingredients[4]).pk,
+            ingredients[4].id,
+            2,
+        ),
+    }
+    assert set(recipe.tags.values_list('id', flat=True)) == {
+        tags[0].id,
+        tags[2].id,
+    }
+    assert (
+        ShoppingListItem.objects.get(
+            user=buyers[0], ingredient=ingredients[0]
+        ).total_amount
+        == 8
+    )
+    assert_shopping_lists_consistent()
+
+
+@pytest.mark.django_db
+def test_removal_from_drifted_list_does_not_fail(
+    make_client, recipe, ingredients, buyers
+):
+    ShoppingListItem.objects.filter(
+        user=buyers[0], ingredient=ingredients[0]
+    ).update(total_amount=1)
+
+    response = make_client(buyers[0]).delete(
+        f'/api/recipes/{recipe.pk}/shopping_cart/'
+    )
+
+    assert response.status_code == 204
+    assert not ShoppingListItem.objects.filter(user=buyers[0]).exists()
+
+
+@pytest.mark.django_db
+def test_update_queries_do_not_grow_with_removed_ingredients(
+    user, make_client, create_recipe, recipe_data, ingredients, count_queries
+):
+    client = make_client(user)
+    kept = {ingredients[0]: 1}
+
+    def remove(count):
+        recipe = create_recipe(
+            user, ingredient_amounts=dict.fromkeys(ingredients[: count + 1], 1)
+        )
+        ShoppingCart.objects.create(user=user, recipe_id=recipe['id'])
+        return count_queries(
+            lambda: client.patch(
+                f'/api/recipes/{recipe["id"]}/',
+                recipe_data(kept),
+                format='json',
+            )
+        )
+
+    assert remove(1) == remove(8)
+    assert_shopping_lists_consistent()
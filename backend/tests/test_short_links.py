@@ -0,0 +1,165 @@
+import time
+
+import pytest
+from django.core.cache import cache
+
+from core.constants import (
+    SHORT_CODE_ALPHABET,
+    SHORT_CODE_DOMAINS,
+    SHORT_CODE_PREFIX,
+)
+from recipes.cache import resolve_short_code, short_link_local_cache
+from recipes.models import ShortLink
+from recipes.utils import decode_short_code, encode_short_code
+
+BOUNDARY_IDS = [
+    1,
+    2,
+    1 << 31,
+    (1 << 32) - 1,
+    1 << 32,
+    (1 << 48) - 1,
+]
+
+
+@pytest.mark.parametrize('recipe_id', BOUNDARY_IDS)
+def test_short_code_round_trip(recipe_id):
+    code = encode_short_code(recipe_id)
+
+    assert code.startswith(SHORT_CODE_PREFIX)
+    assert len(code) == (7 if recipe_id < 1 << 32 else 10)
+    assert set(code.removeprefix(SHORT_CODE_PREFIX)) <= set(
+        SHORT_CODE_ALPHABET
+    )
+    assert decode_short_code(code) == recipe_id
+
+
+def test_short_codes_do_not_collide():
+    codes = {encode_short_code(recipe_id) for recipe_id in range(1, 20_001)}
+
+    assert len(codes) == 20_000
+
+
+def test_short_code_space_is_limited():
+    half_bits, _ = SHORT_CODE_DOMAINS[-1]
+
+    with pytest.raises(ValueError):
+        encode_short_code(1 << (2 * half_bits))
+
+
+@pytest.mark.parametrize(
+    'short_code',
+    [
+        '',
+        'abc',
+        'abcdef',
+        '~abcde!',
+        '~' + SHORT_CODE_ALPHABET[-1] * 6,
+        '~' + 'a' * 7,
+    ],
+)
+def test_foreign_short_code_is_rejected(short_code):
+    assert decode_short_code(short_code) is None
+
+
+@pytest.mark.django_db
+def test_short_link_redirects_to_recipe(
+    settings, user, make_client, create_recipe
+):
+    recipe = create_recipe(user)
+    client = make_client()
+
+    response = client.get(f'/api/recipes/{recipe["id"]}/get-link/')
+    short_link = response.json()['short-link']
+    short_code = short_link.rstrip('/').rsplit('/', 1)[-1]
+    cache.clear()
+    short_link_local_cache.clear()
+    response = client.get(f'/s/{short_code}/')
+
+    assert short_code == encode_short_code(recipe['id'])
+    assert response.status_code == 302
+    assert response['Location'] == (
+        f'{settings.SHORT_LINK_REDIRECT_HOST}/recipes/{recipe["id"]}'
+    )
+
+
+@pytest.mark.django_db
+def test_unknown_short_link_returns_404(make_client):
+    assert (
+        make_client().get(f'/s/{encode_short_code(999)}/').status_code == 404
+    )
+
+
+def get_short_code(client, recipe_id):
+    response = client.get(f'/api/recipes/{recipe_id}/get-link/')
+    assert response.status_code == 200
+    return response.json()['short-link'].rstrip('/').rsplit('/', 1)[-1]
+
+
+@pytest.mark.django_db
+def test_legacy_short_code_does_not_collide(user, make_client, create_recipe):
+    legacy = create_recipe(user)
+    legacy_code = encode_short_code(legacy['id'] + 1).removeprefix(
+        SHORT_CODE_PREFIX
+    )
+    ShortLink.objects.filter(recipe_id=legacy['id']).update(
+        short_code=legacy_code
+    )
+    client = make_client()
+
+    recipe = create_recipe(user)
+
+    assert recipe['id'] == legacy['id'] + 1
+    assert get_short_code(client, recipe['id']) == encode_short_code(
+        recipe['id']
+    )
+    assert get_short_code(client, legacy['id']) == legacy_code
+    assert client.get(f'/s/{legacy_code}/')['Location'].endswith(
+        f'/recipes/{legacy["id"]}'
+    )
+
+
+@pytest.mark.django_db
+def test_short_code_after_secret_rotation(
+    settings, user, make_client, create_recipe
+):
+    old = create_recipe(user)
+    settings.SHORT_LINK_SECRET = 'rotated'
+    taken_code = encode_short_code(old['id'] + 1)
+    ShortLink.objects.filter(recipe_id=old['id']).update(short_code=taken_code)
+
+    recipe = create_recipe(user)
+    short_code = get_short_code(make_client(), recipe['id'])
+
+    assert short_code != taken_code
+    assert short_code == encode_short_code(recipe['id'], shortest=1)
+    assert decode_short_code(short_code) == recipe['id']
+
+
+@pytest.mark.django_db
+def test_warm_short_code_skips_database(
+    monkeypatch, user, create_recipe, count_queries
+):
+    recipe = create_recipe(user)
+    short_code = encode_short_code(recipe['id'])
+    short_link_local_cache.clear()
+    assert resolve_short_code(short_code) == recipe['id']
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 60 * 60 * 24 * 30)
+
+    assert count_queries(lambda: resolve_short_code(short_code)) == 0
+
+
+@pytest.mark.django_db
+def test_deleted_short_link_is_evicted(
+    user, create_recipe, django_capture_on_commit_callbacks
+):
+    recipe = create_recipe(user)
+    short_code = encode_short_code(recipe['id'])
+    assert resolve_short_code(short_code) == recipe['id']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ShortLink.objects.filter(recipe_id=recipe['id']).delete()
+
+    assert short_link_local_cache.get(short_code) is None
+    assert resolve_short_code(short_code) is None
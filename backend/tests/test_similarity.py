@@ -0,0 +1,129 @@
+import pytest
+
+from recipes.models import Recipe, RecipeIngredient, SimilarRecipe
+from recipes.similarity import (
+    SimilarityIndex,
+    SimilarityMatrix,
+    rebuild_similar_recipes,
+    update_similar_recipes,
+)
+
+
+@pytest.fixture
+def make_recipe(user, ingredients):
+    """Создаёт рецепт из ингредиентов с указанными номерами."""
+
+    def make(*numbers):
+        recipe = Recipe.objects.create(
+            author=user,
+            name='Рецепт',
+            text='Описание',
+            cooking_time=1,
+            image='recipes/images/recipe.png',
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient=ingredients[number], amount=1
+            )
+            for number in numbers
+        )
+        return recipe.pk
+
+    return make
+
+
+def get_similar(recipe_id):
+    return list(
+        SimilarRecipe.objects.filter(recipe_id=recipe_id)
+        .order_by('-score', 'similar_id')
+        .values_list('similar_id', flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_rebuild_ranks_by_rare_ingredients(settings, make_recipe):
+    settings.SIMILAR_RECIPES_LIMIT = 2
+    target = make_recipe(0, 1, 2)
+    rare = make_recipe(1, 2)
+    for _ in range(5):
+        make_recipe(0, 3)
+
+    rebuild_similar_recipes()
+
+    assert get_similar(target)[0] == rare
+    assert len(get_similar(target)) == 2
+    assert get_similar(rare) == [target]
+
+
+@pytest.mark.django_db
+def test_candidates_are_capped(settings, make_recipe):
+    settings.SIMILAR_RECIPES_CANDIDATE_INGREDIENTS = 1
+    settings.SIMILAR_RECIPES_POSTING_LIMIT = 3
+    target = make_recipe(0, 1)
+    rare = make_recipe(1)
+    for _ in range(10):
+        make_recipe(0)
+
+    index = SimilarityIndex.build_around([target])
+
+    assert set(index.ingredients) == {target, rare}
+
+
+@pytest.mark.django_db
+def test_matrix_matches_index(make_recipe):
+    recipe_ids = [
+        make_recipe(*numbers)
+        for numbers in ((0, 1, 2), (1, 2), (0, 3), (3, 4, 5), (6,), (2, 5))
+    ]
+
+    matrix = SimilarityMatrix.build()
+    index = SimilarityIndex.build_around(recipe_ids)
+
+    for recipe_id, neighbours in matrix.neighbours(recipe_ids, 10).items():
+        expected = index.neighbours(recipe_id, 10)
+        assert [pair[0] for pair in neighbours] == [
+            pair[0] for pair in expected
+        ]
+        assert [pair[1] for pair in neighbours] == pytest.approx(
+            [pair[1] for pair in expected]
+        )
+
+
+@pytest.mark.django_db
+def test_rebuild_skips_frequent_ingredients(settings, make_recipe):
+    settings.SIMILAR_RECIPES_MAX_INGREDIENT_SHARE = 0.5
+    settings.SIMILAR_RECIPES_POSTING_LIMIT = 1
+    target = make_recipe(0, 1)
+    rare = make_recipe(1)
+    common = [make_recipe(0) for _ in range(4)]
+
+    rebuild_similar_recipes()
+
+    assert get_similar(target) == [rare]
+    assert get_similar(common[0]) == []
+
+
+@pytest.mark.django_db
+def test_update_replaces_own_list_and_others(settings, make_recipe):
+    settings.SIMILAR_RECIPES_LIMIT = 2
+    target = make_recipe(0, 1)
+    old_neighbour = make_recipe(0, 1, 5)
+    new_neighbour = make_recipe(2, 3)
+    make_recipe(6, 7)
+    rebuild_similar_recipes()
+    assert target in get_similar(old_neighbour)
+
+    RecipeIngredient.objects.filter(recipe_id=target).delete()
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe_id=target, ingredient_id=ingredient_id, amount=1
+        )
+        for ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id=new_neighbour
+        ).values_list('ingredient_id', flat=True)
+    )
+    update_similar_recipes(target)
+
+    assert get_similar(target) == [new_neighbour]
+    assert get_similar(new_neighbour) == [target]
+    assert target not in get_similar(old_neighbour)
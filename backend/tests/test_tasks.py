@@ -0,0 +1,151 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from core.models import Task
+from core.tasks import (
+    claim_task,
+    enqueue,
+    execute_task,
+    purge_finished_tasks,
+    task,
+)
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task
+def fail():
+    raise ValueError('ошибка задачи')
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+@pytest.mark.django_db
+def test_claim_takes_due_tasks_in_order():
+    later = enqueue(record.task_name, (2,))
+    first = enqueue(record.task_name, (1,))
+    Task.objects.filter(pk=first.pk).update(
+        run_at=timezone.now() - timedelta(minutes=1)
+    )
+    enqueue(record.task_name, (3,), run_at=timezone.now() + timedelta(hours=1))
+
+    claimed = claim_task()
+    assert claimed.pk == first.pk
+    assert claimed.attempts == 1
+    assert claimed.status == Task.Status.RUNNING
+    assert claim_task().pk == later.pk
+    assert claim_task() is None
+
+
+@pytest.mark.django_db
+def test_execute_marks_task_done():
+    record.delay(1)
+
+    assert execute_task(claim_task())
+    assert calls == [1]
+    finished = Task.objects.get()
+    assert finished.status == Task.Status.DONE
+    assert finished.finished_at is not None
+    assert finished.locked_until is None
+
+
+@pytest.mark.django_db
+def test_failed_task_is_retried_with_backoff(settings):
+    settings.TASK_RETRY_DELAY = 10
+    failing = enqueue(fail.task_name)
+    failing.max_attempts = 2
+    failing.save()
+
+    before = timezone.now()
+    assert not execute_task(claim_task())
+    failing.refresh_from_db()
+    assert failing.status == Task.Status.PENDING
+    assert failing.run_at >= before + timedelta(seconds=10)
+    assert 'ошибка задачи' in failing.last_error
+    assert claim_task() is None
+
+    Task.objects.update(run_at=timezone.now())
+    assert not execute_task(claim_task())
+    failing.refresh_from_db()
+    assert failing.status == Task.Status.FAILED
+    assert failing.attempts == 2
+    assert claim_task() is None
+
+
+@pytest.mark.django_db
+def test_expired_lock_is_claimed_again():
+    record.delay(1)
+    lost = claim_task()
+    assert claim_task() is None
+
+    Task.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+    reclaimed = claim_task()
+    assert reclaimed.pk == lost.pk
+    assert reclaimed.attempts == 2
+
+    # Первый воркер завершился позже: его результат не перезаписывает
+    # состояние повторной выдачи.
+    assert execute_task(lost)
+    assert Task.objects.get().status == Task.Status.RUNNING
+    assert execute_task(reclaimed)
+    assert Task.objects.get().status == Task.Status.DONE
+
+
+@pytest.mark.django_db
+def test_task_over_max_attempts_fails_without_running():
+    record.delay(1)
+    Task.objects.update(attempts=Task.objects.get().max_attempts)
+
+    assert not execute_task(claim_task())
+    assert calls == []
+    assert Task.objects.get().status == Task.Status.FAILED
+
+
+@pytest.mark.django_db
+def test_eager_mode_runs_task_after_commit(
+    settings, django_capture_on_commit_callbacks
+):
+    settings.TASK_QUEUE_EAGER = True
+    with django_capture_on_commit_callbacks(execute=True):
+        record.delay(1)
+        assert calls == []
+
+    assert calls == [1]
+    assert not Task.objects.exists()
+
+
+@pytest.mark.django_db
+def test_purge_deletes_only_old_finished_tasks():
+    old = timezone.now() - timedelta(days=10)
+    statuses = [
+        Task.Status.DONE,
+        Task.Status.FAILED,
+        Task.Status.PENDING,
+    ]
+    Task.objects.bulk_create(
+        Task(name='old', status=status, run_at=old, finished_at=old)
+        for status in statuses
+    )
+    recent = Task.objects.create(
+        name='recent',
+        status=Task.Status.DONE,
+        finished_at=timezone.now(),
+    )
+
+    assert purge_finished_tasks(timedelta(days=7)) == 1
+    assert set(Task.objects.values_list('status', flat=True)) == {
+        Task.Status.DONE,
+        Task.Status.FAILED,
+        Task.Status.PENDING,
+    }
+    assert Task.objects.filter(status=Task.Status.DONE).get() == recent
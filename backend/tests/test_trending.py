@@ -0,0 +1,97 @@
+import math
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from core.constants import TRENDING_REBASE_EXPONENT
+from recipes.models import Favorite, Recipe, ShoppingCart, TrendingState
+from recipes.trending import get_decay_rate, refresh_trending_scores
+
+
+@pytest.fixture
+def recipes(user, create_recipe):
+    return [
+        Recipe.objects.get(
+            pk=create_recipe(user, name=f'Рецепт {number}')['id']
+        )
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def start():
+    return timezone.now()
+
+
+def get_scores(recipes):
+    scores = dict(Recipe.objects.values_list('pk', 'trending_score'))
+    return [scores[recipe.pk] for recipe in recipes]
+
+
+@pytest.mark.django_db
+def test_first_refresh_skips_existing_events(make_user, recipes, start):
+    Favorite.objects.create(user=make_user(), recipe=recipes[0])
+
+    assert refresh_trending_scores(start) == 0
+    assert get_scores(recipes) == [0, 0, 0]
+    assert TrendingState.objects.get().epoch == start
+
+
+@pytest.mark.django_db
+def test_refresh_adds_weighted_events(settings, make_user, recipes, start):
+    settings.TRENDING_FAVORITE_WEIGHT = 1
+    settings.TRENDING_SHOPPING_CART_WEIGHT = 0.5
+    refresh_trending_scores(start)
+    first, second = make_user(), make_user()
+    Favorite.objects.create(user=first, recipe=recipes[0])
+    Favorite.objects.create(user=second, recipe=recipes[0])
+    ShoppingCart.objects.create(user=first, recipe=recipes[1])
+
+    assert refresh_trending_scores(start) == 2
+    assert get_scores(recipes) == pytest.approx([2, 0.5, 0])
+    assert refresh_trending_scores(start) == 0
+    assert get_scores(recipes) == pytest.approx([2, 0.5, 0])
+
+
+@pytest.mark.django_db
+def test_newer_events_weigh_more(
+    settings, make_user, make_client, recipes, start
+):
+    refresh_trending_scores(start)
+    Favorite.objects.create(user=make_user(), recipe=recipes[0])
+    refresh_trending_scores(start)
+    Favorite.objects.create(user=make_user(), recipe=recipes[1])
+    later = start + timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS)
+    refresh_trending_scores(later)
+
+    old, new, _ = get_scores(recipes)
+    assert new / old == pytest.approx(2)
+    response = (
+        pytest.importorskip('rest_framework.test')
+        .APIClient()
+        .get('/api/recipes/?ordering=trending')
+    )
+    assert [recipe['id'] for recipe in response.json()['results']] == [
+        recipes[1].pk,
+        recipes[0].pk,
+        recipes[2].pk,
+    ]
+
+
+@pytest.mark.django_db
+def test_epoch_is_rebased(make_user, recipes, start):
+    refresh_trending_scores(start)
+    Favorite.objects.create(user=make_user(), recipe=recipes[0])
+    refresh_trending_scores(start)
+    Favorite.objects.create(user=make_user(), recipe=recipes[1])
+    rebase_after = TRENDING_REBASE_EXPONENT / get_decay_rate()
+    later = start + timedelta(seconds=rebase_after + 60)
+
+    refresh_trending_scores(later)
+
+    assert TrendingState.objects.get().epoch == later
+    old, new, _ = get_scores(recipes)
+    elapsed = (later - start).total_seconds()
+    assert new == pytest.approx(1)
+    assert old == pytest.approx(math.exp(-get_decay_rate() * elapsed))
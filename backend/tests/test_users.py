@@ -0,0 +1,61 @@
+import pytest
+
+from users.models import Follow
+
+
+@pytest.fixture
+def follow_authors(user, make_user, create_recipe):
+    """Подписывает user на count новых авторов с тремя рецептами."""
+
+    def follow(count):
+        authors = []
+        for _ in range(count):
+            author = make_user()
+            for number in range(3):
+                create_recipe(author, name=f'Рецепт {number}')
+            Follow.objects.create(user=user, author=author)
+            authors.append(author)
+        return authors
+
+    return follow
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', ['', '?recipes_limit=2'])
+def test_subscriptions_queries_do_not_grow_with_authors(
+    user, make_client, follow_authors, count_queries, query
+):
+    client = make_client(user)
+
+    def get_subscriptions():
+        response = client.get(f'/api/users/subscriptions/{query}')
+        assert response.status_code == 200
+
+    follow_authors(2)
+    few = count_queries(get_subscriptions)
+    follow_authors(4)
+    many = count_queries(get_subscriptions)
+
+    assert many == few
+
+
+@pytest.mark.django_db
+def test_subscriptions_recipes_limit(user, make_client, follow_authors):
+    authors = follow_authors(2)
+
+    response = make_client(user).get(
+        '/api/users/subscriptions/?recipes_limit=2'
+    )
+
+    results = {author['id']: author for author in response.json()['results']}
+    assert set(results) == {author.id for author in authors}
+    for author in authors:
+        expected = list(
+            author.recipes.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )[:2]
+        )
+        recipes = results[author.id]['recipes']
+        assert [recipe['id'] for recipe in recipes] == expected
+        assert results[author.id]['recipes_count'] == 3
+        assert results[author.id]['is_subscribed'] is True
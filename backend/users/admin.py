@@ -18,10 +18,13 @@ class UserAdmin(BaseUserAdmin):
         'last_name',
         'is_staff',
         'date_joined',
+        'recipes_count',
+        'followers_count',
     )
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'date_joined')
     search_fields = ('username', 'first_name', 'last_name', 'email')
     ordering = ('email',)
+    readonly_fields = ('recipes_count', 'followers_count')
 
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
@@ -9,12 +9,15 @@ from core.constants import (
     FOLLOW_MODEL_VERBOSE_NAME,
     FOLLOW_MODEL_VERBOSE_NAME_PLURAL,
     FOLLOWER_RELATED_NAME,
+    FOLLOWERS_COUNT_VERBOSE_NAME,
     FOLLOWING_RELATED_NAME,
+    IMAGE_RENDITIONS_VERBOSE_NAME,
     LAST_NAME_VERBOSE_NAME,
     LENGTH_DATA_USER,
     LENGTH_EMAIL,
     NO_SELF_FOLLOW_CONSTRAINT,
     PASSWORD_VERBOSE_NAME,
+    RECIPES_COUNT_VERBOSE_NAME,
     UNIQUE_FOLLOW_CONSTRAINT,
     USER_MODEL_VERBOSE_NAME,
     USER_MODEL_VERBOSE_NAME_PLURAL,
@@ -71,6 +74,22 @@ class User(AbstractUser):
         blank=True,
         null=True,
     )
+    avatar_renditions = models.JSONField(
+        IMAGE_RENDITIONS_VERBOSE_NAME,
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+    recipes_count = models.PositiveIntegerField(
+        RECIPES_COUNT_VERBOSE_NAME,
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        FOLLOWERS_COUNT_VERBOSE_NAME,
+        default=0,
+        editable=False,
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = (
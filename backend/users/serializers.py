@@ -1,22 +1,35 @@
-import base64
 import contextlib
 
-from django.core.files.base import ContentFile
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 
+from core.constants import AVATAR_RENDITION_WIDTHS
+from core.fields import Base64ImageField, ImageSrcsetField
+from core.serializers import DynamicFieldsMixin
+
 from .models import Follow, User
 
 
-class Base64ImageField(serializers.ImageField):
-    """Поле для обработки изображений, закодированных в base64."""
+def is_subscribed(context, author):
+    """Проверяет подписку текущего пользователя на автора.
+
+    Использует множество подписок из контекста, если оно передано,
+    иначе выполняет запрос к базе данных.
+    """
+    subscriptions = context.get('subscriptions')
+    if subscriptions is not None:
+        return author.id in subscriptions
+    request = context.get('request')
+    if request and request.user.is_authenticated:
+        return Follow.objects.filter(user=request.user, author=author).exists()
+    return False
+
 
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='avatar.' + ext)
-        return super().to_internal_value(data)
+def expect_subscriptions(context, author_ids):
+    """Сообщает подпискам из контекста id авторов страницы."""
+    subscriptions = context.get('subscriptions')
+    if subscriptions is not None and hasattr(subscriptions, 'expect'):
+        subscriptions.expect(author_ids)
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -41,11 +54,23 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         return user
 
 
-class CustomUserSerializer(UserSerializer):
+class UserListSerializer(serializers.ListSerializer):
+    """Список пользователей с пакетной проверкой подписок."""
+
+    def to_representation(self, data):
+        users = list(data.all() if hasattr(data, 'all') else data)
+        expect_subscriptions(self.context, [user.id for user in users])
+        return super().to_representation(users)
+
+
+class CustomUserSerializer(DynamicFieldsMixin, UserSerializer):
     """Сериализатор для представления пользователя."""
 
     is_subscribed = serializers.SerializerMethodField()
-    avatar = Base64ImageField(required=False, allow_null=True)
+    avatar = Base64ImageField(
+        file_name='avatar', required=False, allow_null=True
+    )
+    avatar_srcset = ImageSrcsetField('avatar', AVATAR_RENDITION_WIDTHS)
 
     class Meta:
         model = User
@@ -57,36 +82,51 @@ class CustomUserSerializer(UserSerializer):
             'last_name',
             'is_subscribed',
             'avatar',
+            'avatar_srcset',
         )
         read_only_fields = ('id',)
+        list_serializer_class = UserListSerializer
 
     def get_is_subscribed(self, obj):
         """Проверяет, подписку на пользователя."""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Follow.objects.filter(
-                user=request.user, author=obj
-            ).exists()
-        return False
+        return is_subscribed(self.context, obj)
 
 
 class SetAvatarSerializer(serializers.ModelSerializer):
     """Сериализатор для установки аватара пользователя."""
 
-    avatar = Base64ImageField()
+    avatar = Base64ImageField(file_name='avatar')
 
     class Meta:
         model = User
         fields = ('avatar',)
 
 
+class SubscriptionListSerializer(serializers.ListSerializer):
+    """Список подписок с пакетной загрузкой рецептов авторов."""
+
+    def to_representation(self, data):
+        authors = list(data.all() if hasattr(data, 'all') else data)
+        from recipes.utils import get_latest_recipes_by_author
+
+        expect_subscriptions(self.context, [author.id for author in authors])
+
+        self.child.author_recipes = get_latest_recipes_by_author(
+            [author.id for author in authors],
+            self.child.get_recipes_limit(),
+        )
+        return [self.child.to_representation(author) for author in authors]
+
+
 class SubscriptionSerializer(serializers.ModelSerializer):
     """Сериализатор для подписок пользователя с рецептами."""
 
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
-    avatar = Base64ImageField(required=False, allow_null=True)
+    recipes_count = serializers.IntegerField(read_only=True)
+    avatar = Base64ImageField(
+        file_name='avatar', required=False, allow_null=True
+    )
 
     class Meta:
         model = User
@@ -102,34 +142,38 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             'recipes_count',
         )
         read_only_fields = ('id',)
+        list_serializer_class = SubscriptionListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.author_recipes = {}
 
     def get_is_subscribed(self, obj):
         """Проверяет, подписку на пользователя."""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Follow.objects.filter(
-                user=request.user, author=obj
-            ).exists()
-        return False
+        return is_subscribed(self.context, obj)
 
-    def get_recipes(self, obj):
-        """Получает рецепты пользователя с учетом лимита."""
+    def get_recipes_limit(self):
+        """Возвращает лимит рецептов из запроса или None."""
         request = self.context.get('request')
-        recipes_limit = None
         if request:
             recipes_limit = request.query_params.get('recipes_limit')
+            if recipes_limit:
+                with contextlib.suppress(ValueError, TypeError):
+                    return int(recipes_limit)
+        return None
 
-        recipes = obj.recipes.all()
-        if recipes_limit:
-            with contextlib.suppress(ValueError, TypeError):
-                recipes = recipes[: int(recipes_limit)]
+    def get_recipes(self, obj):
+        """Получает рецепты пользователя с учетом лимита."""
+        if obj.id in self.author_recipes:
+            recipes = self.author_recipes[obj.id]
+        else:
+            recipes = obj.recipes.all()
+            recipes_limit = self.get_recipes_limit()
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
 
         from recipes.serializers import RecipeMinifiedSerializer
 
         return RecipeMinifiedSerializer(
             recipes, many=True, context=self.context
         ).data
-
-    def get_recipes_count(self, obj):
-        """Получает общее количество рецептов пользователя."""
-        return obj.recipes.count()
@@ -4,6 +4,8 @@ from rest_framework import permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from core.mixins import SparseFieldsMixin, SubscriptionsContextMixin
+
 from .models import Follow, User
 from .serializers import (
     CustomUserSerializer,
@@ -12,12 +14,15 @@ from .serializers import (
 )
 
 
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(
+    SparseFieldsMixin, SubscriptionsContextMixin, DjoserUserViewSet
+):
     """ViewSet для модели User с пользовательскими действиями."""
 
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    sparse_fields_actions = ('list', 'retrieve', 'me')
 
     @action(
         detail=False,
@@ -77,12 +82,12 @@ class UserViewSet(DjoserUserViewSet):
         page = self.paginate_queryset(subscriptions)
         if page is not None:
             serializer = SubscriptionSerializer(
-                page, many=True, context={'request': request}
+                page, many=True, context=self.get_serializer_context()
             )
             return self.get_paginated_response(serializer.data)
 
         serializer = SubscriptionSerializer(
-            subscriptions, many=True, context={'request': request}
+            subscriptions, many=True, context=self.get_serializer_context()
         )
         return Response(serializer.data)
 
@@ -118,7 +123,7 @@ class UserViewSet(DjoserUserViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
             serializer = SubscriptionSerializer(
-                author, context={'request': request}
+                author, context=self.get_serializer_context()
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 